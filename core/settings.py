@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,6 +53,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'pizzeria.middleware.PerfilSQLMiddleware',   # solo con PERFIL_SQL = True
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -86,8 +88,60 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    # Paginación opt-in (?page / ?page_size / ?cursor), ver pizzeria/api/pagination.py
+    "DEFAULT_PAGINATION_CLASS": "pizzeria.api.pagination.PaginacionOpcional",
+    "PAGE_SIZE": 50,
 }
 
+# Tope para ?page_size en los listados
+API_MAX_PAGE_SIZE = 1000
+
+# Cache compartido por todos los workers (gunicorn -w N). REQUISITO de deploy:
+# los índices, versiones e invalidaciones de pizzeria/api (stock, roles,
+# catálogos, reportes de caja) tienen que verse desde todos los procesos, y
+# el LocMemCache es uno por proceso.
+# - Por defecto: archivos en BASE_DIR/.django_cache (una sola máquina). Su
+#   incr es get + set: dos cambios simultáneos de un catálogo pueden subir
+#   la versión una sola vez (igual cambia, ver pizzeria/api/catalogos.py).
+# - Con varias máquinas o para incr atómico: memcached / redis, p. ej.
+#   DJANGO_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   DJANGO_CACHE_LOCATION=redis://127.0.0.1:6379/1
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "DJANGO_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache",
+        ),
+        "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", str(BASE_DIR / ".django_cache")),
+    }
+}
+
+# Segundos que cada proceso cachea "¿la caja está abierta?" (pizzeria/api/caja.py)
+CAJA_ESTADO_TTL = 2
+
+# Segundos que se cachean los reportes de caja que incluyen el día de hoy
+CAJA_REPORTES_TTL = 60
+# ... y los de períodos ya cerrados (editar un movimiento viejo igual los
+# invalida; el TTL acota lo que tarda otro worker si el cache no es compartido)
+CAJA_REPORTES_CERRADOS_TTL = 3600
+
+# Cada cuántos segundos un proceso revisa si otro cambió un catálogo (pizzeria/api/catalogos.py)
+CATALOGOS_TTL = 30
+# Segundos que se cachea cada respuesta de /api/<catálogo>/ (también se descarta al cambiar el catálogo)
+CATALOGOS_RESPUESTAS_TTL = 300
+
+# Segundos que /api/bootstrap/ cachea los listados (platos, insumos, ...); 0 = sin cache.
+# Los catálogos se cachean siempre, por versión.
+BOOTSTRAP_LISTAS_TTL = 0
+
+# Perfil de SQL por request (pizzeria/middleware.py, reporte en /api/perfil-sql/).
+# Apagado, el middleware se saca solo de la cadena y no cuesta nada.
+PERFIL_SQL = False
+PERFIL_SQL_MEMORIA = 1000          # requests que guarda cada proceso para el reporte
+PERFIL_SQL_LENTA_MS = 100          # consultas desde estos ms se listan como lentas
+PERFIL_SQL_LOG = None              # archivo: una línea JSON por request (None = sin log)
+PERFIL_SQL_LOG_BYTES = 5 * 1024 * 1024
+PERFIL_SQL_LOG_ARCHIVOS = 3
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -0,0 +1,31 @@
+# core/settings_bench.py
+"""
+Settings para los benchmarks (pizzeria/bench): SQLite en lugar de MySQL.
+
+    python manage.py bench_api --settings=core.settings_bench
+
+BENCH_DB=/ruta/archivo.sqlite3 usa un archivo (por defecto, en memoria).
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get("BENCH_DB", ":memory:"),
+    }
+}
+
+# Las migraciones de pizzeria tienen SQL de MySQL: las tablas salen de los
+# modelos (migrate --run-syncdb + pizzeria/bench/datos.py)
+MIGRATION_MODULES = {"pizzeria": None}
+
+# Un solo proceso (bench_api, tests, runserver): cache en memoria, así una
+# base nueva no hereda índices ni versiones de una corrida anterior
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Crear usuarios no tiene que pesar en los tiempos
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
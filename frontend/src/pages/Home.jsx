@@ -159,7 +159,7 @@ export default function Home() {
       // 6) Ingresos históricos por día (toda la base)
       // ─────────────────────────────────────────────────────────
       try {
-        const r = await api.get("/api/caja/ingresos-historicos/");
+        const r = await api.get("/api/caja/ingresos-historicos/?stream=1");
         const dias = Array.isArray(r.data?.dias) ? r.data.dias : [];
         setWeekly(dias);
       } catch (e) {
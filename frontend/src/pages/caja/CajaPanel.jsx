@@ -93,7 +93,7 @@ export default function CajaPanel() {
       const [est, mets, ingresosHist] = await Promise.all([
         api.get("/api/caja/estado/"),
         api.get("/api/metodos-pago/"),
-        api.get("/api/caja/ingresos-historicos/"),
+        api.get("/api/caja/ingresos-historicos/?stream=1"),
       ]);
 
       console.log("Estado caja desde backend:", est.data);
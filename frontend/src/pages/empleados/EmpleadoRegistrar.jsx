@@ -28,12 +28,11 @@ export default function EmpleadoRegistrar() {
   const norm = (s) => (s ? s.toString().trim().toLowerCase() : "");
 
   useEffect(() => {
-    Promise.all([api.get("/api/cargos/"), api.get("/api/estados-empleado/")])
-      .then(([cargosRes, estadosRes]) => {
-        // 🔹 Tomamos los cargos del backend
-        const rawCargos = Array.isArray(cargosRes.data?.results)
-          ? cargosRes.data.results
-          : cargosRes.data;
+    api
+      .get("/api/bootstrap/", { params: { secciones: "cargos,estados-empleado" } })
+      .then(({ data }) => {
+        // 🔹 Tomamos los cargos del backend (un solo request para cargos + estados)
+        const rawCargos = data?.secciones?.cargos;
         const lista = Array.isArray(rawCargos) ? rawCargos : [];
 
         // 🔒 SOLO permitir Administrador, Mozo o Cajero
@@ -48,11 +47,8 @@ export default function EmpleadoRegistrar() {
 
         setCargos(filtrados);
 
-        setEstados(
-          Array.isArray(estadosRes.data?.results)
-            ? estadosRes.data.results
-            : estadosRes.data
-        );
+        const rawEstados = data?.secciones?.["estados-empleado"];
+        setEstados(Array.isArray(rawEstados) ? rawEstados : []);
       })
       .catch((err) => {
         console.error(err);
@@ -65,7 +65,7 @@ export default function MesaEditar() {
       .catch(() => setMsg("No se pudo cargar la mesa."));
 
     api
-      .get("/api/pedidos/", { params: { page_size: 1000 } })
+      .get("/api/pedidos/", { params: { id_mesa: id } })
       .then(({ data }) => {
         const list = normalize(data);
         const hasBlocking = list.some((p) => {
@@ -62,8 +62,17 @@ export default function MesasList() {
 
   const fetchPedidosBloqueantes = async () => {
     try {
+      // Solo los pedidos en estados que bloquean (filtrados en el backend)
+      const { data: estadosPedido } = await api.get("/api/estados-pedido/");
+      const idsBloqueantes = normalize(estadosPedido)
+        .filter((e) => isBlockingEstado(e.estped_nombre))
+        .map((e) => e.id_estado_pedido);
+      if (!idsBloqueantes.length) {
+        setBloqueadas(new Set());
+        return;
+      }
       const { data } = await api.get("/api/pedidos/", {
-        params: { page_size: 1000 },
+        params: { id_estado_pedido: idsBloqueantes.join(",") },
       });
       const list = normalize(data);
       const s = new Set();
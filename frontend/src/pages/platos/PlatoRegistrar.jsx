@@ -104,7 +104,7 @@ export default function PlatoRegistrar() {
 
   const nombreDuplicado = async (nombre) => {
     try {
-      const { data } = await api.get("/api/platos/", { params: { page_size: 1000 } });
+      const { data } = await api.get("/api/platos/");
       const list = normalizeList(data);
       const target = normalizeName(nombre);
       return list.some((p) => {
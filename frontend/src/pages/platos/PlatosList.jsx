@@ -21,64 +21,11 @@ function normalizeResponse(respData) {
 
 /* ==== chequear si el plato está en pedidos para bloquear desactivado ==== */
 async function platoEstaEnPedidos(idPlato) {
-  const idNum = Number(idPlato);
-
-  const tryEndpoints = [
-    "/api/pedido-detalles/",
-    "/api/detalle-pedidos/",
-    "/api/detalles-pedido/",
-    "/api/pedidos-detalle/",
-  ];
-
-  for (const ep of tryEndpoints) {
-    try {
-      const { data } = await api.get(ep, {
-        params: { id_plato: idNum, page_size: 50 },
-      });
-      const list = normalizeResponse(data);
-
-      const hayDeEstePlato =
-        Array.isArray(list) &&
-        list.some((it) => {
-          const platoId =
-            it.id_plato ??
-            it.plato ??
-            it.id_plato_id ??
-            (it.plato && it.plato.id_plato);
-
-          return Number(platoId) === idNum;
-        });
-
-      if (hayDeEstePlato) {
-        return true;
-      }
-    } catch {
-      // probamos siguiente endpoint
-    }
-  }
-
-  // fallback: leer pedidos con items embebidos
-  try {
-    const { data } = await api.get("/api/pedidos/", {
-      params: { page_size: 1000 },
-    });
-    const pedidos = normalizeResponse(data);
-    for (const p of pedidos) {
-      const items = p.detalles || p.items || p.lineas || [];
-      if (
-        Array.isArray(items) &&
-        items.some(
-          (it) =>
-            Number(it.id_plato ?? it.plato ?? it.id_plato_id) === idNum
-        )
-      ) {
-        return true;
-      }
-    }
-  } catch {}
-
-  // no encontramos nada, se puede desactivar
-  return false;
+  // El backend filtra por plato: alcanza con saber si hay al menos un detalle
+  const { data } = await api.get("/api/detalle-pedidos/", {
+    params: { id_plato: Number(idPlato), page_size: 1 },
+  });
+  return normalizeResponse(data).length > 0;
 }
 
 /* ================================================================
@@ -404,9 +351,7 @@ export default function PlatosList() {
 
   const fetchRecetas = async () => {
     try {
-      const res = await api.get("/api/recetas/", {
-        params: { page_size: 1000 },
-      });
+      const res = await api.get("/api/recetas/");
       const list = normalizeResponse(res.data);
       const map = {};
       list.forEach((r) => {
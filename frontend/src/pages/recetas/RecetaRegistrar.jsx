@@ -33,12 +33,11 @@ export default function RecetaRegistrar() {
   useEffect(() => {
     const fetchBase = async () => {
       try {
-        const [plRes, insRes] = await Promise.all([
-          api.get("/api/platos/"),
-          api.get("/api/insumos/")
-        ]);
-        setPlatos(normalizeList(plRes.data));
-        setInsumos(normalizeList(insRes.data));
+        const { data } = await api.get("/api/bootstrap/", {
+          params: { secciones: "platos,insumos" }
+        });
+        setPlatos(normalizeList(data?.secciones?.platos));
+        setInsumos(normalizeList(data?.secciones?.insumos));
       } catch (e) {
         console.error(e);
       }
@@ -130,7 +129,7 @@ export default function RecetaRegistrar() {
     } catch (e) {
       // fallback: si tu API no filtra por id_plato, chequeamos todos (limit razonable)
       try {
-        const all = await api.get("/api/recetas/", { params: { page_size: 1000 } });
+        const all = await api.get("/api/recetas/");
         const list = normalizeList(all.data);
         return list.some(r => {
           const rp = r.id_plato ?? r?.plato?.id_plato ?? r?.plato;
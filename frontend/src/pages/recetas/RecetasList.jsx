@@ -31,33 +31,12 @@ export default function RecetasList() {
 
   // ── REGLA 2: no se puede desactivar receta si su plato está en algún pedido
   const platoEstaEnPedidos = async (idPlato) => {
-    // Intento 1: endpoints comunes de detalle de pedidos
-    const tryEndpoints = [
-      "/api/pedido-detalles/",
-      "/api/detalle-pedidos/",
-      "/api/detalles-pedido/",
-      "/api/pedidos-detalle/",
-    ];
-    for (const ep of tryEndpoints) {
-      try {
-        const { data } = await api.get(ep, { params: { id_plato: Number(idPlato), page_size: 1 } });
-        const list = normalizeList(data);
-        if (Array.isArray(list) && list.length > 0) return true;
-      } catch { /* sigue intentando */ }
-    }
-    // Intento 2 (fallback): traer pedidos y, si la API trae items embebidos, revisar allí
-    try {
-      const { data } = await api.get("/api/pedidos/", { params: { page_size: 1000 } });
-      const pedidos = normalizeList(data);
-      for (const p of pedidos) {
-        const items = p.detalles || p.items || p.lineas || [];
-        if (Array.isArray(items) && items.some(it => Number(it.id_plato ?? it.plato) === Number(idPlato))) {
-          return true;
-        }
-      }
-    } catch {/* noop */}
-    return false;
-    };
+    // El backend filtra por plato: alcanza con saber si hay al menos un detalle
+    const { data } = await api.get("/api/detalle-pedidos/", {
+      params: { id_plato: Number(idPlato), page_size: 1 },
+    });
+    return normalizeList(data).length > 0;
+  };
 
   const toggleEstado = async (rec) => {
     try {
@@ -32,9 +32,9 @@ export const esCritico = (item) => {
   return !Number.isNaN(actual) && !Number.isNaN(repo) && actual < repo;
 };
 
-// 🔹 Estrategia simple: pedir muchos en una sola página
+// 🔹 Sin ?page / ?page_size el backend devuelve la lista completa
 export async function fetchAllInsumos(apiInstance) {
-  const url = "/api/insumos/?page_size=1000&format=json";
+  const url = "/api/insumos/?format=json";
   const res = await apiInstance.get(url);
   const data = res.data;
   const items = Array.isArray(data?.results)
@@ -0,0 +1,730 @@
+# api/caja.py
+"""
+Estado de la caja (tabla sesion_caja, una sola fila).
+
+- caja_esta_abierta_hoy(): lectura por PK + caché en memoria de pocos segundos.
+- registrar_movimiento(mov): llamar después de crear cualquier MovimientosCaja
+  (apertura / ingreso / egreso / cierre) dentro de la misma transacción.
+- recalcular_sesion(): rehace la fila desde movimientos_caja (migración
+  0016, primer uso sin fila, o después de editar / borrar movimientos).
+- ciclos_de_caja(cierres): totales por ciclo (apertura → cierre) y método
+  de pago para una página de cierres, en un número fijo de consultas.
+- resumenes_de_cierres(cierres): historial leyendo resumen_ciclo_caja
+  (escrito al cerrar) y calculando solo los ciclos que no lo tengan.
+- Resumen diario (resumen_diario_caja): totales por día / tipo / método,
+  actualizados con cada movimiento; los gráficos de ingresos leen de acá.
+  La historia previa la carga la migración 0015 (o reconstruir_resumen_diario).
+  dias_con_huecos() rellena con 0 los días sin datos mientras itera.
+- series_de_totales(): series densas por día / semana / mes / año para los
+  reportes, todas a partir de una sola consulta agrupada por día. Se guardan
+  en el cache de Django por CAJA_REPORTES_TTL si el rango incluye hoy y por
+  CAJA_REPORTES_CERRADOS_TTL si ya terminó; cada movimiento invalida su mes.
+"""
+import hashlib
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from pizzeria.models import (
+    MetodoDePago, MovimientosCaja, ResumenCicloCaja, ResumenDiarioCaja, SesionCaja,
+)
+
+from .catalogos import METODO_PAGO, TIPO_MOV_CAJA
+
+
+ID_SESION = 1
+
+# Segundos que un proceso reutiliza el estado leído (otro proceso puede
+# tardar hasta esto en enterarse de una apertura / cierre).
+TTL_ESTADO = getattr(settings, "CAJA_ESTADO_TTL", 2)
+
+# { "abierta": bool, "fecha_apertura": date | None, "expira": monotonic }
+_estado_local = {}
+
+
+def _olvidar_estado_local():
+    _estado_local.clear()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Lectura
+# ──────────────────────────────────────────────────────────────────────────────
+def sesion_actual(para_actualizar=False):
+    """
+    Devuelve la fila de sesion_caja (la crea desde movimientos_caja si no existe).
+    Con para_actualizar=True la bloquea (usar dentro de transaction.atomic).
+    """
+    qs = SesionCaja.objects.select_for_update() if para_actualizar else SesionCaja.objects
+    sesion = qs.filter(pk=ID_SESION).first()
+    if sesion is None:
+        sesion = recalcular_sesion()
+        if para_actualizar:
+            sesion = SesionCaja.objects.select_for_update().get(pk=ID_SESION)
+    return sesion
+
+
+def abierta_hoy(sesion):
+    """
+    Misma regla de siempre: la caja está abierta si hoy hubo apertura y
+    todavía no se cerró. Una apertura de otro día sin cierre cuenta como cerrada.
+    """
+    if not sesion.ses_abierta or not sesion.ses_fecha_apertura:
+        return False
+    return timezone.localdate(sesion.ses_fecha_apertura) == timezone.localdate()
+
+
+def caja_esta_abierta_hoy():
+    """True si la caja de HOY está abierta (lectura por PK, cacheada TTL_ESTADO s)."""
+    ahora = time.monotonic()
+    if _estado_local.get("expira", 0) > ahora:
+        fecha = _estado_local["fecha_apertura"]
+        return _estado_local["abierta"] and fecha == timezone.localdate()
+
+    sesion = sesion_actual()
+    _estado_local.update({
+        "abierta": sesion.ses_abierta,
+        "fecha_apertura": (
+            timezone.localdate(sesion.ses_fecha_apertura)
+            if sesion.ses_fecha_apertura else None
+        ),
+        "expira": ahora + TTL_ESTADO,
+    })
+    return abierta_hoy(sesion)
+
+
+def saldo_sesion(sesion):
+    """Apertura + ingresos - egresos del ciclo actual."""
+    return sesion.ses_monto_apertura + sesion.ses_ingresos - sesion.ses_egresos
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Escritura
+# ──────────────────────────────────────────────────────────────────────────────
+def registrar_movimiento(mov):
+    """
+    Actualiza la fila de sesión (y el resumen diario) con un movimiento
+    recién creado:
+    - APERTURA → abre y reinicia totales
+    - INGRESO / EGRESO → suma a los totales del ciclo abierto
+    - CIERRE → cierra
+    """
+    with transaction.atomic():
+        sumar_a_resumen_diario(mov)
+
+        sesion = SesionCaja.objects.select_for_update().filter(pk=ID_SESION).first()
+        if sesion is None:
+            # Sin fila todavía: se arma desde movimientos_caja, que ya
+            # incluye `mov` (sumarlo otra vez lo contaría dos veces)
+            return recalcular_sesion()
+
+        tipo = mov.id_tipo_movimiento_caja_id
+        monto = Decimal(str(mov.mv_monto or 0))
+        es_efectivo = mov.id_metodo_pago_id == METODO_PAGO["EFECTIVO"]
+
+        if tipo == TIPO_MOV_CAJA["APERTURA"]:
+            sesion.ses_abierta = True
+            sesion.id_apertura_id = mov.pk
+            sesion.ses_fecha_apertura = mov.mv_fecha_hora
+            sesion.ses_monto_apertura = monto
+            sesion.ses_ingresos = Decimal("0")
+            sesion.ses_egresos = Decimal("0")
+            sesion.ses_ingresos_efectivo = Decimal("0")
+            sesion.ses_egresos_efectivo = Decimal("0")
+        elif tipo == TIPO_MOV_CAJA["CIERRE"]:
+            sesion.ses_abierta = False
+        elif sesion.ses_abierta and tipo == TIPO_MOV_CAJA["INGRESO"]:
+            sesion.ses_ingresos += monto
+            if es_efectivo:
+                sesion.ses_ingresos_efectivo += monto
+        elif sesion.ses_abierta and tipo == TIPO_MOV_CAJA["EGRESO"]:
+            sesion.ses_egresos += monto
+            if es_efectivo:
+                sesion.ses_egresos_efectivo += monto
+
+        sesion.save()
+        transaction.on_commit(_olvidar_estado_local)
+    return sesion
+
+
+def recalcular_sesion():
+    """
+    Rehace sesion_caja desde movimientos_caja:
+    - última APERTURA registrada y si hubo un CIERRE después;
+    - totales de ingresos / egresos desde esa apertura.
+    """
+    apertura = (
+        MovimientosCaja.objects
+        .filter(id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["APERTURA"])
+        .order_by("-mv_fecha_hora", "-id_movimiento_caja")
+        .first()
+    )
+
+    valores = {
+        "ses_abierta": False,
+        "id_apertura": None,
+        "ses_fecha_apertura": None,
+        "ses_monto_apertura": Decimal("0"),
+        "ses_ingresos": Decimal("0"),
+        "ses_egresos": Decimal("0"),
+        "ses_ingresos_efectivo": Decimal("0"),
+        "ses_egresos_efectivo": Decimal("0"),
+    }
+
+    if apertura:
+        movs = MovimientosCaja.objects.filter(mv_fecha_hora__gte=apertura.mv_fecha_hora)
+        cerrada = movs.filter(id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["CIERRE"]).exists()
+
+        ingreso = Q(id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["INGRESO"])
+        egreso = Q(id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["EGRESO"])
+        efectivo = Q(id_metodo_pago_id=METODO_PAGO["EFECTIVO"])
+        totales = movs.aggregate(
+            ing=Sum("mv_monto", filter=ingreso),
+            egr=Sum("mv_monto", filter=egreso),
+            ing_ef=Sum("mv_monto", filter=ingreso & efectivo),
+            egr_ef=Sum("mv_monto", filter=egreso & efectivo),
+        )
+
+        valores.update({
+            "ses_abierta": not cerrada,
+            "id_apertura": apertura,
+            "ses_fecha_apertura": apertura.mv_fecha_hora,
+            "ses_monto_apertura": apertura.mv_monto or Decimal("0"),
+            "ses_ingresos": totales["ing"] or Decimal("0"),
+            "ses_egresos": totales["egr"] or Decimal("0"),
+            "ses_ingresos_efectivo": totales["ing_ef"] or Decimal("0"),
+            "ses_egresos_efectivo": totales["egr_ef"] or Decimal("0"),
+        })
+
+    sesion, _ = SesionCaja.objects.update_or_create(pk=ID_SESION, defaults=valores)
+    transaction.on_commit(_olvidar_estado_local)
+    return sesion
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Historial: ciclos apertura → cierre
+# ──────────────────────────────────────────────────────────────────────────────
+def cierres_con_apertura():
+    """
+    Cierres anotados con `id_apertura_ref`: la última APERTURA con
+    fecha <= fecha del cierre (subconsulta correlacionada, misma consulta).
+    """
+    apertura = (
+        MovimientosCaja.objects
+        .filter(
+            id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["APERTURA"],
+            mv_fecha_hora__lte=OuterRef("mv_fecha_hora"),
+        )
+        .order_by("-mv_fecha_hora", "-id_movimiento_caja")
+        .values("id_movimiento_caja")[:1]
+    )
+    return (
+        MovimientosCaja.objects
+        .filter(id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["CIERRE"])
+        .select_related("id_empleado")
+        .annotate(id_apertura_ref=Subquery(apertura))
+        .order_by("-mv_fecha_hora", "-id_movimiento_caja")
+    )
+
+
+def ciclos_de_caja(cierres):
+    """
+    Para una lista de cierres (de cierres_con_apertura()) devuelve
+    { id_cierre: { "apertura": MovimientosCaja,
+                   "ingresos": [(metodo, total), ...],
+                   "egresos":  [(metodo, total), ...] } }
+
+    Dos consultas en total, sin importar cuántos cierres haya:
+    1) las aperturas del rango (con empleado y método);
+    2) UN GROUP BY sobre movimientos_caja con funciones de ventana:
+       - ciclo      = aperturas acumuladas hasta la fila
+       - cierres    = cierres acumulados hasta la fila
+       Un movimiento pertenece al ciclo k si no hubo cierre entre la
+       apertura k y él (mismo "cierres" que la apertura).
+    """
+    cierres = [c for c in cierres if c.id_apertura_ref]
+    if not cierres:
+        return {}
+
+    ids_apertura = {c.id_apertura_ref for c in cierres}
+    primera = (
+        MovimientosCaja.objects
+        .filter(pk__in=ids_apertura)
+        .order_by("mv_fecha_hora", "id_movimiento_caja")
+        .values_list("mv_fecha_hora", flat=True)
+        .first()
+    )
+    desde = primera
+    hasta = max(c.mv_fecha_hora for c in cierres)
+
+    # 1) Aperturas del rango, en el mismo orden que usa la ventana
+    aperturas = list(
+        MovimientosCaja.objects
+        .filter(
+            id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["APERTURA"],
+            mv_fecha_hora__gte=desde,
+            mv_fecha_hora__lte=hasta,
+        )
+        .select_related("id_empleado", "id_metodo_pago")
+        .order_by("mv_fecha_hora", "id_movimiento_caja")
+    )
+    numero_ciclo = {a.pk: n for n, a in enumerate(aperturas, start=1)}
+
+    # 2) Totales por (ciclo, cierres acumulados, tipo, método)
+    tabla = MovimientosCaja._meta.db_table
+    tabla_mp = MetodoDePago._meta.db_table
+    ventana = "OVER (ORDER BY m.mv_fecha_hora, m.id_movimiento_caja ROWS UNBOUNDED PRECEDING)"
+    sql = f"""
+        SELECT t.ciclo, t.cierres, t.id_tipo, mp.metpag_nombre, SUM(t.mv_monto)
+        FROM (
+            SELECT m.id_tipo_movimiento_caja AS id_tipo,
+                   m.id_metodo_pago,
+                   m.mv_monto,
+                   SUM(CASE WHEN m.id_tipo_movimiento_caja = %s THEN 1 ELSE 0 END) {ventana} AS ciclo,
+                   SUM(CASE WHEN m.id_tipo_movimiento_caja = %s THEN 1 ELSE 0 END) {ventana} AS cierres
+            FROM {tabla} m
+            WHERE m.mv_fecha_hora >= %s AND m.mv_fecha_hora <= %s
+        ) t
+        LEFT JOIN {tabla_mp} mp ON mp.id_metodo_pago = t.id_metodo_pago
+        WHERE t.id_tipo IN (%s, %s, %s)
+        GROUP BY t.ciclo, t.cierres, t.id_tipo, mp.metpag_nombre
+        ORDER BY t.ciclo, mp.metpag_nombre
+    """
+    params = [
+        TIPO_MOV_CAJA["APERTURA"],
+        TIPO_MOV_CAJA["CIERRE"],
+        connection.ops.adapt_datetimefield_value(desde),
+        connection.ops.adapt_datetimefield_value(hasta),
+        TIPO_MOV_CAJA["APERTURA"],
+        TIPO_MOV_CAJA["INGRESO"],
+        TIPO_MOV_CAJA["EGRESO"],
+    ]
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        filas = cur.fetchall()
+
+    # Cierres acumulados en cada apertura (marca el inicio de su ciclo)
+    cierres_en_apertura = {
+        int(ciclo): int(cant_cierres)
+        for ciclo, cant_cierres, tipo, _, _ in filas
+        if tipo == TIPO_MOV_CAJA["APERTURA"]
+    }
+
+    por_ciclo = {}
+    for ciclo, cant_cierres, tipo, metodo, total in filas:
+        ciclo, cant_cierres = int(ciclo), int(cant_cierres)
+        if tipo == TIPO_MOV_CAJA["APERTURA"] or cierres_en_apertura.get(ciclo) != cant_cierres:
+            continue
+        clave = "ingresos" if tipo == TIPO_MOV_CAJA["INGRESO"] else "egresos"
+        por_ciclo.setdefault(ciclo, {"ingresos": [], "egresos": []})[clave].append(
+            (metodo, Decimal(str(total or 0)))
+        )
+
+    aperturas_por_id = {a.pk: a for a in aperturas}
+    resultado = {}
+    for cierre in cierres:
+        apertura = aperturas_por_id.get(cierre.id_apertura_ref)
+        if not apertura:
+            continue
+        totales = por_ciclo.get(numero_ciclo[apertura.pk], {"ingresos": [], "egresos": []})
+        resultado[cierre.pk] = {"apertura": apertura, **totales}
+    return resultado
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Resúmenes persistidos (resumen_ciclo_caja)
+# ──────────────────────────────────────────────────────────────────────────────
+def _nombre_empleado(mov):
+    # "Nombre Apellido" del empleado de un movimiento (o None)
+    try:
+        emp = mov.id_empleado
+        if not emp:
+            return None
+        nombre = (emp.emp_nombre or "").strip()
+        apellido = (emp.emp_apellido or "").strip()
+        full = f"{nombre} {apellido}".strip()
+        return full or None
+    except Exception:
+        return None
+
+
+def armar_resumen(cierre, ciclo):
+    """
+    ResumenCicloCaja (sin guardar) a partir de un ciclo de ciclos_de_caja().
+    La apertura se suma al método EFECTIVO solo en el detalle por método,
+    NO en los totales generales.
+    """
+    apertura = ciclo["apertura"]
+    ingresos_por_mp = list(ciclo["ingresos"])
+    egresos_por_mp = list(ciclo["egresos"])
+
+    monto_apertura = Decimal(str(apertura.mv_monto or 0))
+    total_ing = sum((t for _, t in ingresos_por_mp), Decimal("0"))
+    total_egr = sum((t for _, t in egresos_por_mp), Decimal("0"))
+
+    nombre_efectivo = getattr(apertura.id_metodo_pago, "metpag_nombre", None)
+    if monto_apertura and nombre_efectivo:
+        for i, (metodo, total) in enumerate(ingresos_por_mp):
+            if metodo == nombre_efectivo:
+                ingresos_por_mp[i] = (metodo, total + monto_apertura)
+                break
+        else:
+            ingresos_por_mp.append((nombre_efectivo, monto_apertura))
+
+    return ResumenCicloCaja(
+        id_cierre=cierre,
+        id_apertura=apertura,
+        rcc_fecha_apertura=apertura.mv_fecha_hora,
+        rcc_fecha_cierre=cierre.mv_fecha_hora,
+        rcc_monto_apertura=monto_apertura,
+        rcc_ingresos=total_ing,
+        rcc_egresos=total_egr,
+        rcc_total_final=monto_apertura + total_ing - total_egr,
+        rcc_apertura_empleado=_nombre_empleado(apertura),
+        rcc_cierre_empleado=_nombre_empleado(cierre),
+        rcc_por_metodo_ingresos=[
+            {"metodo": metodo, "monto": f"{total:.2f}"} for metodo, total in ingresos_por_mp
+        ],
+        rcc_por_metodo_egresos=[
+            {"metodo": metodo, "monto": f"{total:.2f}"} for metodo, total in egresos_por_mp
+        ],
+    )
+
+
+def resumen_a_dict(resumen):
+    """Formato que espera el frontend en /caja/historial/."""
+    return {
+        "id_cierre": resumen.id_cierre_id,
+        "cierre_fecha": resumen.rcc_fecha_cierre,
+        "apertura_fecha": resumen.rcc_fecha_apertura,
+        "monto_apertura": float(resumen.rcc_monto_apertura or 0),
+        "ingresos": float(resumen.rcc_ingresos or 0),
+        "egresos": float(resumen.rcc_egresos or 0),
+        "total_final": float(resumen.rcc_total_final or 0),
+        "apertura_empleado_nombre": resumen.rcc_apertura_empleado or "-",
+        "cierre_empleado_nombre": resumen.rcc_cierre_empleado or "-",
+        "por_metodo_ingresos": [
+            {"metodo": f["metodo"], "monto": float(f["monto"] or 0)}
+            for f in resumen.rcc_por_metodo_ingresos
+        ],
+        "por_metodo_egresos": [
+            {"metodo": f["metodo"], "monto": float(f["monto"] or 0)}
+            for f in resumen.rcc_por_metodo_egresos
+        ],
+    }
+
+
+def resumenes_de_cierres(cierres):
+    """
+    { id_cierre: ResumenCicloCaja } para una lista de cierres
+    (de cierres_con_apertura()). Lee los guardados en UNA consulta y
+    calcula en bloque solo los que falten (sin guardarlos).
+    """
+    ids = [c.pk for c in cierres]
+    guardados = {
+        r.id_cierre_id: r
+        for r in ResumenCicloCaja.objects.filter(id_cierre_id__in=ids)
+    }
+
+    faltantes = [c for c in cierres if c.pk not in guardados]
+    if faltantes:
+        ciclos = ciclos_de_caja(faltantes)
+        for cierre in faltantes:
+            if cierre.pk in ciclos:
+                guardados[cierre.pk] = armar_resumen(cierre, ciclos[cierre.pk])
+    return guardados
+
+
+def guardar_resumen_ciclo(cierre, id_apertura):
+    """Escribe el resumen del ciclo que termina en `cierre` (llamar al registrar el CIERRE)."""
+    cierre.id_apertura_ref = id_apertura
+    ciclo = ciclos_de_caja([cierre]).get(cierre.pk)
+    if not ciclo:
+        return None
+    resumen = armar_resumen(cierre, ciclo)
+    resumen.save()
+    return resumen
+
+
+def descartar_resumenes_de(mov):
+    """
+    Un movimiento editado / borrado invalida el resumen del ciclo que lo
+    contiene (se recalcula en la próxima lectura o con generar_resumenes_caja).
+    """
+    if mov.mv_fecha_hora is None:
+        return
+    ResumenCicloCaja.objects.filter(
+        rcc_fecha_apertura__lte=mov.mv_fecha_hora,
+        rcc_fecha_cierre__gte=mov.mv_fecha_hora,
+    ).delete()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Resumen diario (resumen_diario_caja)
+# ──────────────────────────────────────────────────────────────────────────────
+def sumar_a_resumen_diario(mov, signo=1):
+    """
+    Suma (signo=1) o resta (signo=-1) un movimiento en su fila
+    (fecha local, tipo, método). UPDATE ... SET total = total + x;
+    si la fila no existe se crea (con reintento si otro request la creó).
+    """
+    if mov.mv_fecha_hora is None:
+        return
+
+    fecha = timezone.localdate(mov.mv_fecha_hora)
+    transaction.on_commit(lambda: invalidar_reportes(fecha))
+
+    clave = {
+        "rdc_fecha": fecha,
+        "rdc_tipo": mov.id_tipo_movimiento_caja_id,
+        "rdc_metodo_pago": mov.id_metodo_pago_id or 0,
+    }
+    monto = Decimal(str(mov.mv_monto or 0)) * signo
+    cambios = {
+        "rdc_total": F("rdc_total") + monto,
+        "rdc_cantidad": F("rdc_cantidad") + signo,
+    }
+
+    if ResumenDiarioCaja.objects.filter(**clave).update(**cambios):
+        return
+    try:
+        with transaction.atomic():
+            ResumenDiarioCaja.objects.create(**clave, rdc_total=monto, rdc_cantidad=signo)
+    except IntegrityError:
+        ResumenDiarioCaja.objects.filter(**clave).update(**cambios)
+
+
+def reconstruir_resumen_diario():
+    """Rehace resumen_diario_caja desde movimientos_caja. Devuelve la cantidad de filas."""
+    filas = (
+        MovimientosCaja.objects
+        .exclude(mv_fecha_hora__isnull=True)
+        .annotate(fecha=TruncDate("mv_fecha_hora"))
+        .values("fecha", "id_tipo_movimiento_caja", "id_metodo_pago")
+        .annotate(total=Sum("mv_monto"), cantidad=Count("id_movimiento_caja"))
+        .order_by()
+    )
+
+    # Dos métodos NULL / 0 caen en la misma clave: se acumulan acá
+    acumulado = {}
+    for f in filas:
+        clave = (f["fecha"], f["id_tipo_movimiento_caja"], f["id_metodo_pago"] or 0)
+        total, cantidad = acumulado.get(clave, (Decimal("0"), 0))
+        acumulado[clave] = (total + (f["total"] or 0), cantidad + f["cantidad"])
+
+    with transaction.atomic():
+        ResumenDiarioCaja.objects.all().delete()
+        ResumenDiarioCaja.objects.bulk_create(
+            [
+                ResumenDiarioCaja(
+                    rdc_fecha=fecha, rdc_tipo=tipo, rdc_metodo_pago=metodo,
+                    rdc_total=total, rdc_cantidad=cantidad,
+                )
+                for (fecha, tipo, metodo), (total, cantidad) in acumulado.items()
+            ],
+            batch_size=1000,
+        )
+        transaction.on_commit(invalidar_reportes)
+    return len(acumulado)
+
+
+def filas_resumen_diario(tipo=None, desde=None, hasta=None, metodo=None):
+    """
+    Filas de resumen_diario_caja filtradas (por defecto, INGRESO).
+    Sirve para agrupar por mes / año sin tocar movimientos_caja.
+    """
+    qs = ResumenDiarioCaja.objects.filter(rdc_tipo=tipo or TIPO_MOV_CAJA["INGRESO"])
+    if desde:
+        qs = qs.filter(rdc_fecha__gte=desde)
+    if hasta:
+        qs = qs.filter(rdc_fecha__lte=hasta)
+    if metodo is not None:
+        qs = qs.filter(rdc_metodo_pago=metodo)
+    return qs
+
+
+def totales_diarios(tipo=None, desde=None, hasta=None, metodo=None):
+    """
+    QuerySet de { "rdc_fecha", "total" } (un registro por día con datos),
+    ordenado por fecha, leído del resumen diario.
+    """
+    return (
+        filas_resumen_diario(tipo, desde, hasta, metodo)
+        .values("rdc_fecha")
+        .annotate(total=Sum("rdc_total"))
+        .order_by("rdc_fecha")
+    )
+
+
+def dias_con_huecos(filas):
+    """
+    filas: iterable de (fecha, total) ordenado por fecha.
+    Genera (fecha, total) para cada día entre la primera y la última fecha,
+    con 0 en los días sin datos, sin armar la lista completa en memoria.
+    """
+    anterior = None
+    for fecha, total in filas:
+        if anterior is not None:
+            hueco = anterior + timedelta(days=1)
+            while hueco < fecha:
+                yield hueco, Decimal("0")
+                hueco += timedelta(days=1)
+        yield fecha, total or Decimal("0")
+        anterior = fecha
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Series por período (reportes)
+# ──────────────────────────────────────────────────────────────────────────────
+GRANULARIDADES = ("dia", "semana", "mes", "anio")
+
+
+def inicio_de_periodo(fecha, granularidad):
+    """Primer día del período que contiene a `fecha` (semanas de lunes a domingo)."""
+    if granularidad == "semana":
+        return fecha - timedelta(days=fecha.weekday())
+    if granularidad == "mes":
+        return fecha.replace(day=1)
+    if granularidad == "anio":
+        return date(fecha.year, 1, 1)
+    return fecha
+
+
+def _siguiente_periodo(inicio, granularidad):
+    if granularidad == "semana":
+        return inicio + timedelta(days=7)
+    if granularidad == "mes":
+        if inicio.month == 12:
+            return date(inicio.year + 1, 1, 1)
+        return date(inicio.year, inicio.month + 1, 1)
+    if granularidad == "anio":
+        return date(inicio.year + 1, 1, 1)
+    return inicio + timedelta(days=1)
+
+
+def series_de_totales(granularidades, desde=None, hasta=None, tipo=None, metodo=None):
+    """
+    { granularidad: [ {periodo, total, cantidad}, ... ] } para cada
+    granularidad pedida, con todos los períodos entre desde y hasta
+    (los vacíos en 0).
+
+    Una sola consulta (GROUP BY día sobre el resumen diario); semanas,
+    meses y años se agrupan acá a partir de esos días.
+    Sin `desde` arranca en el primer día con datos; sin `hasta`, hoy.
+    El resultado pasa por el cache de reportes (ver más abajo).
+    """
+    hasta = hasta or timezone.localdate()
+    clave = _clave_reporte(
+        "series", desde, hasta, sorted(granularidades), tipo, metodo,
+    )
+    series = cache.get(clave)
+    if series is None:
+        series = _calcular_series(granularidades, desde, hasta, tipo, metodo)
+        cache.set(clave, series, _ttl_reporte(hasta))
+    return series
+
+
+def _calcular_series(granularidades, desde, hasta, tipo, metodo):
+    filas = list(
+        filas_resumen_diario(tipo, desde, hasta, metodo)
+        .values("rdc_fecha")
+        .annotate(total=Sum("rdc_total"), cantidad=Sum("rdc_cantidad"))
+        .order_by("rdc_fecha")
+    )
+
+    if desde is None:
+        desde = filas[0]["rdc_fecha"] if filas else hasta
+
+    series = {}
+    for granularidad in granularidades:
+        acumulado = {}
+        for f in filas:
+            clave = inicio_de_periodo(f["rdc_fecha"], granularidad)
+            total, cantidad = acumulado.get(clave, (Decimal("0"), 0))
+            acumulado[clave] = (total + (f["total"] or 0), cantidad + (f["cantidad"] or 0))
+
+        serie = []
+        periodo = inicio_de_periodo(desde, granularidad)
+        while periodo <= hasta:
+            total, cantidad = acumulado.get(periodo, (Decimal("0"), 0))
+            serie.append({"periodo": periodo, "total": total, "cantidad": cantidad})
+            periodo = _siguiente_periodo(periodo, granularidad)
+        series[granularidad] = serie
+
+    return series
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Cache de reportes
+# ──────────────────────────────────────────────────────────────────────────────
+# Cada mes tiene un número de versión en el cache; la clave de un reporte
+# incluye las versiones de los meses que cubre. Un movimiento nuevo (o
+# editado / borrado) cambia la versión de su mes, así que solo se recalculan
+# los reportes que lo incluyen. Los rangos sin `desde` usan la versión "todo",
+# que cambia con cualquier movimiento. Las versiones se comparten entre
+# workers si el backend es compartido (archivo, memcached, ...; ver CACHES
+# en settings); con locmem cada proceso tiene las suyas y el TTL es lo que
+# acota cuánto puede durar un reporte viejo en otro worker.
+TTL_REPORTES = getattr(settings, "CAJA_REPORTES_TTL", 60)
+TTL_REPORTES_CERRADOS = getattr(settings, "CAJA_REPORTES_CERRADOS_TTL", 3600)
+CLAVE_VERSION_REPORTES = "caja:reportes:v:{}"
+# Más meses que esto en un rango → se usa la versión "todo"
+_MAX_MESES_CON_VERSION = 36
+
+
+def _incrementar_version(clave):
+    # Valor inicial por tiempo: si el cache descarta la clave, la versión
+    # nueva no coincide con ninguna anterior
+    if not cache.add(clave, time.time_ns(), None):
+        try:
+            cache.incr(clave)
+        except ValueError:
+            cache.set(clave, time.time_ns(), None)
+
+
+def invalidar_reportes(fecha=None):
+    """Invalida los reportes que incluyen `fecha` (sin fecha: todos)."""
+    _incrementar_version(CLAVE_VERSION_REPORTES.format("todo"))
+    if fecha is None:
+        _incrementar_version(CLAVE_VERSION_REPORTES.format("generacion"))
+    else:
+        _incrementar_version(CLAVE_VERSION_REPORTES.format(f"{fecha:%Y-%m}"))
+
+
+def _meses_del_rango(desde, hasta):
+    meses = []
+    mes = desde.replace(day=1)
+    while mes <= hasta and len(meses) <= _MAX_MESES_CON_VERSION:
+        meses.append(f"{mes:%Y-%m}")
+        mes = _siguiente_periodo(mes, "mes")
+    return meses
+
+
+def _versiones(nombres):
+    claves = [CLAVE_VERSION_REPORTES.format(n) for n in nombres]
+    valores = cache.get_many(claves)
+    for clave in claves:
+        if clave not in valores:
+            cache.add(clave, time.time_ns(), None)
+            valores[clave] = cache.get(clave)
+    return [valores[clave] for clave in claves]
+
+
+def _clave_reporte(nombre, desde, hasta, *params):
+    meses = _meses_del_rango(desde, hasta) if desde else []
+    if not desde or len(meses) > _MAX_MESES_CON_VERSION:
+        meses = ["todo"]
+    versiones = _versiones(["generacion", *meses])
+    firma = repr((desde, hasta, params, versiones)).encode()
+    return f"caja:reporte:{nombre}:{hashlib.sha1(firma).hexdigest()}"
+
+
+def _ttl_reporte(hasta):
+    """Rango ya cerrado (termina antes de hoy) → TTL largo, pero acotado."""
+    return TTL_REPORTES_CERRADOS if hasta < timezone.localdate() else TTL_REPORTES
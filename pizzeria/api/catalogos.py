@@ -0,0 +1,249 @@
+# api/catalogos.py
+"""
+Catálogos chicos (estados, tipos, métodos de pago) en memoria.
+
+- ESTADO_PEDIDO / TIPO_MOV_CAJA / METODO_PAGO: ids fijos que usa el código.
+  Al cargar cada catálogo se comparan con los nombres de la base y se avisa
+  (log) si no coinciden.
+- por_id / por_nombre / filas: cada tabla se lee una vez por proceso (en el
+  primer uso) y después se responde desde memoria.
+- Guardar / borrar una fila de estos modelos (señales conectadas en
+  PizzeriaConfig.ready) recarga el catálogo en este proceso y sube su
+  versión en el cache de Django. Cada CATALOGOS_TTL segundos se compara la
+  versión cargada con la del cache: con un backend compartido (CACHES en
+  settings) así se enteran los otros workers; con locmem cada proceso ve
+  solo sus propios cambios.
+- La versión es un contador (sirve de ETag en CatalogoCacheadoMixin); la
+  hora del último cambio se guarda aparte para Last-Modified.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from pizzeria.models import (
+    CargoEmpleados, CategoriaPlatos, CategoriaProveedores, EstadoCompra,
+    EstadoEmpleados, EstadoInsumos, EstadoMesas, EstadoPedidos, EstadoPlatos,
+    EstadoProveedores, EstadoReceta, EstadoVentas, MetodoDePago,
+    TipoMovimientoCaja, TipoPedidos,
+)
+
+logger = logging.getLogger(__name__)
+
+
+ESTADO_PEDIDO = {
+    "EN_PROCESO": 1,
+    "ENTREGADO":  2,
+    "CANCELADO":  3,
+    "FINALIZADO": 4,
+}
+
+TIPO_MOV_CAJA = {
+    "APERTURA": 1,
+    "INGRESO":  2,
+    "EGRESO":   3,
+    "CIERRE":   4,
+}
+
+METODO_PAGO = {
+    "EFECTIVO":      1,
+    "TARJETA":       2,
+    "TRANSFERENCIA": 3,
+}
+
+# nombre del catálogo → (modelo, campo con el nombre)
+CATALOGOS = {
+    "estado_pedido":    (EstadoPedidos, "estped_nombre"),
+    "tipo_movimiento":  (TipoMovimientoCaja, "tmovc_nombre"),
+    "metodo_pago":      (MetodoDePago, "metpag_nombre"),
+    "estado_venta":     (EstadoVentas, "estven_nombre"),
+    "estado_compra":    (EstadoCompra, "estcom_nombre"),
+    "estado_mesa":      (EstadoMesas, "estms_nombre"),
+    "estado_plato":     (EstadoPlatos, "estplt_nombre"),
+    "estado_insumo":    (EstadoInsumos, "estins_nombre"),
+    "estado_empleado":  (EstadoEmpleados, "estemp_nombre"),
+    "estado_proveedor": (EstadoProveedores, "estprov_nombre"),
+    "estado_receta":    (EstadoReceta, "estrec_nombre"),
+    "tipo_pedido":      (TipoPedidos, "tipped_nombre"),
+    "cargo":            (CargoEmpleados, "carg_nombre"),
+    "categoria_plato":  (CategoriaPlatos, "catplt_nombre"),
+    "categoria_proveedor": (CategoriaProveedores, "catprov_nombre"),
+}
+
+# Ids fijos del código que se validan contra la base al cargar
+_IDS_FIJOS = {
+    "estado_pedido":   ESTADO_PEDIDO,
+    "tipo_movimiento": TIPO_MOV_CAJA,
+    "metodo_pago":     METODO_PAGO,
+}
+
+TTL_CATALOGOS = getattr(settings, "CATALOGOS_TTL", 30)
+# Segundos que CatalogoCacheadoMixin guarda una respuesta (la clave ya lleva la versión)
+TTL_RESPUESTAS = getattr(settings, "CATALOGOS_RESPUESTAS_TTL", 300)
+CLAVE_VERSION = "catalogos:v:{}"
+CLAVE_MODIFICADO = "catalogos:modificado:{}"
+
+# { catalogo: {"filas": {id: obj}, "nombres": {nombre: obj}, "version": int, "revisado": monotonic} }
+_cargados = {}
+
+
+def normalizar(nombre):
+    """'En_Proceso ' → 'en proceso' (así se comparan los nombres)."""
+    return (nombre or "").strip().lower().replace("_", " ")
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Versión (compartida entre procesos vía cache)
+# ──────────────────────────────────────────────────────────────────────────────
+def _valor_inicial(clave, valor):
+    """El de la clave; si no está, `valor` (cache.add: si dos lo crean a la vez gana uno)."""
+    actual = cache.get(clave)
+    if actual is None:
+        cache.add(clave, valor, None)
+        actual = cache.get(clave)
+    return actual
+
+
+def version(catalogo):
+    """Número de versión del catálogo; cambia con cada modificación."""
+    # Valor inicial por tiempo: si el cache pierde la clave no se repite
+    return _valor_inicial(CLAVE_VERSION.format(catalogo), time.time_ns())
+
+
+def modificado(catalogo):
+    """
+    Segundo (epoch) del último cambio, para Last-Modified. None mientras
+    ese segundo no terminó: otro cambio en el mismo segundo tendría el mismo
+    Last-Modified y un If-Modified-Since daría 304 con datos viejos.
+    """
+    # Sin dato (cache nuevo / clave descartada) se toma "ahora": nunca da un 304 de más
+    cambio = int(_valor_inicial(CLAVE_MODIFICADO.format(catalogo), time.time()))
+    return cambio if cambio < int(time.time()) else None
+
+
+def _subir_version(catalogo):
+    # incr es atómico en memcached / redis; en locmem / archivo dos subidas
+    # simultáneas pueden quedar en una, pero la versión igual cambia
+    clave = CLAVE_VERSION.format(catalogo)
+    if not cache.add(clave, time.time_ns(), None):
+        try:
+            cache.incr(clave)
+        except ValueError:
+            cache.set(clave, time.time_ns(), None)
+    cache.set(CLAVE_MODIFICADO.format(catalogo), time.time(), None)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Carga
+# ──────────────────────────────────────────────────────────────────────────────
+def _validar_ids_fijos(catalogo, nombres_por_id):
+    for nombre, pk in _IDS_FIJOS.get(catalogo, {}).items():
+        en_base = nombres_por_id.get(pk)
+        if en_base is None:
+            logger.warning("Catálogo %s: falta el id %s (%s) que usa el código.", catalogo, pk, nombre)
+        elif normalizar(en_base) != normalizar(nombre):
+            logger.warning(
+                "Catálogo %s: el id %s es '%s' en la base pero el código lo usa como %s.",
+                catalogo, pk, en_base, nombre,
+            )
+
+
+def _cargar(catalogo):
+    modelo, campo = CATALOGOS[catalogo]
+    ver = version(catalogo)
+    filas = {obj.pk: obj for obj in modelo.objects.order_by("pk")}
+    _validar_ids_fijos(catalogo, {pk: getattr(obj, campo) for pk, obj in filas.items()})
+    _cargados[catalogo] = {
+        "filas": filas,
+        "nombres": {normalizar(getattr(obj, campo)): obj for obj in filas.values()},
+        "version": ver,
+        "revisado": time.monotonic(),
+    }
+    return _cargados[catalogo]
+
+
+def _catalogo(catalogo):
+    datos = _cargados.get(catalogo)
+    if datos is None:
+        return _cargar(catalogo)
+    ahora = time.monotonic()
+    if ahora - datos["revisado"] > TTL_CATALOGOS:
+        if version(catalogo) != datos["version"]:
+            return _cargar(catalogo)
+        datos["revisado"] = ahora
+    return datos
+
+
+def recargar(catalogo=None):
+    """Descarta lo cargado (uno o todos); se vuelve a leer en el próximo uso."""
+    if catalogo is None:
+        _cargados.clear()
+    else:
+        _cargados.pop(catalogo, None)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Consultas
+# ──────────────────────────────────────────────────────────────────────────────
+def filas(catalogo):
+    """Lista de objetos del catálogo, ordenada por id."""
+    return list(_catalogo(catalogo)["filas"].values())
+
+
+def por_id(catalogo, pk):
+    """Objeto por id, o None. Un id desconocido relee la tabla una vez."""
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    obj = _catalogo(catalogo)["filas"].get(pk)
+    if obj is None:
+        obj = _cargar(catalogo)["filas"].get(pk)
+    return obj
+
+
+def por_nombre(catalogo, nombre):
+    """Objeto por nombre (sin distinguir mayúsculas ni '_' / ' '), o None."""
+    return _catalogo(catalogo)["nombres"].get(normalizar(nombre))
+
+
+def id_de(catalogo, nombre):
+    obj = por_nombre(catalogo, nombre)
+    return obj.pk if obj else None
+
+
+def obtener_o_crear(catalogo, nombre):
+    """Como por_nombre, pero crea la fila si no existe."""
+    obj = por_nombre(catalogo, nombre)
+    if obj is None:
+        modelo, campo = CATALOGOS[catalogo]
+        obj = modelo.objects.filter(**{f"{campo}__iexact": nombre}).first()
+        if obj is None:
+            obj = modelo.objects.create(**{campo: nombre})
+        recargar(catalogo)
+    return obj
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Señales
+# ──────────────────────────────────────────────────────────────────────────────
+def _catalogo_cambiado(catalogo):
+    recargar(catalogo)
+    _subir_version(catalogo)
+
+
+def _al_cambiar(sender, **kwargs):
+    # Después del commit: nadie puede leer (y cachear) datos viejos con la versión nueva
+    for catalogo, (modelo, _campo) in CATALOGOS.items():
+        if modelo is sender:
+            transaction.on_commit(lambda c=catalogo: _catalogo_cambiado(c))
+
+
+def conectar_senales():
+    """Llamar desde PizzeriaConfig.ready()."""
+    for catalogo, (modelo, _campo) in CATALOGOS.items():
+        post_save.connect(_al_cambiar, sender=modelo, dispatch_uid=f"catalogos:{catalogo}:save")
+        post_delete.connect(_al_cambiar, sender=modelo, dispatch_uid=f"catalogos:{catalogo}:delete")
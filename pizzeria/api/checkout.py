@@ -0,0 +1,192 @@
+# api/checkout.py
+"""
+Cobro de pedidos: pedido → venta → detalles → ingreso en caja.
+
+- generar_venta(pedido): venta "Pendiente" a partir del pedido (sin caja).
+- cobrar_y_finalizar(pedido, id_metodo_pago, id_estado_final): cierra el
+  pedido, libera sus reservas, genera la venta y registra el ingreso.
+- Los dos comparten el mismo camino (_items_del_pedido → _crear_venta) y
+  corren en UNA transacción con una cantidad fija de sentencias: los
+  detalles van en un solo INSERT y los catálogos (estados de venta, métodos
+  de pago) salen del registro en memoria de api/catalogos.py.
+- respuesta_venta(venta, detalles): venta + detalles serializados desde
+  memoria (sin volver a leerlos).
+- Errores de validación → CobroInvalido (la vista responde 400).
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+
+from pizzeria.models import DetalleVentas, MovimientosCaja, Ventas
+
+from . import caja, catalogos, stock
+from .catalogos import TIPO_MOV_CAJA
+from .serializers import DetalleVentaSerializer, VentaSerializer
+
+
+class CobroInvalido(Exception):
+    """El pedido no se puede cobrar; el mensaje va tal cual en la respuesta."""
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Catálogos (registro en memoria, ver api/catalogos.py)
+# ──────────────────────────────────────────────────────────────────────────────
+def estado_venta(nombre=None):
+    """EstadoVentas por nombre (se crea si falta) o, sin nombre, el de menor id."""
+    if nombre:
+        return catalogos.obtener_o_crear("estado_venta", nombre)
+    estados = catalogos.filas("estado_venta")
+    return estados[0] if estados else None
+
+
+def metodo_pago(id_metodo_pago):
+    """MetodoDePago por id, o None si no existe."""
+    return catalogos.por_id("metodo_pago", id_metodo_pago)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Pipeline
+# ──────────────────────────────────────────────────────────────────────────────
+def _items_del_pedido(pedido, precio_obligatorio):
+    """
+    [(plato, precio, cantidad)] y total del pedido. Usa los detalles ya
+    precargados (PedidoViewSet los trae con prefetch) o los lee en 2 consultas.
+    """
+    prefetch_related_objects([pedido], "detallepedidos_set__id_plato")
+    detalles = list(pedido.detallepedidos_set.all())
+    if not detalles:
+        raise CobroInvalido("El pedido no tiene ítems.")
+
+    total = Decimal("0.00")
+    items = []
+    for det in detalles:
+        plato = det.id_plato
+        if plato.plt_precio is None and precio_obligatorio:
+            raise CobroInvalido(f"El plato '{plato.plt_nombre}' no tiene precio definido.")
+        precio = Decimal(str(plato.plt_precio or 0))
+        cantidad = int(det.detped_cantidad or 0)
+        if cantidad <= 0:
+            raise CobroInvalido(f"Cantidad inválida en detalle {det.pk}: {cantidad}.")
+        total += (precio * cantidad).quantize(Decimal("0.01"))
+        items.append((plato, precio, cantidad))
+    return items, total
+
+
+def crear_detalles_venta(venta, items):
+    """
+    items: lista de (plato, precio_unitario, cantidad).
+    Inserta todos los detalles con un solo INSERT (bulk_create); detven_subtotal
+    es columna generada en la base, así que no se envía y se completa en memoria.
+    """
+    detalles = [
+        DetalleVentas(
+            id_venta=venta,
+            id_plato=plato,
+            detven_precio_uni=precio,
+            detven_cantidad=cantidad,
+        )
+        for plato, precio, cantidad in items
+    ]
+    DetalleVentas.objects.bulk_create(detalles)
+
+    # MySQL no devuelve los ids de un INSERT de varias filas: se leen en una
+    # consulta (id_venta + id_plato es único)
+    if any(d.pk is None for d in detalles):
+        ids = dict(
+            DetalleVentas.objects
+            .filter(id_venta=venta.pk)
+            .values_list("id_plato_id", "id_detalle_venta")
+        )
+        for d in detalles:
+            d.pk = ids.get(d.id_plato_id)
+
+    for d in detalles:
+        d.detven_subtotal = (d.detven_precio_uni * Decimal(d.detven_cantidad)).quantize(Decimal("0.01"))
+    return detalles
+
+
+def _crear_venta(pedido, items, total, **campos):
+    # FKs como objetos (ya en memoria): el serializer no vuelve a buscarlas
+    venta = Ventas.objects.create(
+        id_cliente_id=pedido.id_cliente_id,
+        id_empleado=pedido.id_empleado,
+        ven_monto=total,
+        **campos,
+    )
+    if pedido.id_cliente_id:
+        venta.id_cliente = pedido.id_cliente
+    return venta, crear_detalles_venta(venta, items)
+
+
+@transaction.atomic
+def generar_venta(pedido):
+    """Venta en estado "Pendiente" con los ítems del pedido. Devuelve (venta, detalles)."""
+    if not pedido.id_cliente_id:
+        raise CobroInvalido("El pedido no tiene cliente asignado.")
+    if not pedido.id_empleado_id:
+        raise CobroInvalido("El pedido no tiene empleado asignado.")
+
+    items, total = _items_del_pedido(pedido, precio_obligatorio=False)
+
+    return _crear_venta(
+        pedido, items, total,
+        id_estado_venta=estado_venta("Pendiente"),
+        ven_fecha_hora=pedido.ped_fecha_hora_fin or pedido.ped_fecha_hora_ini or timezone.now(),
+        ven_descripcion=f"Venta generada automáticamente del pedido #{pedido.id_pedido}",
+    )
+
+
+@transaction.atomic
+def cobrar_y_finalizar(pedido, id_metodo_pago, id_estado_final):
+    """
+    Cierra el pedido (id_estado_final), libera sus reservas, genera la venta
+    y registra el ingreso en caja. Devuelve (venta, detalles).
+    """
+    metodo = metodo_pago(id_metodo_pago)
+    if metodo is None:
+        raise CobroInvalido("Método de pago inválido.")
+
+    items, total = _items_del_pedido(pedido, precio_obligatorio=True)
+
+    # Cerrar pedido
+    ahora = timezone.now()
+    pedido.id_estado_pedido_id = id_estado_final
+    pedido.ped_fecha_hora_fin = ahora
+    pedido.save(update_fields=["id_estado_pedido", "ped_fecha_hora_fin"])
+    stock.liberar_reservas(pedido.id_pedido)
+
+    venta, detalles = _crear_venta(
+        pedido, items, total,
+        id_estado_venta=estado_venta(),
+        id_metodo_pago=metodo,
+        ven_fecha_hora=ahora,
+        ven_descripcion=f"Venta de pedido #{pedido.id_pedido}",
+    )
+
+    # Movimiento de Caja (Ingreso)
+    mov = MovimientosCaja.objects.create(
+        id_empleado_id=pedido.id_empleado_id,
+        id_metodo_pago=metodo,
+        id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["INGRESO"],
+        id_venta=venta,
+        mv_monto=venta.ven_monto,
+        mv_descripcion=f"Ingreso por venta #{venta.id_venta}",
+        mv_fecha_hora=ahora,
+    )
+    caja.registrar_movimiento(mov)
+
+    return venta, detalles
+
+
+def respuesta_venta(venta, detalles):
+    """Cabecera + detalles serializados sin volver a consultar la base."""
+    # Precarga de venta.detalleventas_set con los objetos ya creados
+    relacion = DetalleVentas._meta.get_field("id_venta").remote_field
+    clave = getattr(relacion, "cache_name", None) or relacion.get_cache_name()
+    venta._prefetched_objects_cache = {clave: detalles}
+
+    data = VentaSerializer(venta).data
+    data["detalles"] = DetalleVentaSerializer(detalles, many=True).data
+    return data
@@ -0,0 +1,81 @@
+# api/pagination.py
+"""
+Paginación de los listados de la API.
+
+- Es OPT-IN: si el request no trae ?page / ?page_size / ?cursor, el
+  listado sale como antes (lista plana), así el frontend actual no cambia.
+- ?page_size tiene un tope (API_MAX_PAGE_SIZE en settings).
+- Pedidos y movimientos de caja (tablas que solo crecen) aceptan cursor
+  por clave (?cursor=... o ?paginacion=cursor): la página N cuesta lo
+  mismo que la página 1 porque no usa OFFSET.
+"""
+from django.conf import settings
+from rest_framework.pagination import (
+    BasePagination, CursorPagination, PageNumberPagination,
+)
+
+
+PAGE_SIZE_DEFAULT = settings.REST_FRAMEWORK.get("PAGE_SIZE") or 50
+MAX_PAGE_SIZE = getattr(settings, "API_MAX_PAGE_SIZE", 1000)
+
+
+class PaginacionOpcional(PageNumberPagination):
+    """
+    ?page=N&page_size=M → { count, next, previous, results }.
+    Sin esos parámetros no pagina.
+    """
+    page_size = PAGE_SIZE_DEFAULT
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.page_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class _CursorPorClave(CursorPagination):
+    page_size = PAGE_SIZE_DEFAULT
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
+
+
+class PaginacionConCursor(BasePagination):
+    """
+    Igual que PaginacionOpcional, pero con ?cursor / ?paginacion=cursor
+    usa keyset sobre `ordering` (definido en cada subclase).
+    """
+    ordering = "-pk"
+
+    def __init__(self):
+        self._paginador = None
+
+    def _elegir(self, request):
+        params = request.query_params
+        if "cursor" in params or params.get("paginacion") == "cursor":
+            paginador = _CursorPorClave()
+            paginador.ordering = self.ordering
+            return paginador
+        return PaginacionOpcional()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self._paginador = self._elegir(request)
+        return self._paginador.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self._paginador.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return PaginacionOpcional().get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self._paginador.to_html() if self._paginador else ""
+
+
+class CursorPedidos(PaginacionConCursor):
+    ordering = ("-id_pedido",)
+
+
+class CursorMovimientosCaja(PaginacionConCursor):
+    ordering = ("-mv_fecha_hora", "-id_movimiento_caja")
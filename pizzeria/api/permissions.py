@@ -1,11 +1,21 @@
 # api/permissions.py  (ajustá la ruta según tu app)
 
+import re
+
 from rest_framework.permissions import BasePermission
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
 from pizzeria.models import Empleados
 
 User = get_user_model()
 
+# Roles resueltos por usuario: { "mozo": bool, "cajero": bool }
+CLAVE_ROLES = "pizzeria:roles:{}"
+# Tope por si un cambio de cargo / grupos no pasó por invalidar_roles
+# (admin de Django, SQL directo)
+TTL_ROLES = 60
+
 
 def _get_empleado_de_user(user):
     """
@@ -27,25 +37,70 @@ def _get_empleado_de_user(user):
     return emp
 
 
-def _es_mozo(user):
+def _resolver_roles(user):
     """
-    Devuelve True si el usuario tiene cargo Mozo,
-    ya sea por Group o por el cargo del empleado.
+    Calcula los roles contra la base: UNA consulta de groups y UNA de
+    Empleados (con el cargo en el mismo JOIN).
+    """
+    grupos = {n.strip().lower() for n in user.groups.values_list("name", flat=True)}
+
+    emp = (
+        Empleados.objects
+        .select_related("id_cargo_emp")
+        .filter(usuario=user)
+        .first()
+    )
+    cargo = getattr(emp, "id_cargo_emp", None) if emp else None
+    nombre_cargo = (getattr(cargo, "carg_nombre", "") or "").strip().lower()
+
+    return {
+        "mozo": "mozo" in grupos or nombre_cargo == "mozo",
+        "cajero": "cajero" in grupos or nombre_cargo == "cajero",
+    }
+
+
+def roles_de_usuario(user):
+    """
+    Roles del usuario con dos niveles de caché:
+    - en el propio objeto user (dura lo que dura el request);
+    - en el cache de Django por TTL_ROLES (sirve igual para sesión y JWT).
     """
     if not user or not user.is_authenticated:
-        return False
+        return {"mozo": False, "cajero": False}
 
-    # Por grupo de Django
-    if user.groups.filter(name__iexact="mozo").exists():
-        return True
+    roles = getattr(user, "_roles_pizzeria", None)
+    if roles is not None:
+        return roles
 
-    # Por cargo del empleado vinculado
-    emp = _get_empleado_de_user(user)
-    if not emp or not getattr(emp, "id_cargo_emp", None):
-        return False
+    clave = CLAVE_ROLES.format(user.pk)
+    roles = cache.get(clave)
+    if roles is None:
+        roles = _resolver_roles(user)
+        cache.set(clave, roles, TTL_ROLES)
+
+    user._roles_pizzeria = roles
+    return roles
 
-    nombre_cargo = (emp.id_cargo_emp.carg_nombre or "").strip().lower()
-    return nombre_cargo == "mozo"
+
+def invalidar_roles(user_id):
+    """
+    Llamar cuando cambian los groups / cargo / vínculo empleado-usuario.
+
+    Se borra ya y otra vez al confirmar la transacción: un request
+    concurrente pudo volver a cachear los roles viejos entre medio.
+    """
+    if user_id:
+        clave = CLAVE_ROLES.format(user_id)
+        cache.delete(clave)
+        transaction.on_commit(lambda: cache.delete(clave))
+
+
+def _es_mozo(user):
+    """
+    Devuelve True si el usuario tiene cargo Mozo,
+    ya sea por Group o por el cargo del empleado.
+    """
+    return roles_de_usuario(user)["mozo"]
 
 
 def _es_cajero(user):
@@ -53,20 +108,93 @@ def _es_cajero(user):
     Devuelve True si el usuario tiene cargo Cajero,
     ya sea por Group o por el cargo del empleado.
     """
-    if not user or not user.is_authenticated:
-        return False
+    return roles_de_usuario(user)["cajero"]
 
-    # Por grupo de Django
-    if user.groups.filter(name__iexact="cajero").exists():
-        return True
 
-    # Por cargo del empleado vinculado
-    emp = _get_empleado_de_user(user)
-    if not emp or not getattr(emp, "id_cargo_emp", None):
-        return False
+# =======================
+# Prefijos que usa el MOZO
+# =======================
+MOZO_PREFIXES = [
+    # Info del propio empleado
+    "/api/empleados/me",
 
-    nombre_cargo = (emp.id_cargo_emp.carg_nombre or "").strip().lower()
-    return nombre_cargo == "cajero"
+    # Pedidos y detalle de pedidos
+    "/api/pedidos",
+    "/api/pedido",
+    "/api/detalle-pedidos",
+
+    # Catálogos de tipo/estado de pedido
+    "/api/tipos-pedido",
+    "/api/estados-pedido",
+
+    # Clientes
+    "/api/clientes",
+
+    # Mesas y estados de mesa
+    "/api/mesas",
+    "/api/estado-mesas",
+    "/api/estados-mesa",
+
+    # Platos (para armar el pedido)
+    "/api/platos",
+
+    # Recetas (para validación de stock por receta)
+    "/api/recetas",
+    "/api/receta",
+    "/api/recetas-detalle",
+    "/api/detalle-recetas",
+
+    # Insumos (para validar stock de insumos)
+    "/api/insumos",
+    "/api/insumo",
+]
+
+# =====================
+# Extras del CAJERO (Mozo + Caja/Ventas/Compras)
+# =====================
+CAJERO_EXTRA_PREFIXES = [
+    # Caja (estado, abrir, cerrar, historial, ingresos, etc.)
+    "/api/caja",
+
+    # Movimientos de caja
+    "/api/movimientos-caja",
+    "/api/movimientos_caja",
+
+    # Métodos de pago
+    "/api/metodos-pago",
+    "/api/metodo-pago",
+
+    # Ventas y detalle de ventas
+    "/api/ventas",
+    "/api/venta",
+    "/api/detalle-ventas",
+    "/api/detalles-venta",
+
+    # Estados de venta (distintas variantes)
+    "/api/estado-ventas",
+    "/api/estado_ventas",
+    "/api/estados-venta",
+    "/api/estadosventa",
+
+    # Compras (para cobros de compras)
+    "/api/compras",
+    "/api/compra",
+    "/api/detalle-compras",
+    "/api/detalles-compra",
+
+    # Cobros (si en algún momento definís endpoints específicos)
+    "/api/cobros",
+    "/api/cobro",
+]
+
+
+def _compilar_prefijos(prefijos):
+    # Una sola regex anclada al inicio: equivale a any(path.startswith(p))
+    return re.compile("|".join(re.escape(p) for p in prefijos))
+
+
+_RUTAS_MOZO = _compilar_prefijos(MOZO_PREFIXES)
+_RUTAS_CAJERO = _compilar_prefijos(MOZO_PREFIXES + CAJERO_EXTRA_PREFIXES)
 
 
 class RolePermission(BasePermission):
@@ -101,122 +229,44 @@ class RolePermission(BasePermission):
     """
 
     def has_permission(self, request, view):
-        user = request.user
-
-        # Debe estar autenticado
-        if not user or not user.is_authenticated:
-            return False
-
-        # Admin / staff siempre pasan (Administrador puede hacer TODO)
-        if user.is_superuser or user.is_staff:
-            return True
-
-        es_mozo = _es_mozo(user)
-        es_cajero = _es_cajero(user)
-
-        # Si no es mozo ni cajero -> de momento sin restricciones extra
-        if not es_mozo and not es_cajero:
-            return True
-
-        path = (request.path or request.path_info or "").lower()
-
-        # =======================
-        # Prefijos que usa el MOZO
-        # =======================
-        mozo_prefixes = [
-            # Info del propio empleado
-            "/api/empleados/me",
-
-            # Pedidos y detalle de pedidos
-            "/api/pedidos",
-            "/api/pedido",
-            "/api/detalle-pedidos",
-
-            # Catálogos de tipo/estado de pedido
-            "/api/tipos-pedido",
-            "/api/estados-pedido",
-
-            # Clientes
-            "/api/clientes",
-
-            # Mesas y estados de mesa
-            "/api/mesas",
-            "/api/estado-mesas",
-            "/api/estados-mesa",
-
-            # Platos (para armar el pedido)
-            "/api/platos",
-
-            # Recetas (para validación de stock por receta)
-            "/api/recetas",
-            "/api/receta",
-            "/api/recetas-detalle",
-            "/api/detalle-recetas",
-
-            # Insumos (para validar stock de insumos)
-            "/api/insumos",
-            "/api/insumo",
-        ]
-
-        # ==============
-        # Lógica MOZO puro
-        # ==============
-        if es_mozo and not es_cajero:
-            for pref in mozo_prefixes:
-                if path.startswith(pref):
-                    return True
-            # Cualquier otro endpoint -> bloqueado para mozo
-            return False
-
-        # =====================
-        # Lógica CAJERO (Mozo + Caja/Ventas/Compras)
-        # =====================
-        if es_cajero:
-            cajero_extra_prefixes = [
-                # Caja (estado, abrir, cerrar, historial, ingresos, etc.)
-                "/api/caja",
-
-                # Movimientos de caja
-                "/api/movimientos-caja",
-                "/api/movimientos_caja",
-
-                # Métodos de pago
-                "/api/metodos-pago",
-                "/api/metodo-pago",
-
-                # Ventas y detalle de ventas
-                "/api/ventas",
-                "/api/venta",
-                "/api/detalle-ventas",
-                "/api/detalles-venta",
-
-                # Estados de venta (distintas variantes)
-                "/api/estado-ventas",
-                "/api/estado_ventas",
-                "/api/estados-venta",
-                "/api/estadosventa",
-
-                # Compras (para cobros de compras)
-                "/api/compras",
-                "/api/compra",
-                "/api/detalle-compras",
-                "/api/detalles-compra",
-
-                # Cobros (si en algún momento definís endpoints específicos)
-                "/api/cobros",
-                "/api/cobro",
-            ]
-
-            allowed_prefixes = mozo_prefixes + cajero_extra_prefixes
-
-            for pref in allowed_prefixes:
-                if path.startswith(pref):
-                    return True
-
-            # Si no matchea con ninguno, se bloquea para cajero
-            return False
-
-        # Caso raro de seguridad: si llegamos aquí, bloqueamos
+        path = request.path or request.path_info or ""
+        return puede_acceder(request.user, path)
+
+
+def puede_acceder(user, path):
+    """
+    Misma regla que RolePermission para una ruta cualquiera
+    (la usa /api/bootstrap/ para decidir qué secciones devolver).
+    """
+    # Debe estar autenticado
+    if not user or not user.is_authenticated:
         return False
 
+    # Admin / staff siempre pasan (Administrador puede hacer TODO)
+    if user.is_superuser or user.is_staff:
+        return True
+
+    roles = roles_de_usuario(user)
+    es_mozo = roles["mozo"]
+    es_cajero = roles["cajero"]
+
+    # Si no es mozo ni cajero -> de momento sin restricciones extra
+    if not es_mozo and not es_cajero:
+        return True
+
+    path = path.lower()
+
+    # ==============
+    # Lógica MOZO puro (cualquier otro endpoint -> bloqueado)
+    # ==============
+    if es_mozo and not es_cajero:
+        return _RUTAS_MOZO.match(path) is not None
+
+    # =====================
+    # Lógica CAJERO (Mozo + Caja/Ventas/Compras)
+    # =====================
+    if es_cajero:
+        return _RUTAS_CAJERO.match(path) is not None
 
+    # Caso raro de seguridad: si llegamos aquí, bloqueamos
+    return False
@@ -1,4 +1,5 @@
 import math
+from decimal import Decimal
 from rest_framework import serializers
 from django.core.validators import MinValueValidator
 from django.contrib.auth.models import User
@@ -14,8 +15,25 @@ from pizzeria.models import (
     EstadoMesas, EstadoVentas, DetalleVentas
 )
 from django.utils import timezone
+from .permissions import invalidar_roles
 
 User = get_user_model()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Campos de lectura
+# ──────────────────────────────────────────────────────────────────────────────
+# Los *_nombre se leen de la relación (source="fk.campo"): sin consultas
+# extra siempre que el ViewSet traiga esas FKs con select_related.
+# Sobre FKs que pueden ser NULL llevan default=None: sin él DRF omite la
+# clave en lugar de devolver null.
+class NombreEmpleadoField(serializers.ReadOnlyField):
+    """'Nombre Apellido' del empleado de la FK indicada en source (None si no hay)."""
+
+    def to_representation(self, empleado):
+        return f"{empleado.emp_nombre} {empleado.emp_apellido}".strip()
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Catálogos para selects
 # ──────────────────────────────────────────────────────────────────────────────
@@ -48,8 +66,8 @@ class CategoriaProveedorSerializer(serializers.ModelSerializer):
 # Empleados
 # ──────────────────────────────────────────────────────────────────────────────
 class EmpleadosSerializer(serializers.ModelSerializer):
-    cargo_nombre = serializers.SerializerMethodField(read_only=True)
-    estado_nombre = serializers.SerializerMethodField(read_only=True)
+    cargo_nombre = serializers.CharField(source="id_cargo_emp.carg_nombre", read_only=True)
+    estado_nombre = serializers.CharField(source="id_estado_empleado.estemp_nombre", read_only=True)
 
     username = serializers.CharField(
         write_only=True,
@@ -73,19 +91,6 @@ class EmpleadosSerializer(serializers.ModelSerializer):
             "username", "password",
         ]
 
-    # ───────── helpers de lectura ─────────
-    def get_cargo_nombre(self, obj):
-        cargo = getattr(obj, "id_cargo_emp", None)
-        if not cargo:
-            return None
-        return getattr(cargo, "carg_nombre", None) or str(cargo)
-
-    def get_estado_nombre(self, obj):
-        est = getattr(obj, "id_estado_empleado", None)
-        if not est:
-            return None
-        return getattr(est, "estemp_nombre", None) or str(est)
-
     # ───────── validación de username única (soporta update) ─────────
     def validate_username(self, v):
         v = (v or "").strip()
@@ -266,6 +271,9 @@ class EmpleadosSerializer(serializers.ModelSerializer):
 
         user.save()
 
+        # 5) el cargo/grupos pudieron cambiar → descartar roles cacheados
+        invalidar_roles(user.pk)
+
         return empleado
 
 
@@ -273,8 +281,8 @@ class EmpleadosSerializer(serializers.ModelSerializer):
 # Proveedores
 # ──────────────────────────────────────────────────────────────────────────────
 class ProveedorSerializer(serializers.ModelSerializer):
-    estado_nombre = serializers.SerializerMethodField(read_only=True)
-    categoria_nombre = serializers.SerializerMethodField(read_only=True)
+    estado_nombre = serializers.CharField(source="id_estado_prov.estprov_nombre", read_only=True)
+    categoria_nombre = serializers.CharField(source="id_categoria_prov.catprov_nombre", read_only=True)
 
     class Meta:
         model = Proveedores
@@ -290,18 +298,6 @@ class ProveedorSerializer(serializers.ModelSerializer):
             "categoria_nombre",
         ]
 
-    def get_estado_nombre(self, obj):
-        try:
-            return obj.id_estado_prov.estprov_nombre
-        except Exception:
-            return None
-
-    def get_categoria_nombre(self, obj):
-        try:
-            return obj.id_categoria_prov.catprov_nombre
-        except Exception:
-            return None
-
     def validate(self, attrs):
         """
         Regla de negocio:
@@ -473,7 +469,7 @@ class EstadoMesasSerializer(serializers.ModelSerializer):
 
 class MesasSerializer(serializers.ModelSerializer):
     estado_mesa_nombre = serializers.CharField(
-        source="id_estado_mesa.estms_nombre", read_only=True
+        source="id_estado_mesa.estms_nombre", read_only=True, default=None
     )
     class Meta:
         model = Mesas
@@ -484,8 +480,8 @@ class MesasSerializer(serializers.ModelSerializer):
 # Platos y Recetas
 # ──────────────────────────────────────────────────────────────────────────────
 class PlatoSerializer(serializers.ModelSerializer):
-    categoria_nombre = serializers.SerializerMethodField(read_only=True)
-    estado_nombre = serializers.SerializerMethodField(read_only=True)
+    categoria_nombre = serializers.CharField(source="id_categoria_plato.catplt_nombre", read_only=True)
+    estado_nombre = serializers.CharField(source="id_estado_plato.estplt_nombre", read_only=True)
 
     class Meta:
         model = Platos
@@ -500,24 +496,12 @@ class PlatoSerializer(serializers.ModelSerializer):
             "estado_nombre",
         ]
 
-    def get_categoria_nombre(self, obj):
-        try:
-            return obj.id_categoria_plato.catplt_nombre
-        except Exception:
-            return None
-
-    def get_estado_nombre(self, obj):
-        try:
-            return obj.id_estado_plato.estplt_nombre
-        except Exception:
-            return None
-
 
 class DetalleRecetaSerializer(serializers.ModelSerializer):
     id_receta = serializers.PrimaryKeyRelatedField(queryset=Recetas.objects.all(), write_only=True)
     id_insumo = serializers.PrimaryKeyRelatedField(queryset=Insumos.objects.all())
-    insumo_nombre = serializers.SerializerMethodField(read_only=True)
-    insumo_unidad = serializers.SerializerMethodField(read_only=True)
+    insumo_nombre = serializers.CharField(source="id_insumo.ins_nombre", read_only=True)
+    insumo_unidad = serializers.CharField(source="id_insumo.ins_unidad", read_only=True)
 
     class Meta:
         model = DetalleRecetas
@@ -530,22 +514,10 @@ class DetalleRecetaSerializer(serializers.ModelSerializer):
             "insumo_unidad",
         ]
 
-    def get_insumo_nombre(self, obj):
-        try:
-            return obj.id_insumo.ins_nombre
-        except Exception:
-            return None
-
-    def get_insumo_unidad(self, obj):
-        try:
-            return obj.id_insumo.ins_unidad
-        except Exception:
-            return None
-
 
 class RecetaSerializer(serializers.ModelSerializer):
-    estado_nombre = serializers.SerializerMethodField(read_only=True)
-    plato_nombre = serializers.SerializerMethodField(read_only=True)
+    estado_nombre = serializers.CharField(source="id_estado_receta.estrec_nombre", read_only=True)
+    plato_nombre = serializers.CharField(source="id_plato.plt_nombre", read_only=True)
 
     class Meta:
         model = Recetas
@@ -558,24 +530,12 @@ class RecetaSerializer(serializers.ModelSerializer):
             "plato_nombre",
         ]
 
-    def get_estado_nombre(self, obj):
-        try:
-            return getattr(obj.id_estado_receta, "estrec_nombre", None)
-        except Exception:
-            return None
-
-    def get_plato_nombre(self, obj):
-        try:
-            return getattr(obj.id_plato, "plt_nombre", None)
-        except Exception:
-            return None
-
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Pedidos
 # ──────────────────────────────────────────────────────────────────────────────
 class DetallePedidoSerializer(serializers.ModelSerializer):
-    plato_nombre = serializers.SerializerMethodField(read_only=True)
+    plato_nombre = serializers.CharField(source="id_plato.plt_nombre", read_only=True)
 
     class Meta:
         model = DetallePedidos
@@ -587,23 +547,14 @@ class DetallePedidoSerializer(serializers.ModelSerializer):
             'detped_cantidad',
         ]
 
-    def get_plato_nombre(self, obj):
-        try:
-            plato = getattr(obj, 'id_plato', None) or getattr(obj, 'plato', None)
-            if plato:
-                return getattr(plato, 'plt_nombre', None) or getattr(plato, 'nombre', None)
-        except Exception:
-            pass
-        return None
-
 
 class PedidoSerializer(serializers.ModelSerializer):
     detalles = DetallePedidoSerializer(source="detallepedidos_set", many=True, read_only=True)
-    mesa_numero = serializers.SerializerMethodField(read_only=True)
-    empleado_nombre = serializers.SerializerMethodField(read_only=True)
-    cliente_nombre = serializers.SerializerMethodField(read_only=True)
-    estado_nombre = serializers.SerializerMethodField(read_only=True)
-    tipo_nombre = serializers.SerializerMethodField(read_only=True)
+    mesa_numero = serializers.IntegerField(source="id_mesa.ms_numero", read_only=True, default=None)
+    empleado_nombre = NombreEmpleadoField(source="id_empleado")
+    cliente_nombre = serializers.CharField(source="id_cliente.cli_nombre", read_only=True, default=None)
+    estado_nombre = serializers.CharField(source="id_estado_pedido.estped_nombre", read_only=True)
+    tipo_nombre = serializers.CharField(source="id_tipo_pedido.tipped_nombre", read_only=True)
     total = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
@@ -627,44 +578,17 @@ class PedidoSerializer(serializers.ModelSerializer):
             "detalles",
         ]
 
-    def get_mesa_numero(self, obj):
-        try:
-            return obj.id_mesa.ms_numero
-        except Exception:
-            return None
-
-    def get_empleado_nombre(self, obj):
-        try:
-            return f"{obj.id_empleado.emp_nombre} {obj.id_empleado.emp_apellido}".strip()
-        except Exception:
-            return None
-
-    def get_cliente_nombre(self, obj):
-        try:
-            return obj.id_cliente.cli_nombre
-        except Exception:
-            return None
-
-    def get_estado_nombre(self, obj):
-        try:
-            return obj.id_estado_pedido.estped_nombre
-        except Exception:
-            return None
-
-    def get_tipo_nombre(self, obj):
-        try:
-            return obj.id_tipo_pedido.tipped_nombre
-        except Exception:
-            return None
-
     def get_total(self, obj):
-        try:
-            total = 0.0
-            for d in obj.detallepedidos_set.select_related("id_plato").all():
-                precio = float(d.id_plato.plt_precio)
-                qty = int(d.detped_cantidad)
-                total += precio * qty
-            return total
+        # PedidoViewSet anota "total_pedido" (SUM en la base, Decimal)
+        try:
+            total = getattr(obj, "total_pedido", None)
+            if total is None:
+                # Instancia sin anotar (p.ej. recién creada): usamos los detalles
+                total = sum(
+                    (d.id_plato.plt_precio * d.detped_cantidad for d in obj.detallepedidos_set.all()),
+                    Decimal("0"),
+                )
+            return float(total)
         except Exception:
             return None
 
@@ -680,7 +604,7 @@ class EstadoCompraSerializer(serializers.ModelSerializer):
 
 class DetalleCompraSerializer(serializers.ModelSerializer):
     detcom_subtotal = serializers.SerializerMethodField(read_only=True)
-    insumo_nombre = serializers.SerializerMethodField(read_only=True)
+    insumo_nombre = serializers.CharField(source="id_insumo.ins_nombre", read_only=True)
 
     class Meta:
         model = DetalleCompra
@@ -700,18 +624,12 @@ class DetalleCompraSerializer(serializers.ModelSerializer):
         except Exception:
             return None
 
-    def get_insumo_nombre(self, obj):
-        try:
-            return obj.id_insumo.ins_nombre
-        except Exception:
-            return None
-
 
 class CompraSerializer(serializers.ModelSerializer):
-    empleado_nombre = serializers.SerializerMethodField(read_only=True)
-    estado_nombre   = serializers.SerializerMethodField(read_only=True)
-    proveedor_nombre = serializers.SerializerMethodField(read_only=True)
-    metodo_pago_nombre = serializers.SerializerMethodField(read_only=True)
+    empleado_nombre = NombreEmpleadoField(source="id_empleado")
+    estado_nombre   = serializers.CharField(source="id_estado_compra.estcom_nombre", read_only=True)
+    proveedor_nombre = serializers.CharField(source="id_proveedor.prov_nombre", read_only=True, default=None)
+    metodo_pago_nombre = serializers.CharField(source="id_metodo_pago.metpag_nombre", read_only=True, default=None)
 
     detalles = DetalleCompraSerializer(source="detallecompra_set", many=True, read_only=True)
 
@@ -734,31 +652,6 @@ class CompraSerializer(serializers.ModelSerializer):
             "com_pagado",
         ]
 
-    def get_empleado_nombre(self, obj):
-        try:
-            return f"{obj.id_empleado.emp_nombre} {obj.id_empleado.emp_apellido}".strip()
-        except Exception:
-            return None
-
-    def get_estado_nombre(self, obj):
-        try:
-            return obj.id_estado_compra.estcom_nombre
-        except Exception:
-            return None
-
-    def get_proveedor_nombre(self, obj):
-        try:
-            return obj.id_proveedor.prov_nombre
-        except Exception:
-            return None
-
-    def get_metodo_pago_nombre(self, obj):
-        try:
-            # IMPORTANTE: usar el nombre real del campo en tu tabla (nos dijiste "metpag_nombre")
-            return getattr(obj.id_metodo_pago, "metpag_nombre", None)
-        except Exception:
-            return None
-
 
 class ProveedorInsumoSerializer(serializers.ModelSerializer):
     id_proveedor = serializers.PrimaryKeyRelatedField(queryset=Proveedores.objects.all())
@@ -771,9 +664,9 @@ class ProveedorInsumoSerializer(serializers.ModelSerializer):
         allow_null=True
     )
 
-    proveedor_nombre = serializers.SerializerMethodField(read_only=True)
-    insumo_nombre    = serializers.SerializerMethodField(read_only=True)
-    insumo_unidad    = serializers.SerializerMethodField(read_only=True)
+    proveedor_nombre = serializers.CharField(source="id_proveedor.prov_nombre", read_only=True)
+    insumo_nombre    = serializers.CharField(source="id_insumo.ins_nombre", read_only=True)
+    insumo_unidad    = serializers.CharField(source="id_insumo.ins_unidad", read_only=True)
 
     class Meta:
         model  = ProveedoresXInsumos
@@ -787,24 +680,6 @@ class ProveedorInsumoSerializer(serializers.ModelSerializer):
             "insumo_unidad",
         ]
 
-    def get_proveedor_nombre(self, obj):
-        try:
-            return obj.id_proveedor.prov_nombre
-        except Exception:
-            return None
-
-    def get_insumo_nombre(self, obj):
-        try:
-            return obj.id_insumo.ins_nombre
-        except Exception:
-            return None
-
-    def get_insumo_unidad(self, obj):
-        try:
-            return obj.id_insumo.ins_unidad
-        except Exception:
-            return None
-
     def validate_precio_unitario(self, v):
         if v is not None and v < 0:
             raise serializers.ValidationError("El precio unitario no puede ser negativo.")
@@ -837,30 +712,7 @@ class EstadoVentaSerializer(serializers.ModelSerializer):
 
 class DetalleVentaSerializer(serializers.ModelSerializer):
     detven_subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
-    plato_nombre = serializers.SerializerMethodField()
-
-    class Meta:
-        model = DetalleVentas
-        fields = [
-            "id_detalle_venta",
-            "id_venta",
-            "id_plato",
-            "detven_precio_uni",
-            "detven_cantidad",
-            "detven_subtotal",
-        ]
-
-    def get_plato_nombre(self, obj):
-        # Intento robusto por si el nombre del campo del modelo Plato difiere
-        plato = getattr(obj, "id_plato", None)
-        if not plato:
-            return None
-        # Probar nombres comunes sin romper nada:
-        for attr in ("pla_nombre", "plato_nombre", "nombre", "pla_descripcion"):
-            val = getattr(plato, attr, None)
-            if val:
-                return val
-        return None
+    plato_nombre = serializers.CharField(source="id_plato.plt_nombre", read_only=True)
 
     class Meta:
         model = DetalleVentas
@@ -870,10 +722,10 @@ class DetalleVentaSerializer(serializers.ModelSerializer):
 
 
 class VentaSerializer(serializers.ModelSerializer):
-    metodo_pago_nombre = serializers.SerializerMethodField()
-    estado_venta_nombre = serializers.SerializerMethodField()
-    empleado_nombre = serializers.SerializerMethodField()
-    cliente_nombre = serializers.SerializerMethodField()
+    metodo_pago_nombre = serializers.CharField(source="id_metodo_pago.metpag_nombre", read_only=True, default=None)
+    estado_venta_nombre = serializers.CharField(source="id_estado_venta.estven_nombre", read_only=True)
+    empleado_nombre = NombreEmpleadoField(source="id_empleado")
+    cliente_nombre = serializers.CharField(source="id_cliente.cli_nombre", read_only=True, default=None)
     detalles = DetalleVentaSerializer(source="detalleventas_set", many=True, read_only=True)
 
     class Meta:
@@ -894,30 +746,6 @@ class VentaSerializer(serializers.ModelSerializer):
             "detalles",
         ]
 
-    def get_metodo_pago_nombre(self, obj):
-        try:
-            return getattr(obj.id_metodo_pago, "metpag_nombre", None)  # ← nombre real
-        except Exception:
-            return None
-
-    def get_estado_venta_nombre(self, obj):
-        try:
-            return getattr(obj.id_estado_venta, "estven_nombre", None)
-        except Exception:
-            return None
-
-    def get_empleado_nombre(self, obj):
-        try:
-            return f"{obj.id_empleado.emp_nombre} {obj.id_empleado.emp_apellido}".strip()
-        except Exception:
-            return None
-
-    def get_cliente_nombre(self, obj):
-        try:
-            return getattr(obj.id_cliente, "cli_nombre", None)
-        except Exception:
-            return None
-
 
 class VentaCreateSerializer(serializers.ModelSerializer):
     """
@@ -948,12 +776,11 @@ class VentaCreateSerializer(serializers.ModelSerializer):
 # ──────────────────────────────────────────────────────────────────────────────
 class MovimientoCajaSerializer(serializers.ModelSerializer):
     # Extras de sólo lectura para mostrar en listas
-    metodo_pago_nombre = serializers.SerializerMethodField()
-    tipo_nombre = serializers.SerializerMethodField()
-    empleado_nombre = serializers.SerializerMethodField()
-    venta_id = serializers.IntegerField(
-        source="id_venta.id_venta", read_only=True, default=None
-    )
+    metodo_pago_nombre = serializers.CharField(source="id_metodo_pago.metpag_nombre", read_only=True, default=None)
+    tipo_nombre = serializers.CharField(source="id_tipo_movimiento_caja.tmovc_nombre", read_only=True)
+    empleado_nombre = NombreEmpleadoField(source="id_empleado")
+    # Columna de la FK: no hace falta traer la venta
+    venta_id = serializers.IntegerField(source="id_venta_id", read_only=True)
     # Alias compatible con el antiguo "id_movimiento"
     id_movimiento = serializers.IntegerField(
         source="id_movimiento_caja", read_only=True
@@ -978,24 +805,6 @@ class MovimientoCajaSerializer(serializers.ModelSerializer):
             "venta_id",
         ]
 
-    def get_metodo_pago_nombre(self, obj):
-        try:
-            return getattr(obj.id_metodo_pago, "metpag_nombre", None)
-        except Exception:
-            return None
-
-    def get_tipo_nombre(self, obj):
-        try:
-            return getattr(obj.id_tipo_movimiento_caja, "tmovc_nombre", None)
-        except Exception:
-            return None
-
-    def get_empleado_nombre(self, obj):
-        try:
-            return f"{obj.id_empleado.emp_nombre} {obj.id_empleado.emp_apellido}".strip()
-        except Exception:
-            return None
-
 
 class MovimientosCajaCreateSerializer(serializers.ModelSerializer):
     """
@@ -0,0 +1,449 @@
+# api/stock.py
+"""
+Helpers de stock compartidos por los ViewSets de pedidos, platos y recetas.
+
+- Índice de recetas expandidas (plato → insumos por unidad) cacheado.
+- Libro de reservas por (pedido, insumo) para pedidos EN PROCESO.
+- Validación de stock de un pedido completo en UNA consulta agrupada.
+- Descuento atómico (UPDATE condicional) de platos e insumos.
+- Producción de platos en lote (un UPDATE para insumos y otro para platos).
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Sum, Value, When
+
+from pizzeria.models import (
+    DetallePedidos, DetalleRecetas, Insumos, Platos, Recetas, ReservaInsumos,
+)
+
+
+CLAVE_EXPANSION_RECETAS = "pizzeria:stock:expansion_recetas"
+# Red de seguridad por si una escritura no pasó por invalidar_expansion_recetas
+# (SQL directo, otra aplicación)
+TTL_EXPANSION_RECETAS = 60
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Índice de recetas expandidas
+# ──────────────────────────────────────────────────────────────────────────────
+def expansion_recetas():
+    """
+    Devuelve el índice { id_plato: [(id_insumo, detr_cant_unid), ...] }.
+
+    - Los platos SIN receta no aparecen en el índice.
+    - Los platos con receta pero SIN insumos aparecen con lista vacía.
+
+    Se arma con UNA sola consulta (recetas LEFT JOIN detalle_recetas) y queda
+    en caché hasta que RecetaViewSet / DetalleRecetaViewSet escriban.
+    """
+    indice = cache.get(CLAVE_EXPANSION_RECETAS)
+    if indice is not None:
+        return indice
+
+    indice = {}
+    filas = Recetas.objects.values_list(
+        "id_plato_id",
+        "detallerecetas__id_insumo_id",
+        "detallerecetas__detr_cant_unid",
+    )
+    for id_plato, id_insumo, cant_unid in filas:
+        lineas = indice.setdefault(id_plato, [])
+        if id_insumo is None:
+            continue
+        por_plato = Decimal(cant_unid or 0)
+        if por_plato <= 0:
+            continue
+        lineas.append((id_insumo, por_plato))
+
+    cache.set(CLAVE_EXPANSION_RECETAS, indice, TTL_EXPANSION_RECETAS)
+    return indice
+
+
+def invalidar_expansion_recetas():
+    """
+    Descarta el índice cacheado (llamar después de escribir recetas).
+
+    Se borra ya (este proceso ve su propia transacción) y otra vez al
+    confirmar: si otro worker rearmó el índice entre medio, lo hizo con las
+    recetas viejas.
+    """
+    cache.delete(CLAVE_EXPANSION_RECETAS)
+    transaction.on_commit(lambda: cache.delete(CLAVE_EXPANSION_RECETAS))
+
+
+def expandir_recetas(cantidades_por_plato, indice=None):
+    """
+    Convierte { id_plato: cantidad } en { id_insumo: total_necesario }.
+
+    Devuelve (totales, platos_sin_receta, platos_sin_insumos) para que
+    cada vista decida qué hacer con los platos que no se pueden producir.
+    """
+    if indice is None:
+        indice = expansion_recetas()
+
+    totales = {}
+    sin_receta = []
+    sin_insumos = []
+
+    for id_plato, cantidad in cantidades_por_plato.items():
+        cantidad = Decimal(cantidad or 0)
+        if cantidad <= 0:
+            continue
+
+        lineas = indice.get(id_plato)
+        if lineas is None:
+            sin_receta.append(id_plato)
+            continue
+        if not lineas:
+            sin_insumos.append(id_plato)
+            continue
+
+        for id_insumo, por_plato in lineas:
+            totales[id_insumo] = totales.get(id_insumo, Decimal("0")) + por_plato * cantidad
+
+    return totales, sin_receta, sin_insumos
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Libro de reservas (tabla reserva_insumos)
+# ──────────────────────────────────────────────────────────────────────────────
+def liberar_reservas(id_pedido):
+    """Borra las reservas de un pedido (ENTREGADO / CANCELADO / FINALIZADO / borrado)."""
+    ReservaInsumos.objects.filter(id_pedido_id=id_pedido).delete()
+
+
+def sincronizar_reservas(id_pedido, en_proceso):
+    """
+    Recalcula las reservas de UN pedido.
+
+    - Si está EN PROCESO: reserva detped_cantidad × receta de cada plato
+      (platos sin receta no reservan nada).
+    - Si no: libera todo lo que tuviera reservado.
+    """
+    liberar_reservas(id_pedido)
+    if not en_proceso:
+        return
+
+    filas = (
+        DetallePedidos.objects
+        .filter(id_pedido_id=id_pedido)
+        .values("id_plato")
+        .annotate(cant=Sum("detped_cantidad"))
+        .order_by()
+    )
+    cantidades = {f["id_plato"]: f["cant"] for f in filas}
+    totales, _, _ = expandir_recetas(cantidades)
+
+    ReservaInsumos.objects.bulk_create([
+        ReservaInsumos(id_pedido_id=id_pedido, id_insumo_id=id_insumo, resins_cantidad=total)
+        for id_insumo, total in totales.items()
+    ])
+
+
+def _armar_reservas(detalles):
+    """ReservaInsumos (sin guardar) de un QuerySet de DetallePedidos, en UNA consulta agrupada."""
+    indice = expansion_recetas()
+    filas = (
+        detalles
+        .values("id_pedido", "id_plato")
+        .annotate(cant=Sum("detped_cantidad"))
+        .order_by()
+    )
+
+    por_pedido = {}
+    for f in filas:
+        por_pedido.setdefault(f["id_pedido"], {})[f["id_plato"]] = f["cant"]
+
+    nuevas = []
+    for id_pedido, cantidades in por_pedido.items():
+        totales, _, _ = expandir_recetas(cantidades, indice)
+        nuevas.extend(
+            ReservaInsumos(id_pedido_id=id_pedido, id_insumo_id=id_insumo, resins_cantidad=total)
+            for id_insumo, total in totales.items()
+        )
+    return nuevas
+
+
+def reconstruir_reservas(id_estado_en_proceso):
+    """
+    Rehace el libro completo a partir de los pedidos EN PROCESO
+    (backfill inicial / manage.py reconstruir_reservas).
+    Devuelve la cantidad de filas generadas.
+    """
+    nuevas = _armar_reservas(
+        DetallePedidos.objects.filter(id_pedido__id_estado_pedido_id=id_estado_en_proceso)
+    )
+    with transaction.atomic():
+        ReservaInsumos.objects.all().delete()
+        ReservaInsumos.objects.bulk_create(nuevas, batch_size=1000)
+    return len(nuevas)
+
+
+def sincronizar_reservas_de_platos(ids_plato, id_estado_en_proceso):
+    """
+    Después de cambiar la receta de unos platos: recalcula SOLO los pedidos
+    EN PROCESO que los tienen (los demás no cambian). Devuelve cuántos pedidos tocó.
+    """
+    ids_plato = {pk for pk in ids_plato if pk is not None}
+    if not ids_plato:
+        return 0
+
+    ids_pedido = list(
+        DetallePedidos.objects
+        .filter(id_plato_id__in=ids_plato, id_pedido__id_estado_pedido_id=id_estado_en_proceso)
+        .values_list("id_pedido", flat=True)
+        .distinct()
+    )
+    if not ids_pedido:
+        return 0
+
+    nuevas = _armar_reservas(DetallePedidos.objects.filter(id_pedido_id__in=ids_pedido))
+    with transaction.atomic():
+        ReservaInsumos.objects.filter(id_pedido_id__in=ids_pedido).delete()
+        ReservaInsumos.objects.bulk_create(nuevas, batch_size=1000)
+    return len(ids_pedido)
+
+
+def reservado_por_insumo(ids_insumo, excluir_pedido=None):
+    """
+    { id_insumo: total reservado } SOLO para los insumos pedidos.
+    Lectura indexada sobre reserva_insumos: no depende de cuántos
+    pedidos abiertos haya.
+    """
+    ids_insumo = list(ids_insumo)
+    if not ids_insumo:
+        return {}
+
+    qs = ReservaInsumos.objects.filter(id_insumo_id__in=ids_insumo)
+    if excluir_pedido is not None:
+        qs = qs.exclude(id_pedido_id=excluir_pedido)
+
+    filas = qs.values("id_insumo").annotate(total=Sum("resins_cantidad")).order_by()
+    return {f["id_insumo"]: Decimal(f["total"] or 0) for f in filas}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Validación de stock de un pedido (una sola consulta)
+# ──────────────────────────────────────────────────────────────────────────────
+def faltantes_de_insumos(faltante_por_plato, excluir_pedido=None):
+    """
+    Recibe { id_plato: unidades a producir } (lo que NO sale del stock
+    del plato) y devuelve SOLO los insumos que no alcanzan:
+
+        [{"id_insumo", "ins_nombre", "ins_unidad",
+          "necesario", "disponible", "falta"}, ...]
+
+    "necesario" = unidades × receta + reservas de pedidos EN PROCESO
+    (excluyendo `excluir_pedido`, para la edición). Todo se resuelve en
+    la base con UN solo viaje: platos del pedido × detalle_recetas ×
+    insumos, más las reservas agrupadas por insumo.
+    """
+    filas_plato = [
+        (int(id_plato), Decimal(cant))
+        for id_plato, cant in faltante_por_plato.items()
+        if cant and Decimal(cant) > 0
+    ]
+    if not filas_plato:
+        return []
+
+    # Tabla derivada con las líneas del pedido (todavía no están en detalle_pedidos)
+    lineas_sql = " UNION ALL ".join(
+        ["SELECT %s AS id_plato, CAST(%s AS DECIMAL(14,3)) AS faltante"] * len(filas_plato)
+    )
+    params = [v for fila in filas_plato for v in fila]
+
+    filtro_reserva = ""
+    if excluir_pedido is not None:
+        filtro_reserva = "WHERE r.id_pedido <> %s"
+        params.append(int(excluir_pedido))
+
+    sql = f"""
+        SELECT i.id_insumo, i.ins_nombre, i.ins_unidad,
+               SUM(p.faltante * dr.detr_cant_unid) + COALESCE(res.reservado, 0) AS necesario,
+               COALESCE(i.ins_stock_actual, 0) AS disponible
+        FROM ({lineas_sql}) p
+        JOIN {Recetas._meta.db_table} re ON re.id_plato = p.id_plato
+        JOIN {DetalleRecetas._meta.db_table} dr ON dr.id_receta = re.id_receta
+        JOIN {Insumos._meta.db_table} i ON i.id_insumo = dr.id_insumo
+        LEFT JOIN (
+            SELECT r.id_insumo, SUM(r.resins_cantidad) AS reservado
+            FROM {ReservaInsumos._meta.db_table} r
+            {filtro_reserva}
+            GROUP BY r.id_insumo
+        ) res ON res.id_insumo = i.id_insumo
+        WHERE dr.detr_cant_unid > 0
+        GROUP BY i.id_insumo, i.ins_nombre, i.ins_unidad, i.ins_stock_actual, res.reservado
+        HAVING SUM(p.faltante * dr.detr_cant_unid) + COALESCE(res.reservado, 0)
+               > COALESCE(i.ins_stock_actual, 0)
+        ORDER BY i.id_insumo
+    """
+
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        filas = cur.fetchall()
+
+    faltantes = []
+    for id_insumo, nombre, unidad, necesario, disponible in filas:
+        necesario = Decimal(str(necesario or 0))
+        disponible = Decimal(str(disponible or 0))
+        faltantes.append({
+            "id_insumo": id_insumo,
+            "ins_nombre": nombre,
+            "ins_unidad": unidad,
+            "necesario": necesario,
+            "disponible": disponible,
+            "falta": max(necesario - disponible, Decimal("0")),
+        })
+    return faltantes
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Descuento de stock (UPDATE ... WHERE stock >= x)
+# ──────────────────────────────────────────────────────────────────────────────
+class StockInsuficiente(Exception):
+    """
+    Un UPDATE condicional no afectó filas: el stock no alcanzaba
+    (o cambió entre la validación y el descuento).
+    """
+    def __init__(self, tipo, nombre, unidad, necesario, disponible):
+        self.tipo = tipo              # "plato" | "insumo"
+        self.nombre = nombre
+        self.unidad = unidad
+        self.necesario = necesario
+        self.disponible = disponible
+        self.falta = max(Decimal(str(necesario)) - Decimal(str(disponible)), Decimal("0"))
+        super().__init__(
+            f"{tipo.capitalize()} insuficiente: {nombre}. "
+            f"Requiere {necesario} {unidad} y solo hay {disponible}."
+        )
+
+
+def descontar_stock(insumos=None, platos=None):
+    """
+    Descuenta { id_plato: unidades } y { id_insumo: cantidad } con un
+    UPDATE condicional por fila, sin SELECT ... FOR UPDATE previo:
+
+        UPDATE ... SET stock = stock - x WHERE id = ? AND stock >= x
+
+    - Si alguna fila no se actualiza → StockInsuficiente y se revierte
+      todo lo descontado en esta llamada (savepoint propio).
+    - Orden determinístico (platos y luego insumos, por id ascendente)
+      para que dos pedidos concurrentes no se bloqueen en cruz.
+    """
+    insumos = insumos or {}
+    platos = platos or {}
+
+    with transaction.atomic():
+        for id_plato in sorted(platos):
+            cantidad = int(platos[id_plato] or 0)
+            if cantidad <= 0:
+                continue
+            afectadas = (
+                Platos.objects
+                .filter(pk=id_plato, plt_stock__gte=cantidad)
+                .update(plt_stock=F("plt_stock") - cantidad)
+            )
+            if not afectadas:
+                plato = Platos.objects.filter(pk=id_plato).first()
+                raise StockInsuficiente(
+                    "plato",
+                    plato.plt_nombre if plato else id_plato,
+                    "unidad(es)",
+                    cantidad,
+                    plato.plt_stock if plato else 0,
+                )
+
+        for id_insumo in sorted(insumos):
+            cantidad = Decimal(insumos[id_insumo] or 0)
+            if cantidad <= 0:
+                continue
+            afectadas = (
+                Insumos.objects
+                .filter(pk=id_insumo, ins_stock_actual__gte=cantidad)
+                .update(ins_stock_actual=F("ins_stock_actual") - cantidad)
+            )
+            if not afectadas:
+                ins = Insumos.objects.filter(pk=id_insumo).first()
+                raise StockInsuficiente(
+                    "insumo",
+                    ins.ins_nombre if ins else id_insumo,
+                    ins.ins_unidad if ins else "",
+                    cantidad,
+                    Decimal(str(ins.ins_stock_actual or 0)) if ins else Decimal("0"),
+                )
+
+
+class _LoteRevertido(Exception):
+    """Interno: fuerza el rollback del UPDATE en bloque de producir_platos."""
+
+
+def _por_id(cantidades, campo_salida):
+    # CASE pk WHEN ... THEN cantidad ... END para UPDATE en bloque
+    return Case(
+        *[When(pk=pk, then=Value(cant)) for pk, cant in cantidades.items()],
+        default=Value(0),
+        output_field=campo_salida,
+    )
+
+
+def producir_platos(cantidades_por_plato, indice=None):
+    """
+    Produce { id_plato: unidades } en UNA transacción:
+
+    - UN solo UPDATE condicional para todos los insumos:
+        SET stock = stock - CASE id ... END
+        WHERE id IN (...) AND stock >= CASE id ... END
+      Si actualiza menos filas que insumos requeridos → StockInsuficiente
+      con el primer insumo que no alcanza, y no se toca nada.
+    - UN solo UPDATE para sumar plt_stock a todos los platos.
+
+    Los platos deben tener receta con insumos (lo valida la vista con el índice).
+    Devuelve { id_insumo: cantidad descontada }.
+    """
+    platos = {
+        int(pk): Decimal(cant)
+        for pk, cant in cantidades_por_plato.items()
+        if cant and Decimal(cant) > 0
+    }
+    requeridos, _, _ = expandir_recetas(platos, indice)
+    if not platos:
+        return requeridos
+
+    campo_insumo = DecimalField(max_digits=12, decimal_places=3)
+
+    try:
+        with transaction.atomic():
+            if requeridos:
+                descuento = _por_id(requeridos, campo_insumo)
+                afectadas = (
+                    Insumos.objects
+                    .filter(pk__in=list(requeridos), ins_stock_actual__gte=descuento)
+                    .update(ins_stock_actual=F("ins_stock_actual") - descuento)
+                )
+                if afectadas != len(requeridos):
+                    raise _LoteRevertido()
+
+            suma = _por_id({pk: int(c) for pk, c in platos.items()}, IntegerField())
+            Platos.objects.filter(pk__in=list(platos)).update(plt_stock=F("plt_stock") + suma)
+    except _LoteRevertido:
+        # Ya se revirtió: informamos el primer insumo que no alcanza
+        insumos = Insumos.objects.filter(pk__in=list(requeridos)).order_by("pk")
+        for ins in insumos:
+            disponible = Decimal(str(ins.ins_stock_actual or 0))
+            if disponible < requeridos[ins.pk]:
+                raise StockInsuficiente(
+                    "insumo", ins.ins_nombre, ins.ins_unidad, requeridos[ins.pk], disponible
+                )
+        # El stock cambió entre el UPDATE y la lectura: mismo resultado para el cliente
+        ins = insumos.first()
+        raise StockInsuficiente(
+            "insumo",
+            ins.ins_nombre if ins else "",
+            ins.ins_unidad if ins else "",
+            requeridos.get(ins.pk, Decimal("0")) if ins else Decimal("0"),
+            Decimal(str(ins.ins_stock_actual or 0)) if ins else Decimal("0"),
+        )
+
+    return requeridos
@@ -10,7 +10,7 @@ from pizzeria.api.views import (
     CompraViewSet,DetalleCompraViewSet,ProveedorInsumoViewSet,EstadoMesasViewSet,MesasViewSet,
     EstadoVentaViewSet,DetalleVentaViewSet,CajaEstadoView,CajaHistorialView,CajaHistorialDetalleView,CajaIngresosSemanalesView,
     CategoriaProveedorViewSet,CajaIngresosRangoView,IngresosHistoricos,IngresosSemanaActual,
-    IngresosMesActualPorSemana,IngresosAnioActualPorMes,IngresosPorAnio,IngresosRango,
+    IngresosMesActualPorSemana,IngresosAnioActualPorMes,IngresosPorAnio,CajaIngresosSerieView,BootstrapView,PerfilSQLView,
 )
 
 router = DefaultRouter()
@@ -46,6 +46,8 @@ router.register(r"estados-mesa", EstadoMesasViewSet, basename="estados-mesa")
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("bootstrap/", BootstrapView.as_view(), name="bootstrap"),
+    path("perfil-sql/", PerfilSQLView.as_view(), name="perfil-sql"),
     path("caja/estado/", CajaEstadoView.as_view(), name="caja-estado"),
     path("caja/historial/", CajaHistorialView.as_view(), name="caja-historial"),
     path("caja/historial/<int:cierre_id>/",CajaHistorialDetalleView.as_view(),name="caja-historial-detalle",),
@@ -56,7 +58,7 @@ urlpatterns = [
     path("caja/ingresos-mes-semanas/", IngresosMesActualPorSemana.as_view()),
     path("caja/ingresos-anio-meses/", IngresosAnioActualPorMes.as_view()),
     path("caja/ingresos-anios/", IngresosPorAnio.as_view()),
-    path("caja/ingresos-rango/", IngresosRango.as_view()),
+    path("caja/ingresos/serie/", CajaIngresosSerieView.as_view(), name="caja-ingresos-serie"),
 
 
 
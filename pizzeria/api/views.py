@@ -1,5 +1,8 @@
 # api/views.py
-from rest_framework.permissions import IsAuthenticated
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 
 from rest_framework import viewsets, status
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
@@ -10,24 +13,27 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.db import transaction
 from django.db.models import F
-from django.db import connection
 from django.db.models import Sum
 from datetime import datetime
-from datetime import timedelta
+from copy import copy
+from datetime import date, timedelta
 from django.utils.timezone import make_aware
-from django.utils.timezone import localdate
-from django.db.models.functions import TruncDate, TruncMonth, ExtractWeek, ExtractYear
+from django.db.models.functions import Coalesce
 from rest_framework.views import APIView
-from django.db.models import Max, Sum, Case, When, Value, DecimalField
+from django.db.models import Case, When, Value, DecimalField
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.exceptions import ValidationError
-from .permissions import RolePermission
+from .permissions import RolePermission, invalidar_roles
+from .pagination import CursorMovimientosCaja, CursorPedidos, PaginacionOpcional
+from . import caja, catalogos, checkout, stock
+from .caja import caja_esta_abierta_hoy
+from .catalogos import ESTADO_PEDIDO, METODO_PAGO, TIPO_MOV_CAJA
 
 
 
 from pizzeria.models import (
     Empleados, Clientes, Insumos, Platos, Pedidos,
-    Ventas, MovimientosCaja,TipoMovimientoCaja, TipoPedidos, EstadoPedidos, MetodoDePago,
+    Ventas, MovimientosCaja, TipoPedidos, EstadoPedidos, MetodoDePago,
     CargoEmpleados, EstadoEmpleados,
     Proveedores, EstadoProveedores, CategoriaProveedores,
     Recetas, DetalleRecetas, CategoriaPlatos, EstadoReceta,
@@ -49,25 +55,7 @@ from .serializers import (
 )
 # ── Constantes de estados y helpers de caja/fechas
 # ── IDs FIJOS cargados en tu BD ───────────────────────────────────────────────
-ESTADO_PEDIDO = {
-    "EN_PROCESO": 1,
-    "ENTREGADO":  2,
-    "CANCELADO":  3,
-    "FINALIZADO": 4,
-}
-
-TIPO_MOV_CAJA = {
-    "APERTURA": 1,
-    "INGRESO":  2,
-    "EGRESO":   3,
-    "CIERRE":   4,
-}
-
-METODO_PAGO = {
-    "EFECTIVO":      1,
-    "TARJETA":       2,
-    "TRANSFERENCIA": 3,
-}
+# ESTADO_PEDIDO / TIPO_MOV_CAJA / METODO_PAGO viven en api/catalogos.py (importados arriba)
 def _parse_fecha(s: str):
     # acepta "YYYY-MM-DD" o "YYYY-MM-DD HH:MM"
     if not s:
@@ -85,48 +73,61 @@ def _rango_desde_hasta(request):
     return desde, hasta
 
 def _tipo_movimiento(nombre:str):
-    # Crea si no existe (Ingreso / Egreso / Apertura / Cierre)
-    from pizzeria.models import TipoMovimientoCaja
-    obj, _ = TipoMovimientoCaja.objects.get_or_create(tmovc_nombre__iexact=nombre, defaults={"tmovc_nombre": nombre})
-    # Si usamos get_or_create con __iexact, arriba no crea. Forzamos:
-    if isinstance(obj, tuple):
-        obj = TipoMovimientoCaja.objects.filter(tmovc_nombre__iexact=nombre).first()
-        if not obj:
-            obj = TipoMovimientoCaja.objects.create(tmovc_nombre=nombre)
-    return obj
-
-def caja_esta_abierta_hoy():
-    """
-    Devuelve True si el ÚLTIMO movimiento de caja de HOY
-    NO es un cierre. Si no hay movimientos hoy, se considera cerrada.
-    """
-    hoy = timezone.localdate()
-    inicio = timezone.make_aware(
-        timezone.datetime.combine(hoy, timezone.datetime.min.time())
-    )
-    fin = timezone.make_aware(
-        timezone.datetime.combine(hoy, timezone.datetime.max.time())
-    )
+    # Crea si no existe (Ingreso / Egreso / Apertura / Cierre); se lee del registro en memoria
+    return catalogos.obtener_o_crear("tipo_movimiento", nombre)
+
+def _id_entero(valor):
+    # IDs que llegan en el body (str / int / None) → int o None
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
 
-    movimientos_hoy = (
-        MovimientosCaja.objects
-        .filter(mv_fecha_hora__range=(inicio, fin))
-        .order_by("mv_fecha_hora")
+def _ids_del_parametro(valor):
+    # "?id_estado_pedido=1,2" → [1, 2] (ignora lo que no es número)
+    return [i for i in (_id_entero(v) for v in (valor or "").split(",")) if i is not None]
+
+def _filtrar_por_id(qs, params, parametro, campo):
+    # ?<parametro>=<id> → filter(campo=id); un id que no es número no trae nada
+    if parametro not in params:
+        return qs
+    valor = _id_entero(params[parametro])
+    return qs.filter(**{campo: valor}) if valor is not None else qs.none()
+
+def _respuesta_stock_insuficiente(faltante):
+    # Mensaje corto para el primer insumo que no alcanza (ver stock.faltantes_de_insumos)
+    return Response(
+        {
+            "detail": (
+                f"Stock insuficiente: falta {faltante['falta']:.3f} {faltante['ins_unidad']} "
+                f"de {faltante['ins_nombre']}."
+            )
+        },
+        status=400,
     )
 
-    ultimo = movimientos_hoy.last()
-    if not ultimo:
-        # Nunca se abrió caja hoy
-        return False
+def _sincronizar_reservas_pedido(pedido):
+    """Recalcula las reservas de insumos de un pedido según su estado actual."""
+    if pedido is None:
+        return
+    stock.sincronizar_reservas(
+        pedido.pk, pedido.id_estado_pedido_id == ESTADO_PEDIDO["EN_PROCESO"]
+    )
 
-    # Si el último movimiento del día es CIERRE → caja cerrada
-    return ultimo.id_tipo_movimiento_caja_id != TIPO_MOV_CAJA["CIERRE"]
 
+def _platos_de_detalles(detalles):
+    """
+    Trae en UNA consulta todos los platos referenciados por los
+    'detalles' del body → { id_plato: Platos }.
+    """
+    ids = [i for i in (_id_entero(d.get("id_plato")) for d in detalles) if i is not None]
+    return Platos.objects.in_bulk(ids)
 
 def asegurar_caja_abierta():
     """
     Lanza un 403 si la caja está cerrada.
     Usar al inicio de cualquier acción que MODIFIQUE pedidos/ventas.
+    El estado sale de sesion_caja (ver api/caja.py), no de recorrer movimientos.
     """
     if not caja_esta_abierta_hoy():
         raise PermissionDenied(
@@ -144,15 +145,99 @@ class RoleProtectedViewSet(ModelViewSet):
     """
     permission_classes = [IsAuthenticated, RolePermission]
 
+
+class CatalogoCacheadoMixin:
+    """
+    GET de catálogos (list / retrieve) con ETag y Last-Modified sacados de
+    la versión del catálogo (api/catalogos.py):
+    - si el cliente ya tiene esa versión → 304 sin tocar la base
+      (If-Modified-Since solo se mira si no mandó If-None-Match);
+    - si no, la respuesta sale del cache hasta que el catálogo cambie
+      (guardar / borrar una fila cambia la versión) o pasen
+      CATALOGOS_RESPUESTAS_TTL segundos.
+    Last-Modified no se manda en el mismo segundo del último cambio
+    (ver catalogos.modificado).
+    """
+    catalogo = None  # clave en catalogos.CATALOGOS
+
+    def list(self, request, *args, **kwargs):
+        return self._respuesta_cacheada(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._respuesta_cacheada(super().retrieve, request, *args, **kwargs)
+
+    def _respuesta_cacheada(self, vista, request, *args, **kwargs):
+        from django.core.cache import cache
+        from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+        version = catalogos.version(self.catalogo)
+        etag = f'"{self.catalogo}-{version}"'
+        modificado = catalogos.modificado(self.catalogo)
+        encabezados = {"ETag": etag}
+        if modificado is not None:
+            encabezados["Last-Modified"] = http_date(modificado)
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            if "*" in etags or etag in etags or f"W/{etag}" in etags:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=encabezados)
+        elif modificado is not None:
+            desde = parse_http_date_safe(request.headers.get("If-Modified-Since") or "")
+            if desde is not None and modificado <= desde:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=encabezados)
+
+        clave = f"catalogos:respuesta:{self.catalogo}:{version}:{request.get_full_path()}"
+        data = cache.get(clave)
+        if data is None:
+            response = vista(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(clave, data, catalogos.TTL_RESPUESTAS)
+        return Response(data, headers=encabezados)
+
+
+class InvalidaRecetasMixin:
+    """
+    Para ViewSets que escriben recetas: descarta el índice
+    plato → insumos cacheado en api/stock.py después de cada escritura
+    y recalcula las reservas de los pedidos EN PROCESO que tienen el plato
+    (o los platos, si la escritura lo cambió) de esa receta.
+    """
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self._recetas_cambiaron(self._platos_de(serializer.instance))
+
+    def perform_update(self, serializer):
+        antes = self._platos_de(serializer.instance)
+        super().perform_update(serializer)
+        self._recetas_cambiaron(antes | self._platos_de(serializer.instance))
+
+    def perform_destroy(self, instance):
+        platos = self._platos_de(instance)
+        super().perform_destroy(instance)
+        self._recetas_cambiaron(platos)
+
+    def _platos_de(self, instancia):
+        """Ids de plato cuya receta toca `instancia`."""
+        return {instancia.id_plato_id}
+
+    def _recetas_cambiaron(self, ids_plato):
+        stock.invalidar_expansion_recetas()
+        stock.sincronizar_reservas_de_platos(ids_plato, ESTADO_PEDIDO["EN_PROCESO"])
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Catálogos (para selects)
 # ──────────────────────────────────────────────────────────────────────────────
-class CargoViewSet(ReadOnlyModelViewSet):
+class CargoViewSet(CatalogoCacheadoMixin, ReadOnlyModelViewSet):
+    catalogo = "cargo"
     queryset = CargoEmpleados.objects.all().order_by("id_cargo_emp")
     serializer_class = CargoSerializer
     permission_classes = [IsAuthenticated]
 
-class EstadoEmpleadoViewSet(ReadOnlyModelViewSet):
+class EstadoEmpleadoViewSet(CatalogoCacheadoMixin, ReadOnlyModelViewSet):
+    catalogo = "estado_empleado"
     queryset = EstadoEmpleados.objects.all().order_by("id_estado_empleado")
     serializer_class = EstadoEmpleadoSerializer
     permission_classes = [IsAuthenticated]
@@ -161,12 +246,14 @@ class EstadoEmpleadoViewSet(ReadOnlyModelViewSet):
 # ──────────────────────────────────────────────────────────────────────────────
 # Proveedores: catálogos (para selects)
 # ──────────────────────────────────────────────────────────────────────────────
-class EstadoProveedorViewSet(ReadOnlyModelViewSet):
+class EstadoProveedorViewSet(CatalogoCacheadoMixin, ReadOnlyModelViewSet):
+    catalogo = "estado_proveedor"
     queryset = EstadoProveedores.objects.all().order_by("id_estado_prov")
     serializer_class = EstadoProveedorSerializer
     permission_classes = [IsAuthenticated]
 
-class CategoriaProveedorViewSet(ReadOnlyModelViewSet):
+class CategoriaProveedorViewSet(CatalogoCacheadoMixin, ReadOnlyModelViewSet):
+    catalogo = "categoria_proveedor"
     queryset = CategoriaProveedores.objects.all().order_by("id_categoria_prov")
     serializer_class = CategoriaProveedorSerializer
     permission_classes = [IsAuthenticated]
@@ -176,7 +263,12 @@ class CategoriaProveedorViewSet(ReadOnlyModelViewSet):
 # Empleados
 # ──────────────────────────────────────────────────────────────────────────────
 class EmpleadosViewSet(RoleProtectedViewSet):
-    queryset = Empleados.objects.all().order_by("-id_empleado")
+    queryset = (
+        Empleados.objects
+        .select_related("id_cargo_emp", "id_estado_empleado")
+        .all()
+        .order_by("-id_empleado")
+    )
     serializer_class = EmpleadosSerializer
     
 
@@ -201,8 +293,13 @@ class EmpleadosViewSet(RoleProtectedViewSet):
             return Response({"detail": "Empleado no existe."}, status=status.HTTP_404_NOT_FOUND)
 
         Empleados.objects.filter(usuario=request.user).exclude(pk=emp.pk).update(usuario=None)
+        usuario_anterior = emp.usuario_id
         emp.usuario = request.user
         emp.save(update_fields=["usuario"])
+
+        # Cambia el empleado (y el cargo) del usuario → roles cacheados obsoletos
+        invalidar_roles(request.user.pk)
+        invalidar_roles(usuario_anterior)
         return Response({"detail": "Vinculado correctamente."}, status=status.HTTP_200_OK)
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -248,7 +345,12 @@ class InsumoViewSet(RoleProtectedViewSet):
 
 
 class PlatoViewSet(RoleProtectedViewSet):
-    queryset = Platos.objects.all().order_by("-id_plato")
+    queryset = (
+        Platos.objects
+        .select_related("id_categoria_plato", "id_estado_plato")
+        .all()
+        .order_by("-id_plato")
+    )
     serializer_class = PlatoSerializer
     
 
@@ -301,6 +403,7 @@ class PlatoViewSet(RoleProtectedViewSet):
             ser = RecetaSerializer(data=receta_data)
             ser.is_valid(raise_exception=True)
             ser.save()
+            stock.invalidar_expansion_recetas()
         except Exception as e:
             # Si falla la creación de receta NO rompemos la creación del plato
             print("Error creando receta automática para el plato:", e)
@@ -319,46 +422,121 @@ class PlatoViewSet(RoleProtectedViewSet):
 
         plato = self.get_object()
 
-        receta = Recetas.objects.filter(id_plato=plato).first()
-        if not receta:
+        lineas = stock.expansion_recetas().get(plato.id_plato)
+        if lineas is None:
             return Response({"detail": "El plato no tiene receta definida."}, status=400)
 
-        dets = DetalleRecetas.objects.filter(id_receta=receta)
+        requeridos, _, _ = stock.expandir_recetas({plato.id_plato: cantidad})
 
-        requeridos = []
-        for det in dets:
-            por_plato = getattr(det, "detr_cant_unid", 0) or Decimal("0")
-            req = por_plato * cantidad
-            if req <= 0:
-                continue
+        try:
+            with transaction.atomic():
+                # Descontar insumos (UPDATE condicional, nunca queda negativo)
+                stock.descontar_stock(insumos=requeridos)
 
-            ins = det.id_insumo
-            disp = Decimal(getattr(ins, "ins_stock_actual", 0) or 0)
+                # Sumar stock del plato
+                Platos.objects.filter(pk=plato.pk).update(plt_stock=F("plt_stock") + cantidad)
+        except stock.StockInsuficiente as e:
+            return Response(
+                {
+                    "detail": f"Insumo insuficiente: {e.nombre}. "
+                              f"Requiere {e.necesario}, disponible {e.disponible}."
+                },
+                status=400,
+            )
+
+        return Response(
+            {"detail": "Producción realizada.", "cantidad": f"{cantidad}"},
+            status=201,
+        )
+
+    @action(detail=False, methods=["post"], url_path="producir-lote")
+    def producir_lote(self, request):
+        """
+        Producción en lote (pre-producción antes del servicio).
+
+        Body: { "items": [ { "id_plato": 1, "cantidad": 10 }, ... ] }
+
+        - Valida TODOS los platos y recetas antes de tocar stock.
+        - Los insumos se validan en conjunto (si dos platos usan el mismo
+          insumo, se suma lo que necesita cada uno).
+        - Descuenta insumos y suma stock de platos con UPDATE en bloque,
+          en una sola transacción: se produce todo o nada.
+        """
+        items = request.data.get("items") or []
+        if not isinstance(items, list) or not items:
+            return Response({"detail": "No hay platos para producir."}, status=400)
+
+        # { id_plato: unidades } (si un plato se repite, se suman)
+        cantidades = {}
+        for item in items:
+            if not isinstance(item, dict):
+                return Response({"detail": "Ítem inválido."}, status=400)
+
+            id_plato = _id_entero(item.get("id_plato"))
+            if id_plato is None:
+                return Response({"detail": "Plato inválido."}, status=400)
+
+            try:
+                cantidad = Decimal(str(item.get("cantidad", "0")))
+            except Exception:
+                return Response({"detail": "Cantidad inválida."}, status=400)
+            if cantidad <= 0 or cantidad != cantidad.to_integral_value():
+                return Response(
+                    {"detail": "Cantidad debe ser un entero > 0."}, status=400
+                )
+
+            cantidades[id_plato] = cantidades.get(id_plato, 0) + int(cantidad)
+
+        platos = Platos.objects.in_bulk(list(cantidades))
+        indice = stock.expansion_recetas()
+
+        for id_plato in cantidades:
+            plato = platos.get(id_plato)
+            if not plato:
+                return Response(
+                    {"detail": f"El plato con ID {id_plato} no existe."}, status=400
+                )
 
-            if disp - req < 0:
+            lineas = indice.get(id_plato)
+            if lineas is None:
+                return Response(
+                    {"detail": f"El plato '{plato.plt_nombre}' no tiene receta definida."},
+                    status=400,
+                )
+            if not lineas:
                 return Response(
                     {
-                        "detail": f"Insumo insuficiente: {ins.ins_nombre}. "
-                                  f"Requiere {req}, disponible {disp}."
+                        "detail": (
+                            f"La receta del plato '{plato.plt_nombre}' no tiene insumos "
+                            f"asociados. Debe tener al menos un insumo."
+                        )
                     },
                     status=400,
                 )
-            requeridos.append((ins, req, disp))
 
-        with transaction.atomic():
-            # Descontar insumos
-            for ins, req, disp in requeridos:
-                nuevo = disp - req
-                ins.ins_stock_actual = nuevo
-                ins.save(update_fields=["ins_stock_actual"])
-
-            # Sumar stock del plato
-            stock_actual = Decimal(getattr(plato, "plt_stock", 0) or 0)
-            setattr(plato, "plt_stock", stock_actual + cantidad)
-            plato.save(update_fields=["plt_stock"])
+        try:
+            requeridos = stock.producir_platos(cantidades, indice)
+        except stock.StockInsuficiente as e:
+            return Response(
+                {
+                    "detail": f"Insumo insuficiente: {e.nombre}. "
+                              f"Requiere {e.necesario}, disponible {e.disponible}."
+                },
+                status=400,
+            )
 
         return Response(
-            {"detail": "Producción realizada.", "cantidad": f"{cantidad}"},
+            {
+                "detail": "Producción realizada.",
+                "platos": [
+                    {"id_plato": id_plato, "cantidad": cant}
+                    for id_plato, cant in cantidades.items()
+                ],
+                "insumos": [
+                    {"id_insumo": id_insumo, "cantidad": f"{total}"}
+                    for id_insumo, total in sorted(requeridos.items())
+                ],
+            },
             status=201,
         )
     
@@ -374,10 +552,39 @@ class PedidoViewSet(RoleProtectedViewSet):
             "id_tipo_pedido",
         )
         .prefetch_related("detallepedidos_set__id_plato")
+        .annotate(
+            # Total del pedido calculado en la base (lo usa PedidoSerializer.get_total)
+            total_pedido=Coalesce(
+                Sum(
+                    F("detallepedidos__detped_cantidad") * F("detallepedidos__id_plato__plt_precio"),
+                    output_field=DecimalField(max_digits=14, decimal_places=2),
+                ),
+                Value(Decimal("0.00")),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            )
+        )
         .all()
         .order_by("-id_pedido")
     )
     serializer_class = PedidoSerializer
+    pagination_class = CursorPedidos
+
+    def get_queryset(self):
+        """
+        Filtros para las pantallas que antes traían todos los pedidos:
+        ?id_mesa=<id>, ?id_estado_pedido=<id>[,<id>...] y ?id_plato=<id>
+        (pedidos con ese plato en algún detalle).
+        """
+        qs = super().get_queryset()
+        params = self.request.query_params
+        qs = _filtrar_por_id(qs, params, "id_mesa", "id_mesa_id")
+        if "id_estado_pedido" in params:
+            qs = qs.filter(id_estado_pedido_id__in=_ids_del_parametro(params["id_estado_pedido"]))
+        if "id_plato" in params:
+            # Subconsulta: un JOIN con los detalles duplicaría el total anotado
+            detalles = _filtrar_por_id(DetallePedidos.objects.all(), params, "id_plato", "id_plato_id")
+            qs = qs.filter(pk__in=detalles.values("id_pedido"))
+        return qs
     
     
     @action(detail=True, methods=["post"], url_path="validar_stock_editar")
@@ -397,7 +604,6 @@ class PedidoViewSet(RoleProtectedViewSet):
         """
         asegurar_caja_abierta()
         from decimal import Decimal
-        from django.db import transaction
 
         data = request.data
         detalles = data.get("detalles", [])
@@ -409,63 +615,17 @@ class PedidoViewSet(RoleProtectedViewSet):
         pedido = self.get_object()
         es_entregado = pedido.id_estado_pedido_id == ESTADO_PEDIDO["ENTREGADO"]
 
-        # { id_insumo: {"nombre":..., "unidad":..., "total": Decimal} }
-        requeridos = {}
-
-        # 0) Reservas por pedidos EN PROCESO, EXCLUYENDO este pedido
-        pedidos_abiertos = Pedidos.objects.filter(
-            id_estado_pedido_id=ESTADO_PEDIDO["EN_PROCESO"]
-        ).exclude(pk=pk)
-
-        if pedidos_abiertos.exists():
-            dets_abiertos = (
-                DetallePedidos.objects
-                .select_related("id_plato")
-                .filter(id_pedido__in=pedidos_abiertos)
-            )
-
-            for det_ab in dets_abiertos:
-                plato = det_ab.id_plato
-                if not plato:
-                    continue
-
-                cant_abierta = Decimal(str(det_ab.detped_cantidad or 0))
-                if cant_abierta <= 0:
-                    continue
-
-                receta = Recetas.objects.filter(id_plato=plato).first()
-                # Igual que en create: si el plato no usa receta, no reservamos insumos aquí
-                if not receta:
-                    continue
-
-                detalles_receta = (
-                    DetalleRecetas.objects
-                    .select_related("id_insumo")
-                    .filter(id_receta=receta)
-                )
-
-                for dr in detalles_receta:
-                    insumo = dr.id_insumo
-                    if not insumo:
-                        continue
-
-                    por_plato = Decimal(str(dr.detr_cant_unid))
-                    if por_plato <= 0:
-                        continue
+        # Índice plato → insumos (cacheado, sin consultas por línea)
+        indice = stock.expansion_recetas()
 
-                    total_necesario = por_plato * cant_abierta
-
-                    entry = requeridos.setdefault(insumo.id_insumo, {
-                        "nombre": insumo.ins_nombre,
-                        "unidad": insumo.ins_unidad,
-                        "total": Decimal("0"),
-                    })
-                    entry["total"] += total_necesario
+        # Unidades a PRODUCIR por plato: { id_plato: Decimal }
+        a_producir = {}
 
         # 1) Insumos necesarios para el pedido EDITADO
         #    - Si el pedido está ENTREGADO: solo el INCREMENTO
         #    - Si NO está ENTREGADO: se valida la NUEVA cantidad completa (como en create)
         incrementos = []  # solo se usan si el pedido está ENTREGADO
+        platos = _platos_de_detalles(detalles)
 
         for det in detalles:
             plato_id = det.get("id_plato")
@@ -481,7 +641,7 @@ class PedidoViewSet(RoleProtectedViewSet):
             if cantidad_original < 0:
                 cantidad_original = Decimal("0")
 
-            plato = Platos.objects.filter(pk=plato_id).first()
+            plato = platos.get(_id_entero(plato_id))
             if not plato:
                 return Response(
                     {"detail": f"El plato con ID {plato_id} no existe."},
@@ -512,7 +672,6 @@ class PedidoViewSet(RoleProtectedViewSet):
                 # 🔹 Pedido EN PROCESO / PENDIENTE:
                 #    se valida como si fuera un pedido nuevo:
                 #    reservamos la cantidad TOTAL nueva (no solo el incremento)
-                incremento = cantidad_total - cantidad_original  # solo informativo
                 stock_plato = Decimal(str(plato.plt_stock or 0))
                 desde_stock = min(stock_plato, cantidad_total)
                 faltante = cantidad_total - desde_stock
@@ -522,8 +681,8 @@ class PedidoViewSet(RoleProtectedViewSet):
                 continue
 
             # Si falta → se produciría usando RECETA => consume insumos
-            receta = Recetas.objects.filter(id_plato=plato).first()
-            if not receta:
+            lineas = indice.get(plato.id_plato)
+            if lineas is None:
                 return Response(
                     {
                         "detail": (
@@ -534,14 +693,8 @@ class PedidoViewSet(RoleProtectedViewSet):
                     status=400
                 )
 
-            detalles_receta_qs = (
-                DetalleRecetas.objects
-                .select_related("id_insumo")
-                .filter(id_receta=receta)
-            )
-
             # 🚫 Receta sin insumos asociados
-            if not detalles_receta_qs.exists():
+            if not lineas:
                 return Response(
                     {
                         "detail": (
@@ -552,95 +705,32 @@ class PedidoViewSet(RoleProtectedViewSet):
                     status=400
                 )
 
-            for dr in detalles_receta_qs:
-                insumo = dr.id_insumo
-                if not insumo:
-                    continue
-
-                por_plato = Decimal(str(dr.detr_cant_unid))
-                if por_plato <= 0:
-                    continue
-
-                total_necesario = por_plato * faltante
-
-                entry = requeridos.setdefault(insumo.id_insumo, {
-                    "nombre": insumo.ins_nombre,
-                    "unidad": insumo.ins_unidad,
-                    "total": Decimal("0"),
-                })
-                entry["total"] += total_necesario
-
-        # 2) VALIDAR STOCK DE INSUMOS (reservas + este pedido)
-        if requeridos:
-            ids = list(requeridos.keys())
-            for ins in Insumos.objects.filter(pk__in=ids):
-                necesario = requeridos[ins.id_insumo]["total"]
-                disponible = Decimal(str(ins.ins_stock_actual or 0))
-
-                if disponible < necesario:
-                    faltante = Decimal(str(necesario)) - Decimal(str(disponible))
-                    if faltante < 0:
-                        faltante = Decimal("0")
-
-                    faltante_fmt = f"{faltante:.3f}"
-
-                    msg_corto = (
-                        f"Stock insuficiente: falta {faltante_fmt} {ins.ins_unidad} "
-                        f"de {ins.ins_nombre}."
-                    )
+            a_producir[plato.id_plato] = a_producir.get(plato.id_plato, Decimal("0")) + faltante
 
-                    return Response({"detail": msg_corto}, status=400)
+        # 2) VALIDAR STOCK DE INSUMOS en una consulta
+        #    (reservas EN PROCESO, EXCLUYENDO este pedido, + este pedido)
+        faltantes = stock.faltantes_de_insumos(a_producir, excluir_pedido=pedido.pk)
+        if faltantes:
+            return _respuesta_stock_insuficiente(faltantes[0])
 
         # 3) Si el pedido está ENTREGADO -> descontar stock REAL por el INCREMENTO
+        #    (UPDATE condicional: si otro pedido se llevó el stock → 400)
         if es_entregado and incrementos:
-            with transaction.atomic():
-                for item in incrementos:
-                    plato = item["plato"]
-                    desde_stock = item["desde_stock"]
-                    faltante = item["faltante"]
-
-                    # 3.1) Descontar del stock del plato la parte que sale directamente del stock
-                    if desde_stock > 0:
-                        Platos.objects.filter(pk=plato.pk).update(
-                            plt_stock=F("plt_stock") - desde_stock
-                        )
-
-                    # 3.2) Si hay faltante → se produce con receta y se descuentan insumos
-                    if faltante > 0:
-                        receta = Recetas.objects.filter(id_plato=plato).first()
-                        if not receta:
-                            return Response(
-                                {
-                                    "detail": (
-                                        f"El plato '{plato.plt_nombre}' no tiene receta "
-                                        f"para producir el faltante."
-                                    )
-                                },
-                                status=400,
-                            )
-
-                        detrec_qs = (
-                            DetalleRecetas.objects
-                            .select_related("id_insumo")
-                            .filter(id_receta=receta)
-                        )
-
-                        for dr in detrec_qs:
-                            insumo = dr.id_insumo
-                            if not insumo:
-                                continue
-
-                            por_plato = Decimal(str(dr.detr_cant_unid))
-                            if por_plato <= 0:
-                                continue
-
-                            total_desc = por_plato * faltante
-                            if total_desc <= 0:
-                                continue
-
-                            Insumos.objects.filter(pk=insumo.pk).update(
-                                ins_stock_actual=F("ins_stock_actual") - total_desc
-                            )
+            platos_desc = {}
+            a_producir_desc = {}
+            for item in incrementos:
+                pk_plato = item["plato"].pk
+                platos_desc[pk_plato] = platos_desc.get(pk_plato, 0) + item["desde_stock"]
+                a_producir_desc[pk_plato] = a_producir_desc.get(pk_plato, 0) + item["faltante"]
+            # La receta ya se validó arriba contra el índice
+            insumos_desc, _, _ = stock.expandir_recetas(a_producir_desc, indice)
+            try:
+                stock.descontar_stock(insumos=insumos_desc, platos=platos_desc)
+            except stock.StockInsuficiente as e:
+                return Response(
+                    {"detail": f"Stock insuficiente: falta {e.falta:.3f} {e.unidad} de {e.nombre}."},
+                    status=400,
+                )
 
         # Si llega acá, el stock alcanza
         return Response({"ok": True}, status=200)
@@ -664,22 +754,13 @@ class PedidoViewSet(RoleProtectedViewSet):
            - Se usa primero el stock del PLATO (Platos.plt_stock).
            - Si falta, se 'produce' el faltante usando la RECETA del plato
              (DetalleRecetas.detr_cant_unid) y se consumen INSUMOS.
-        2) Antes de descontar, se calcula cuánto insumo total se necesitaría
-           y se valida que alcanza el stock de cada insumo.
-           Si NO alcanza, se devuelve 400 y NO se descuenta nada.
+        2) Se descuenta con UPDATE ... WHERE stock >= x (stock.descontar_stock),
+           sin bloquear filas antes de calcular. Si alguna fila NO alcanza,
+           se devuelve 400 y NO se descuenta nada.
         """
 
         pedido = self.get_object()
 
-        # Helpers acoplados a tu modelo real
-        def get_cant_det_pedido(det_obj):
-            # DetallePedidos.detped_cantidad
-            return getattr(det_obj, "detped_cantidad", 0) or 0
-
-        def get_cant_det_receta(dr_obj):
-            # DetalleRecetas.detr_cant_unid
-            return getattr(dr_obj, "detr_cant_unid", 0) or 0
-
         # Traemos los detalles del pedido con sus platos
         detalles = (
             DetallePedidos.objects
@@ -690,33 +771,47 @@ class PedidoViewSet(RoleProtectedViewSet):
         if not detalles.exists():
             return Response({"detail": "El pedido no tiene ítems."}, status=400)
 
+        from decimal import Decimal
+
+        indice = stock.expansion_recetas()
+
         # ─────────────────────────────────────────────
-        # 1) PRIMER PASO: calcular insumos necesarios
+        # 1) PRIMER PASO: cuánto sale del plato y cuánto hay que producir
         # ─────────────────────────────────────────────
-        from decimal import Decimal
+        despacho = {}    # { id_plato: unidades que salen de plt_stock }
+        a_producir = {}  # { id_plato: unidades a producir con receta }
+        movimientos = {"platos": [], "insumos": []}
 
-        requeridos_por_insumo = {}  # {id_insumo: {"nombre": str, "total": Decimal}}
         for det in detalles:
             plato = getattr(det, "id_plato", None)
             if not plato:
                 continue
 
-            cant_pedida = Decimal(str(get_cant_det_pedido(det)))
+            cant_pedida = Decimal(str(det.detped_cantidad or 0))
             if cant_pedida <= 0:
                 continue
 
-            # Stock actual del plato
-            stock_plato = Decimal(str(getattr(plato, "plt_stock", 0) or 0))
-            consume_de_plato = min(stock_plato, cant_pedida)
+            # Stock del plato, descontando lo que ya tomaron líneas anteriores
+            stock_plato = Decimal(str(plato.plt_stock or 0)) - despacho.get(plato.pk, 0)
+            consume_de_plato = min(max(stock_plato, Decimal("0")), cant_pedida)
             faltante = cant_pedida - consume_de_plato  # lo que hay que producir
 
+            if consume_de_plato > 0:
+                despacho[plato.pk] = despacho.get(plato.pk, 0) + consume_de_plato
+                movimientos["platos"].append({
+                    "plato_id": plato.pk,
+                    "tipo": "despacho",
+                    "delta": float(-consume_de_plato),
+                    "campo": "plt_stock",
+                })
+
             if faltante <= 0:
                 # Todo sale del stock del plato, no necesito insumos
                 continue
 
-            # Necesito receta para producir el faltante
-            receta = Recetas.objects.filter(id_plato=plato).first()
-            if not receta:
+            # Necesito receta (con insumos) para producir el faltante
+            lineas = indice.get(plato.pk)
+            if lineas is None:
                 return Response(
                     {
                         "detail": (
@@ -726,278 +821,84 @@ class PedidoViewSet(RoleProtectedViewSet):
                     },
                     status=400,
                 )
-
-            detrec_qs = (
-                DetalleRecetas.objects
-                .select_related("id_insumo")
-                .filter(id_receta=receta)
-            )
-
-            for dr in detrec_qs:
-                insumo = getattr(dr, "id_insumo", None)
-                if not insumo:
-                    continue
-
-                qty_por_plato = Decimal(str(get_cant_det_receta(dr)))
-                if qty_por_plato <= 0:
-                    continue
-
-                total_desc = qty_por_plato * faltante  # Decimal * Decimal
-                if total_desc <= 0:
-                    continue
-
-                entry = requeridos_por_insumo.setdefault(
-                    insumo.id_insumo,
+            if not lineas:
+                return Response(
                     {
-                        "nombre": insumo.ins_nombre,
-                        "total": Decimal("0"),
+                        "detail": (
+                            f"La receta del plato '{plato.plt_nombre}' no tiene insumos "
+                            f"asociados. Debe tener al menos un insumo."
+                        )
                     },
+                    status=400,
                 )
-                entry["total"] += total_desc
-
-        # ─────────────────────────────────────────────
-        # 2) Validar stock de insumos antes de descontar
-        # ─────────────────────────────────────────────
-        if requeridos_por_insumo:
-            # Bloqueamos filas de insumos para evitar condiciones de carrera
-            ids = list(requeridos_por_insumo.keys())
-            for ins in Insumos.objects.select_for_update().filter(pk__in=ids):
-                necesario = requeridos_por_insumo[ins.id_insumo]["total"]
-                disponible = Decimal(str(ins.ins_stock_actual or 0))
-
-                if disponible < necesario:
-                    return Response(
-                        {
-                            "detail": (
-                                f"Insumo insuficiente: {ins.ins_nombre}. "
-                                f"Requiere {necesario} {ins.ins_unidad} "
-                                f"y solo hay {disponible}."
-                            )
-                        },
-                        status=400,
-                    )
-
-        # ─────────────────────────────────────────────
-        # 3) SEGUNDO PASO: ahora sí, descontar de verdad
-        # ─────────────────────────────────────────────
-        movimientos = {"platos": [], "insumos": []}
-
-        for det in detalles:
-            plato = getattr(det, "id_plato", None)
-            if not plato:
-                continue
-
-            cant_pedida = Decimal(str(get_cant_det_pedido(det)))
-            if cant_pedida <= 0:
-                continue
-
-            # 3.1) Despachar desde stock del plato
-            stock_plato = Decimal(str(getattr(plato, "plt_stock", 0) or 0))
-            consume_de_plato = min(stock_plato, cant_pedida)
-            faltante = cant_pedida - consume_de_plato
-
-            if consume_de_plato > 0:
-                Platos.objects.filter(pk=plato.pk).update(
-                    plt_stock=F("plt_stock") - consume_de_plato
-                )
-                movimientos["platos"].append({
-                    "plato_id": plato.pk,
-                    "tipo": "despacho",
-                    "delta": float(-consume_de_plato),
-                    "campo": "plt_stock",
-                })
 
-            # 3.2) Si falta, consumir insumos según receta y trazar producción + despacho
-            # 3.2) Si falta, consumir insumos según receta y trazar producción + despacho
-            if faltante > 0:
-                receta = Recetas.objects.filter(id_plato=plato).first()
-                if not receta:
-                    # Esto en teoría no debería pasar, ya se validó arriba
-                    return Response(
-                        {
-                            "detail": (
-                                f"El plato '{plato.plt_nombre}' no tiene receta "
-                                f"para producir el faltante."
-                            )
-                        },
-                        status=400,
-                    )
-
-                detrec_qs = (
-                    DetalleRecetas.objects
-                    .select_related("id_insumo")
-                    .filter(id_receta=receta)
-                )
-
-                # 🚫 Receta sin insumos asociados
-                if not detrec_qs.exists():
-                    return Response(
-                        {
-                            "detail": (
-                                f"La receta del plato '{plato.plt_nombre}' no tiene insumos "
-                                f"asociados. Debe tener al menos un insumo."
-                            )
-                        },
-                        status=400,
-                    )
-
-                # 3.2.a) Restar insumos por la producción del faltante
-                for dr in detrec_qs:
-                    insumo = getattr(dr, "id_insumo", None)
-                    if not insumo:
-                        continue
-
-                    qty_por_plato = Decimal(str(get_cant_det_receta(dr)))
-                    if qty_por_plato <= 0:
-                        continue
-
-                    total_desc = qty_por_plato * faltante
-                    if total_desc <= 0:
-                        continue
-
-                    Insumos.objects.filter(pk=insumo.pk).update(
-                        ins_stock_actual=F("ins_stock_actual") - total_desc
-                    )
-                    movimientos["insumos"].append({
-                        "insumo_id": insumo.pk,
-                        "delta": float(-total_desc),
-                        "campo": "ins_stock_actual",
-                    })
+            a_producir[plato.pk] = a_producir.get(plato.pk, 0) + faltante
 
+            # Trazabilidad: producir (sumar) y despachar (restar) el faltante.
+            # En la base se compensan, así que no se escribe plt_stock por esto.
+            movimientos["platos"].append({
+                "plato_id": plato.pk,
+                "tipo": "produccion",
+                "delta": float(+faltante),
+                "campo": "plt_stock",
+            })
+            movimientos["platos"].append({
+                "plato_id": plato.pk,
+                "tipo": "despacho",
+                "delta": float(-faltante),
+                "campo": "plt_stock",
+            })
 
-                # 3.2.b) Trazabilidad: producir (sumar) y despachar (restar) el faltante
-                Platos.objects.filter(pk=plato.pk).update(
-                    plt_stock=F("plt_stock") + faltante
-                )
-                movimientos["platos"].append({
-                    "plato_id": plato.pk,
-                    "tipo": "produccion",
-                    "delta": float(+faltante),
-                    "campo": "plt_stock",
-                })
+        requeridos, _, _ = stock.expandir_recetas(a_producir, indice)
+        for id_insumo, total_desc in requeridos.items():
+            movimientos["insumos"].append({
+                "insumo_id": id_insumo,
+                "delta": float(-total_desc),
+                "campo": "ins_stock_actual",
+            })
 
-                Platos.objects.filter(pk=plato.pk).update(
-                    plt_stock=F("plt_stock") - faltante
-                )
-                movimientos["platos"].append({
-                    "plato_id": plato.pk,
-                    "tipo": "despacho",
-                    "delta": float(-faltante),
-                    "campo": "plt_stock",
-                })
+        # ─────────────────────────────────────────────
+        # 2) SEGUNDO PASO: descontar con UPDATE condicional
+        #    (si no alcanza → 400 y NO se descuenta nada)
+        # ─────────────────────────────────────────────
+        try:
+            stock.descontar_stock(insumos=requeridos, platos=despacho)
+        except stock.StockInsuficiente as e:
+            return Response({"detail": str(e)}, status=400)
 
         return Response({"ok": True, "movimientos": movimientos})
 
     
     @action(detail=True, methods=["post"], url_path="generar_venta")
     def generar_venta(self, request, pk=None):
+        """
+        Genera una venta "Pendiente" con los ítems del pedido
+        (ver api/checkout.py: una transacción, detalles en un solo INSERT).
+        """
         asegurar_caja_abierta()
 
-    # 1) Pedido
         try:
             pedido = self.get_object()
         except Exception:
             return Response({"detail": "Pedido no encontrado."}, status=status.HTTP_404_NOT_FOUND)
 
-        if not getattr(pedido, "id_cliente_id", None):
-            return Response({"detail": "El pedido no tiene cliente asignado."}, status=status.HTTP_400_BAD_REQUEST)
-        if not getattr(pedido, "id_empleado_id", None):
-            return Response({"detail": "El pedido no tiene empleado asignado."}, status=status.HTTP_400_BAD_REQUEST)
-
-        # 2) Detalles del pedido
-        detalles = DetallePedidos.objects.filter(id_pedido_id=pedido.id_pedido)
-        if not detalles.exists():
-            return Response({"detail": "El pedido no tiene detalles."}, status=status.HTTP_400_BAD_REQUEST)
-
-        # 3) Estado de venta Pendiente
-        estado_pendiente, _ = EstadoVentas.objects.get_or_create(estven_nombre="Pendiente")
-
-        # 4) Transacción
-        with transaction.atomic():
-            total = Decimal("0")
-            items = []
-
-            # Nota: evitamos select_for_update para compatibilidad y usamos d.id_plato_id directo
-            for d in detalles:
-                # plato y precio
-                plato = None
-                if hasattr(d, "id_plato") and d.id_plato is not None:
-                    plato = d.id_plato  # FK ya cargada
-                else:
-                    plato = Platos.objects.get(pk=d.id_plato_id)
-
-                precio = Decimal(str(plato.plt_precio or 0))
-                cantidad = Decimal(str(d.detped_cantidad or 0))
-                if cantidad <= 0:
-                    return Response(
-                        {"detail": f"Cantidad inválida en detalle {d.pk}: {cantidad}."},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                subtotal = (precio * cantidad).quantize(Decimal("0.01"))
-                total += subtotal
-
-                # ⚠️ NO incluir detven_subtotal (lo calcula MySQL)
-                items.append({
-                    "id_plato_id": plato.id_plato,
-                    "detven_precio_uni": precio,
-                    "detven_cantidad": int(cantidad),  # IntegerField
-                })
-
-            # 5) Cabecera de venta
-            venta = Ventas.objects.create(
-                id_cliente_id=pedido.id_cliente_id,
-                id_empleado_id=pedido.id_empleado_id,
-                id_estado_venta_id=estado_pendiente.id_estado_venta,
-                ven_fecha_hora=pedido.ped_fecha_hora_fin or pedido.ped_fecha_hora_ini or timezone.now(),
-                ven_monto=total.quantize(Decimal("0.01")),
-                ven_descripcion=f"Venta generada automáticamente del pedido #{pedido.id_pedido}",
-            )
-
-            # 6) Detalles de venta (sin detven_subtotal: lo genera MySQL)
-            tabla = DetalleVentas._meta.db_table  # debería ser 'detalle_ventas'
-            sql = f"""
-                INSERT INTO {tabla} (id_venta, id_plato, detven_precio_uni, detven_cantidad)
-                VALUES (%s, %s, %s, %s)
-            """
-            params = [
-                (
-                    venta.id_venta,
-                    item["id_plato_id"],
-                    item["detven_precio_uni"],
-                    item["detven_cantidad"],
-                )
-                for item in items
-            ]
-
-            with connection.cursor() as cursor:
-                cursor.executemany(sql, params)
-
-            # Opcional: si querés devolver cabecera + detalles
-            data = VentaSerializer(venta).data
-            data["detalles"] = DetalleVentaSerializer(
-            DetalleVentas.objects.filter(id_venta_id=venta.id_venta), many=True
-                ).data
+        try:
+            venta, detalles = checkout.generar_venta(pedido)
+        except checkout.CobroInvalido as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            return Response(data, status=status.HTTP_201_CREATED)
+        return Response(checkout.respuesta_venta(venta, detalles), status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=["post"], url_path="cobrar-y-finalizar")
-    @transaction.atomic
     def cobrar_y_finalizar(self, request, pk=None):
-        asegurar_caja_abierta()
         """
         Body: { "id_metodo_pago": <1|2|3> }
         - Cambia pedido a FINALIZADO
         - Genera la Venta con sus detalles (sin tocar columnas generadas)
         - Crea el Movimiento de Caja (Ingreso) con el monto total
+        Todo en una transacción (api/checkout.py).
         """
-        from decimal import Decimal
-        from django.db import connection
-        from django.utils import timezone
-        from pizzeria.models import (
-            DetallePedidos, Platos, Ventas, DetalleVentas,
-            MetodoDePago, EstadoVentas, MovimientosCaja
-        )
+        asegurar_caja_abierta()
 
         pedido = self.get_object()
 
@@ -1005,74 +906,16 @@ class PedidoViewSet(RoleProtectedViewSet):
         if pedido.id_estado_pedido_id == ESTADO_PEDIDO["CANCELADO"]:
             return Response({"detail": "No se puede cobrar un pedido CANCELADO."}, status=400)
 
-        id_metodo_pago = request.data.get("id_metodo_pago")
-        if not id_metodo_pago or not MetodoDePago.objects.filter(pk=id_metodo_pago).exists():
-            return Response({"detail": "Método de pago inválido."}, status=400)
-
-        dets = (DetallePedidos.objects
-                .select_related("id_plato")
-                .filter(id_pedido=pedido.id_pedido))
-        if not dets.exists():
-            return Response({"detail": "El pedido no tiene ítems."}, status=400)
-
-        # Total e items
-        total = Decimal("0.00")
-        items = []
-        for det in dets:
-            plato = det.id_plato
-            if getattr(plato, "plt_precio", None) is None:
-                return Response(
-                    {"detail": f"El plato '{plato.plt_nombre}' no tiene precio definido."}, status=400
-                )
-            precio = Decimal(str(plato.plt_precio))
-            cantidad = int(det.detped_cantidad or 0)
-            if cantidad <= 0:
-                return Response({"detail": "Cantidad inválida en un ítem."}, status=400)
-            total += (precio * Decimal(cantidad))
-            items.append((plato.id_plato, precio, cantidad))
-
-        # Estado default de venta
-        estven = EstadoVentas.objects.order_by("id_estado_venta").first()
-
-        # Cerrar pedido
-        pedido.id_estado_pedido_id = ESTADO_PEDIDO["FINALIZADO"]
-        pedido.ped_fecha_hora_fin = timezone.now()
-        pedido.save(update_fields=["id_estado_pedido", "ped_fecha_hora_fin"])
-
-        # Cabecera de Venta
-        venta = Ventas.objects.create(
-            id_cliente_id=pedido.id_cliente_id,
-            id_empleado_id=pedido.id_empleado_id,
-            id_estado_venta_id=estven.id_estado_venta if estven else None,
-            ven_fecha_hora=pedido.ped_fecha_hora_fin,
-            ven_monto=total,
-            ven_descripcion=f"Venta de pedido #{pedido.id_pedido}",
-            id_metodo_pago_id=id_metodo_pago,  # FK ya agregada por tus migraciones
-        )
-
-        # Detalles (sin detven_subtotal si es columna generada por MySQL)
-        tabla = DetalleVentas._meta.db_table
-        sql = f"INSERT INTO {tabla} (id_venta, id_plato, detven_precio_uni, detven_cantidad) VALUES (%s, %s, %s, %s)"
-        params = [(venta.id_venta, pid, precio, cant) for (pid, precio, cant) in items]
-        with connection.cursor() as cur:
-            cur.executemany(sql, params)
-
-        # Movimiento de Caja (Ingreso)
-        tipo_ingreso = _tipo_movimiento("Ingreso")
-        MovimientosCaja.objects.create(
-            id_empleado_id=pedido.id_empleado_id,
-            id_metodo_pago_id=id_metodo_pago,
-            id_tipo_movimiento_caja_id=tipo_ingreso.id_tipo_movimiento_caja,
-            id_venta_id=venta.id_venta,
-            mv_monto=venta.ven_monto,
-            mv_descripcion=f"Ingreso por venta #{venta.id_venta}",
-        )
+        try:
+            venta, detalles = checkout.cobrar_y_finalizar(
+                pedido,
+                request.data.get("id_metodo_pago"),
+                ESTADO_PEDIDO["FINALIZADO"],
+            )
+        except checkout.CobroInvalido as e:
+            return Response({"detail": str(e)}, status=400)
 
-        from .serializers import VentaSerializer, DetalleVentaSerializer
-        data = VentaSerializer(venta).data
-        detqs = DetalleVentas.objects.filter(id_venta=venta.id_venta)
-        data["detalles"] = DetalleVentaSerializer(detqs, many=True).data
-        return Response(data, status=201)
+        return Response(checkout.respuesta_venta(venta, detalles), status=201)
         # ── Bloqueo general de escritura ────────────────────────────
     @transaction.atomic
     def create(self, request, *args, **kwargs):
@@ -1085,6 +928,11 @@ class PedidoViewSet(RoleProtectedViewSet):
         - Primero suma insumos necesarios para TODOS los pedidos en proceso (reservados).
         - Después suma insumos necesarios para el nuevo pedido.
         - Si la suma total > stock de insumos -> 400 y NO crea el pedido.
+
+        Las recetas salen del índice cacheado de stock.expansion_recetas()
+        (solo para los mensajes de "sin receta") y la suma
+        receta × insumos + reservas se valida con UNA consulta
+        (stock.faltantes_de_insumos).
         """
         asegurar_caja_abierta()
 
@@ -1096,91 +944,16 @@ class PedidoViewSet(RoleProtectedViewSet):
         if not detalles:
             return Response({"detail": "El pedido no contiene ítems."}, status=400)
 
-        # Acumulador de insumos necesarios:
-        # { id_insumo: {"nombre":..., "unidad":..., "total": Decimal} }
-        requeridos = {}
-
-        # ─────────────────────────────────────────────
-        # 0) Reservas por pedidos EN PROCESO (stock "reservado")
-        # ─────────────────────────────────────────────
-        pedidos_abiertos = Pedidos.objects.filter(
-            id_estado_pedido_id=ESTADO_PEDIDO["EN_PROCESO"]
-        )
-
-        if pedidos_abiertos.exists():
-            dets_abiertos = (
-                DetallePedidos.objects
-                .select_related("id_plato")
-                .filter(id_pedido__in=pedidos_abiertos)
-            )
-
-            for det_ab in dets_abiertos:
-                plato = det_ab.id_plato
-                if not plato:
-                    continue
-
-                cant_abierta = Decimal(str(det_ab.detped_cantidad or 0))
-                if cant_abierta <= 0:
-                    continue
-
-                # Usamos RECETA para ver cuántos insumos va a consumir este pedido abierto
-                receta = Recetas.objects.filter(id_plato=plato).first()
-                if not receta:
-                    # Si querés, podés dejar pasar estos pedidos sin receta:
-                    # continue
-                    return Response(
-                        {
-                            "detail": (
-                                f"El plato '{plato.plt_nombre}' no tiene receta "
-                                f"para producir {cant_abierta} unidad(es)."
-                            )
-                        },
-                        status=400
-                    )
-
-                detalles_receta_qs = (
-                    DetalleRecetas.objects
-                    .select_related("id_insumo")
-                    .filter(id_receta=receta)
-                )
-
-                # 🚫 Receta sin insumos asociados
-                if not detalles_receta_qs.exists():
-                    return Response(
-                        {
-                            "detail": (
-                                f"La receta del plato '{plato.plt_nombre}' no tiene insumos "
-                                f"asociados. Debe tener al menos un insumo."
-                            )
-                        },
-                        status=400
-                    )
-
-                for dr in detalles_receta_qs:
-                    insumo = dr.id_insumo
-                    if not insumo:
-                        continue
-
-                    por_plato = Decimal(str(dr.detr_cant_unid))
-                    if por_plato <= 0:
-                        continue
-
-                    # acá usamos cant_abierta, no 'faltante'
-                    total_necesario = por_plato * cant_abierta
-
-                    entry = requeridos.setdefault(insumo.id_insumo, {
-                        "nombre": insumo.ins_nombre,
-                        "unidad": insumo.ins_unidad,
-                        "total": Decimal("0"),
-                    })
-                    entry["total"] += total_necesario
-
+        indice = stock.expansion_recetas()
 
+        # Unidades a PRODUCIR por plato (lo que no sale del stock del plato)
+        a_producir = {}
 
         # ─────────────────────────────────────────────
         # 1) Insumos necesarios para el NUEVO pedido
-        #     (reutilizamos "requeridos" como base)
         # ─────────────────────────────────────────────
+        platos = _platos_de_detalles(detalles)
+
         for det in detalles:
             plato_id = det.get("id_plato")
             cantidad = Decimal(str(det.get("detped_cantidad", 0)))
@@ -1188,7 +961,7 @@ class PedidoViewSet(RoleProtectedViewSet):
             if cantidad <= 0:
                 return Response({"detail": "Cantidad inválida en un ítem."}, status=400)
 
-            plato = Platos.objects.filter(pk=plato_id).first()
+            plato = platos.get(_id_entero(plato_id))
             if not plato:
                 return Response(
                     {"detail": f"El plato con ID {plato_id} no existe."},
@@ -1205,8 +978,8 @@ class PedidoViewSet(RoleProtectedViewSet):
                 continue
 
             # Si falta → se produciría usando RECETA => consume insumos
-            receta = Recetas.objects.filter(id_plato=plato).first()
-            if not receta:
+            lineas = indice.get(plato.id_plato)
+            if lineas is None:
                 return Response(
                     {
                         "detail": (
@@ -1217,56 +990,27 @@ class PedidoViewSet(RoleProtectedViewSet):
                     status=400
                 )
 
-            detalles_receta = (
-                DetalleRecetas.objects
-                .select_related("id_insumo")
-                .filter(id_receta=receta)
-            )
-
-            for dr in detalles_receta:
-                insumo = dr.id_insumo
-                if not insumo:
-                    continue
-
-                por_plato = Decimal(str(dr.detr_cant_unid))
-                if por_plato <= 0:
-                    continue
-
-                total_necesario = por_plato * faltante
+            # 🚫 Receta sin insumos asociados (igual que validar_stock_editar)
+            if not lineas:
+                return Response(
+                    {
+                        "detail": (
+                            f"La receta del plato '{plato.plt_nombre}' no tiene insumos "
+                            f"asociados. Debe tener al menos un insumo."
+                        )
+                    },
+                    status=400
+                )
 
-                entry = requeridos.setdefault(insumo.id_insumo, {
-                    "nombre": insumo.ins_nombre,
-                    "unidad": insumo.ins_unidad,
-                    "total": Decimal("0"),
-                })
-                entry["total"] += total_necesario
+            a_producir[plato.id_plato] = a_producir.get(plato.id_plato, Decimal("0")) + faltante
 
         # ─────────────────────────────────────────────
-        # 2) VALIDAR STOCK DE INSUMOS (reservas + nuevo pedido)
+        # 2) VALIDAR STOCK DE INSUMOS (reservas EN PROCESO + nuevo pedido)
+        #    Una sola consulta: receta × insumos − reservas, solo faltantes
         # ─────────────────────────────────────────────
-        if requeridos:
-            ids = list(requeridos.keys())
-            for ins in Insumos.objects.filter(pk__in=ids):
-                necesario = requeridos[ins.id_insumo]["total"]
-                disponible = Decimal(str(ins.ins_stock_actual or 0))
-
-                if disponible < necesario:
-                    faltante = Decimal(str(necesario)) - Decimal(str(disponible))
-
-                    # Normalizar para que no dé negativos
-                    if faltante < 0:
-                        faltante = Decimal("0")
-
-                    # Limpiar el formato: siempre mostrar con 3 decimales
-                    faltante_fmt = f"{faltante:.3f}"
-
-                    msg_corto = (
-                        f"Stock insuficiente: falta {faltante_fmt} {ins.ins_unidad} "
-                        f"de {ins.ins_nombre}."
-                    )
-
-                    return Response({"detail": msg_corto}, status=400)
-
+        faltantes = stock.faltantes_de_insumos(a_producir)
+        if faltantes:
+            return _respuesta_stock_insuficiente(faltantes[0])
 
         # ─────────────────────────────────────────────
         # 3) Si todo OK → CREAR EL PEDIDO NORMALMENTE
@@ -1287,16 +1031,37 @@ class PedidoViewSet(RoleProtectedViewSet):
         asegurar_caja_abierta()
         return super().destroy(request, *args, **kwargs)
 
+    # ── Libro de reservas (reserva_insumos) ─────────────────────
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        _sincronizar_reservas_pedido(serializer.instance)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        _sincronizar_reservas_pedido(serializer.instance)
+
+    def perform_destroy(self, instance):
+        id_pedido = instance.pk
+        super().perform_destroy(instance)
+        stock.liberar_reservas(id_pedido)
+
 
 # Estados de venta (catálogo)
-class EstadoVentaViewSet(ReadOnlyModelViewSet):
+class EstadoVentaViewSet(CatalogoCacheadoMixin, ReadOnlyModelViewSet):
+    catalogo = "estado_venta"
     queryset = EstadoVentas.objects.all().order_by("id_estado_venta")
     serializer_class = EstadoVentaSerializer
     permission_classes = [IsAuthenticated]
 
 
 class VentaViewSet(RoleProtectedViewSet):
-    queryset = Ventas.objects.all().order_by("-id_venta")
+    queryset = (
+        Ventas.objects
+        .select_related("id_cliente", "id_empleado", "id_metodo_pago", "id_estado_venta")
+        .prefetch_related("detalleventas_set__id_plato")
+        .all()
+        .order_by("-id_venta")
+    )
     serializer_class = VentaSerializer
     
     # ------------------------------------------------------------------
@@ -1414,7 +1179,12 @@ class DetalleVentaViewSet(RoleProtectedViewSet):
 
 
 class MovimientoCajaViewSet(RoleProtectedViewSet):
-    queryset = MovimientosCaja.objects.all().order_by("-id_movimiento_caja")
+    queryset = (
+        MovimientosCaja.objects
+        .select_related("id_empleado", "id_tipo_movimiento_caja", "id_metodo_pago")
+        .all()
+        .order_by("-id_movimiento_caja")
+    )
     serializer_class = MovimientoCajaSerializer
     
 
@@ -1433,7 +1203,9 @@ class MovimientoCajaViewSet(RoleProtectedViewSet):
             id_tipo_movimiento_caja_id=tipo.id_tipo_movimiento_caja,
             mv_monto=monto_inicial,
             mv_descripcion="Apertura de caja",
+            mv_fecha_hora=timezone.now(),
         )
+        caja.registrar_movimiento(mov)
         return Response(self.get_serializer(mov).data, status=201)
 
     # POST /api/movimientos-caja/cerrar  { "observacion": "..." }
@@ -1446,7 +1218,9 @@ class MovimientoCajaViewSet(RoleProtectedViewSet):
             id_tipo_movimiento_caja_id=tipo.id_tipo_movimiento_caja,
             mv_monto=0,
             mv_descripcion=request.data.get("observacion") or "Cierre de caja",
+            mv_fecha_hora=timezone.now(),
         )
+        caja.registrar_movimiento(mov)
         return Response(self.get_serializer(mov).data, status=201)
 
     # GET /api/movimientos-caja/resumen?desde=YYYY-MM-DD&hasta=YYYY-MM-DD
@@ -1469,7 +1243,7 @@ class MovimientoCajaViewSet(RoleProtectedViewSet):
         desde, hasta = _rango_desde_hasta(request)
         qs = (MovimientosCaja.objects
               .select_related("id_metodo_pago")
-              .filter(id_tipo_movimiento_caja__tmovc_nombre__iexact="Ingreso"))
+              .filter(id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["INGRESO"]))
         if desde:
             qs = qs.filter(mv_fecha_hora__gte=desde)
         if hasta:
@@ -1490,26 +1264,28 @@ class MovimientoCajaViewSet(RoleProtectedViewSet):
         }
         return Response(data, status=200)
 
-class TipoPedidoViewSet(RoleProtectedViewSet):
+class TipoPedidoViewSet(CatalogoCacheadoMixin, RoleProtectedViewSet):
+    catalogo = "tipo_pedido"
     queryset = TipoPedidos.objects.all().order_by("-id_tipo_pedido")
     serializer_class = TipoPedidoSerializer
     
 
-class EstadoPedidoViewSet(RoleProtectedViewSet):
+class EstadoPedidoViewSet(CatalogoCacheadoMixin, RoleProtectedViewSet):
+    catalogo = "estado_pedido"
     queryset = EstadoPedidos.objects.all().order_by("-id_estado_pedido")
     serializer_class = EstadoPedidoSerializer
     
 
-class MetodoPagoViewSet(RoleProtectedViewSet):
+class MetodoPagoViewSet(CatalogoCacheadoMixin, RoleProtectedViewSet):
+    catalogo = "metodo_pago"
     queryset = MetodoDePago.objects.all().order_by("-id_metodo_pago")
     serializer_class = MetodoPagoSerializer
     
 
-class RecetaViewSet(RoleProtectedViewSet):
+class RecetaViewSet(InvalidaRecetasMixin, RoleProtectedViewSet):
     queryset = (
         Recetas.objects
         .select_related("id_plato", "id_estado_receta")
-        .prefetch_related("detallerecetas_set__id_insumo")
         .all()
         .order_by("-id_receta")
     )
@@ -1564,7 +1340,7 @@ class RecetaViewSet(RoleProtectedViewSet):
         return self.update(request, *args, **kwargs)
 
 
-class DetalleRecetaViewSet(RoleProtectedViewSet):
+class DetalleRecetaViewSet(InvalidaRecetasMixin, RoleProtectedViewSet):
     queryset = (
         DetalleRecetas.objects
         .select_related("id_receta", "id_insumo")
@@ -1586,14 +1362,19 @@ class DetalleRecetaViewSet(RoleProtectedViewSet):
 
         return qs
 
+    def _platos_de(self, instancia):
+        return {instancia.id_receta.id_plato_id}
+
 
 
-class CategoriaPlatoViewSet(RoleProtectedViewSet):
+class CategoriaPlatoViewSet(CatalogoCacheadoMixin, RoleProtectedViewSet):
+    catalogo = "categoria_plato"
     queryset = CategoriaPlatos.objects.all().order_by("-id_categoria_plato")
     serializer_class = CategoriaPlatoSerializer
     
 
-class EstadoRecetaViewSet(RoleProtectedViewSet):
+class EstadoRecetaViewSet(CatalogoCacheadoMixin, RoleProtectedViewSet):
+    catalogo = "estado_receta"
     queryset = EstadoReceta.objects.all().order_by("id_estado_receta")
     serializer_class = EstadoRecetaSerializer
     
@@ -1606,19 +1387,46 @@ class DetallePedidoViewSet(RoleProtectedViewSet):
         .order_by("-id_detalle_pedido")
     )
     serializer_class = DetallePedidoSerializer
+
+    def get_queryset(self):
+        # ?id_pedido=<id> (edición de un pedido) / ?id_plato=<id> (¿el plato está en uso?)
+        qs = super().get_queryset()
+        params = self.request.query_params
+        qs = _filtrar_por_id(qs, params, "id_pedido", "id_pedido_id")
+        return _filtrar_por_id(qs, params, "id_plato", "id_plato_id")
+
+    # Cada línea que entra / cambia / sale mueve las reservas de su pedido
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        _sincronizar_reservas_pedido(serializer.instance.id_pedido)
+
+    def perform_update(self, serializer):
+        id_pedido_anterior = serializer.instance.id_pedido_id
+        super().perform_update(serializer)
+        pedido = serializer.instance.id_pedido
+        _sincronizar_reservas_pedido(pedido)
+        if id_pedido_anterior and id_pedido_anterior != pedido.pk:
+            _sincronizar_reservas_pedido(Pedidos.objects.filter(pk=id_pedido_anterior).first())
+
+    def perform_destroy(self, instance):
+        pedido = instance.id_pedido
+        super().perform_destroy(instance)
+        _sincronizar_reservas_pedido(pedido)
     
 
-class EstadoMesasViewSet(ReadOnlyModelViewSet):
+class EstadoMesasViewSet(CatalogoCacheadoMixin, ReadOnlyModelViewSet):
+    catalogo = "estado_mesa"
     queryset = EstadoMesas.objects.all().order_by("id_estado_mesa")
     serializer_class = EstadoMesasSerializer
     permission_classes = [IsAuthenticated]
 
 class MesasViewSet(RoleProtectedViewSet):
-    queryset = Mesas.objects.all().order_by("-id_mesa")
+    queryset = Mesas.objects.select_related("id_estado_mesa").all().order_by("-id_mesa")
     serializer_class = MesasSerializer
     
 
-class EstadoCompraViewSet(ReadOnlyModelViewSet):
+class EstadoCompraViewSet(CatalogoCacheadoMixin, ReadOnlyModelViewSet):
+    catalogo = "estado_compra"
     queryset = EstadoCompra.objects.all().order_by("id_estado_compra")
     serializer_class = EstadoCompraSerializer
     permission_classes = [IsAuthenticated]
@@ -1627,7 +1435,8 @@ class EstadoCompraViewSet(ReadOnlyModelViewSet):
 class CompraViewSet(RoleProtectedViewSet):
     queryset = (
         Compras.objects
-        .select_related("id_empleado", "id_estado_compra", "id_proveedor")
+        .select_related("id_empleado", "id_estado_compra", "id_proveedor", "id_metodo_pago")
+        .prefetch_related("detallecompra_set__id_insumo")
         .all()
         .order_by("-id_compra")
     )
@@ -1668,12 +1477,8 @@ class DetalleCompraViewSet(RoleProtectedViewSet):
     # HELPERS
     # ================================================================
     def _estado_ids_en_proceso(self):
-        ids = []
-        for est in EstadoCompra.objects.all():
-            nombre = (est.estcom_nombre or "").strip().lower().replace("_", " ")
-            if nombre == "en proceso":
-                ids.append(est.id_estado_compra)
-        return ids
+        en_proceso = catalogos.por_nombre("estado_compra", "en proceso")
+        return [en_proceso.id_estado_compra] if en_proceso else []
 
     def _reservado_en_proceso(self, insumo, excluir_compra=None):
         """
@@ -2006,8 +1811,6 @@ class CajaIngresosSemanalesView(APIView):
     }
     """
     def get(self, request):
-        from datetime import datetime, timedelta
-
         hoy = timezone.localdate()
 
         # Recolectar 7 días (no domingos), contando hoy hacia atrás
@@ -2021,25 +1824,17 @@ class CajaIngresosSemanalesView(APIView):
 
         dias = list(reversed(dias))  # ordenar de más viejo → hoy
 
-        ID_INGRESO = 2  # ajustá si tu ID de "ingreso" es otro
-
         nombres = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
         salida = []
 
-        for d in dias:
-            inicio = timezone.make_aware(
-                datetime.combine(d, datetime.min.time())
-            )
-            fin = timezone.make_aware(
-                datetime.combine(d, datetime.max.time())
-            )
+        # Una sola lectura (cacheada) del resumen diario para los 7 días
+        tot_por_dia = {
+            p["periodo"]: p["total"]
+            for p in _serie_de_ingresos("dia", dias[0], dias[-1])
+        }
 
-            total = (
-                MovimientosCaja.objects.filter(
-                    mv_fecha_hora__range=(inicio, fin),
-                    id_tipo_movimiento_caja_id=ID_INGRESO,
-                ).aggregate(s=Sum("mv_monto"))["s"] or Decimal("0.00")
-            )
+        for d in dias:
+            total = tot_por_dia.get(d) or Decimal("0.00")
 
             salida.append({
                 "fecha": d.isoformat(),
@@ -2059,10 +1854,11 @@ class CajaIngresosSemanalesView(APIView):
 class MovimientosCajaViewSet(RoleProtectedViewSet):
     queryset = (
         MovimientosCaja.objects
-        .select_related("id_empleado", "id_tipo_movimiento_caja", "id_metodo_pago", "id_venta")
+        .select_related("id_empleado", "id_tipo_movimiento_caja", "id_metodo_pago")
         .all()
         .order_by("-mv_fecha_hora")
     )
+    pagination_class = CursorMovimientosCaja
 
     def get_serializer_class(self):
         if self.action in ("create", "update", "partial_update"):
@@ -2090,25 +1886,14 @@ class MovimientosCajaViewSet(RoleProtectedViewSet):
         )
         data["id_tipo_movimiento_caja"] = tipo_id
 
-        ID_APERTURA = 1
-        ID_INGRESO  = 2
-        ID_EGRESO   = 3
-        ID_CIERRE   = 4
-
-        # ── Rango del día ─────────────────────────────────────────────
-        hoy = timezone.localdate()
-        inicio_dia = timezone.make_aware(
-            timezone.datetime.combine(hoy, timezone.datetime.min.time())
-        )
-        fin_dia = timezone.make_aware(
-            timezone.datetime.combine(hoy, timezone.datetime.max.time())
-        )
-
-        qs_hoy = MovimientosCaja.objects.filter(mv_fecha_hora__range=(inicio_dia, fin_dia))
+        ID_APERTURA = TIPO_MOV_CAJA["APERTURA"]
+        ID_INGRESO  = TIPO_MOV_CAJA["INGRESO"]
+        ID_EGRESO   = TIPO_MOV_CAJA["EGRESO"]
+        ID_CIERRE   = TIPO_MOV_CAJA["CIERRE"]
 
-        # ── Estado de caja HOY según el ÚLTIMO movimiento ─────────────
-        ultimo = qs_hoy.order_by("mv_fecha_hora").last()
-        caja_abierta = bool(ultimo and ultimo.id_tipo_movimiento_caja_id != ID_CIERRE)
+        # ── Estado de caja HOY (fila sesion_caja bloqueada hasta el commit) ──
+        sesion = caja.sesion_actual(para_actualizar=True)
+        caja_abierta = caja.abierta_hoy(sesion)
 
         # ── No permitir abrir/cerrar dos veces seguidas ───────────────
         if tipo_id == ID_APERTURA and caja_abierta:
@@ -2127,11 +1912,7 @@ class MovimientosCajaViewSet(RoleProtectedViewSet):
         if tipo_id == ID_APERTURA:
             # Apertura: sin venta, método de pago = Efectivo si existe
             data["id_venta"] = None
-            try:
-                efectivo = MetodoDePago.objects.get(metpag_nombre__iexact="Efectivo")
-                data["id_metodo_pago"] = efectivo.id_metodo_pago
-            except MetodoDePago.DoesNotExist:
-                data["id_metodo_pago"] = None
+            data["id_metodo_pago"] = catalogos.id_de("metodo_pago", "Efectivo")
             # mv_monto lo manda el front (monto inicial)
 
         elif tipo_id == ID_INGRESO:
@@ -2159,39 +1940,9 @@ class MovimientosCajaViewSet(RoleProtectedViewSet):
             # CIERRE: tomar SOLO lo que pasó desde la ÚLTIMA APERTURA
             # ────────────────────────────────────────────────────────────
 
-            # Última apertura del día (después de cualquier cierre anterior)
-            ultima_apertura = (
-                qs_hoy.filter(id_tipo_movimiento_caja_id=ID_APERTURA)
-                .order_by("-mv_fecha_hora")
-                .first()
-            )
-
-            if not ultima_apertura:
-                return Response(
-                    {"detail": "No hay una apertura registrada hoy para calcular el cierre."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            inicio_ciclo = ultima_apertura.mv_fecha_hora
-            ahora = timezone.now()
-
-            movimientos_ciclo = qs_hoy.filter(
-                mv_fecha_hora__gte=inicio_ciclo,
-                mv_fecha_hora__lte=ahora,
-            )
-
-            monto_apertura = ultima_apertura.mv_monto or 0
-            ingresos = (
-                movimientos_ciclo.filter(id_tipo_movimiento_caja_id=ID_INGRESO)
-                .aggregate(s=Sum("mv_monto"))["s"] or 0
-            )
-            egresos = (
-                movimientos_ciclo.filter(id_tipo_movimiento_caja_id=ID_EGRESO)
-                .aggregate(s=Sum("mv_monto"))["s"] or 0
-            )
-
+            # La sesión abierta ya acumula apertura, ingresos y egresos del ciclo
             # saldo final de este ciclo: APERTURA (última) + INGRESOS - EGRESOS
-            saldo_final = Decimal(str(monto_apertura)) + Decimal(str(ingresos)) - Decimal(str(egresos))
+            saldo_final = caja.saldo_sesion(sesion)
 
             # ⚠ Para no violar el CHECK (mv_monto >= 0) nunca guardamos negativo
             if saldo_final < 0:
@@ -2212,10 +1963,35 @@ class MovimientosCajaViewSet(RoleProtectedViewSet):
             id_empleado=empleado,
             mv_fecha_hora=ahora,
         )
+        caja.registrar_movimiento(instancia)
+
+        # El ciclo quedó cerrado: guardar su resumen (no cambia más)
+        if tipo_id == ID_CIERRE:
+            caja.guardar_resumen_ciclo(instancia, sesion.id_apertura_id)
 
         read_serializer = MovimientoCajaSerializer(instancia)
         return Response(read_serializer.data, status=status.HTTP_201_CREATED)
 
+    # Editar / borrar un movimiento puede cambiar el ciclo → rehacer sesion_caja,
+    # descartar el resumen del ciclo cerrado que lo contenía y corregir el
+    # resumen diario (se resta la versión vieja y se suma la nueva)
+    @transaction.atomic
+    def perform_update(self, serializer):
+        anterior = copy(serializer.instance)
+        caja.descartar_resumenes_de(anterior)
+        super().perform_update(serializer)
+        caja.descartar_resumenes_de(serializer.instance)
+        caja.sumar_a_resumen_diario(anterior, -1)
+        caja.sumar_a_resumen_diario(serializer.instance)
+        caja.recalcular_sesion()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        caja.descartar_resumenes_de(instance)
+        caja.sumar_a_resumen_diario(instance, -1)
+        super().perform_destroy(instance)
+        caja.recalcular_sesion()
+
     @action(detail=False, methods=["get"], url_path="arqueo")
     def arqueo_caja(self, request):
         """
@@ -2238,14 +2014,14 @@ class MovimientosCajaViewSet(RoleProtectedViewSet):
             .annotate(
                 ingresos=Sum(
                     Case(
-                        When(id_tipo_movimiento_caja=2, then="mv_monto"),
+                        When(id_tipo_movimiento_caja=TIPO_MOV_CAJA["INGRESO"], then="mv_monto"),
                         default=Value(0),
                         output_field=DecimalField(),
                     )
                 ),
                 egresos=Sum(
                     Case(
-                        When(id_tipo_movimiento_caja=3, then="mv_monto"),
+                        When(id_tipo_movimiento_caja=TIPO_MOV_CAJA["EGRESO"], then="mv_monto"),
                         default=Value(0),
                         output_field=DecimalField(),
                     )
@@ -2277,62 +2053,14 @@ class MovimientosCajaViewSet(RoleProtectedViewSet):
             "total_egresos": total_egresos,
             "total_neto": total_ingresos - total_egresos,
         })
-    # ── Helper: ¿la caja está abierta hoy? ──────────────────────────────────────
-    def caja_esta_abierta_hoy():
-        """
-        Devuelve True si, para el día de hoy, el ÚLTIMO movimiento de caja
-        NO es un cierre. Si no hay movimientos, se considera cerrada.
-        """
-        hoy = timezone.localdate()
-        inicio = timezone.make_aware(
-            timezone.datetime.combine(hoy, timezone.datetime.min.time())
-        )
-        fin = timezone.make_aware(
-            timezone.datetime.combine(hoy, timezone.datetime.max.time())
-        )
-
-        qs_hoy = MovimientosCaja.objects.filter(mv_fecha_hora__range=(inicio, fin))
-
-        ultimo = qs_hoy.order_by("mv_fecha_hora").last()
-        if not ultimo:
-            # Nunca se abrió hoy → cerrada
-            return False
-
-        # Si el último movimiento del día es CIERRE → cerrada
-        return ultimo.id_tipo_movimiento_caja_id != TIPO_MOV_CAJA["CIERRE"]
-
-# ── Helper: ¿la caja está abierta hoy? ──────────────────────────────────────
-def caja_esta_abierta_hoy():
-    """
-    Devuelve True si, para el día de hoy, el ÚLTIMO movimiento de caja
-    NO es un cierre. Si no hay movimientos, se considera cerrada.
-    """
-    hoy = timezone.localdate()
-    inicio = timezone.make_aware(
-        timezone.datetime.combine(hoy, timezone.datetime.min.time())
-    )
-    fin = timezone.make_aware(
-        timezone.datetime.combine(hoy, timezone.datetime.max.time())
-    )
-
-    qs_hoy = MovimientosCaja.objects.filter(mv_fecha_hora__range=(inicio, fin))
 
-    ultimo = qs_hoy.order_by("mv_fecha_hora").last()
-    if not ultimo:
-        # Nunca se abrió hoy → cerrada
-        return False
 
-    # Si el último movimiento del día es CIERRE → cerrada
-    return ultimo.id_tipo_movimiento_caja_id != TIPO_MOV_CAJA["CIERRE"]
-
-
-    
 # ──────────────────────────────────────────────────────────────────────────────
 # HISTORIAL DE CAJA (un arqueo por cada cierre)
 # ──────────────────────────────────────────────────────────────────────────────
 class CajaHistorialView(APIView):
     """
-    GET /api/caja/historial/
+    GET /api/caja/historial/?desde=YYYY-MM-DD&hasta=YYYY-MM-DD&page=N&page_size=M
 
     Devuelve una lista de cierres, cada uno con:
     - fecha y hora del cierre
@@ -2341,136 +2069,47 @@ class CajaHistorialView(APIView):
     - ingresos por método de pago
     - egresos por método de pago
     - empleado que hizo la apertura y el cierre
+
+    desde / hasta filtran por fecha del cierre. Con page / page_size
+    responde paginado ({count, next, previous, results}).
+    Cada ciclo sale de resumen_ciclo_caja (escrito al cerrar); solo los
+    ciclos sin resumen se calculan, en bloque (ver caja.resumenes_de_cierres).
     """
     def get(self, request):
+        from django.utils.dateparse import parse_date
 
-        ID_APERTURA = 1
-        ID_INGRESO  = 2
-        ID_EGRESO   = 3
-        ID_CIERRE   = 4
+        cierres = caja.cierres_con_apertura()
 
-        cierres = (
-            MovimientosCaja.objects
-            .filter(id_tipo_movimiento_caja_id=ID_CIERRE)
-            .order_by("-mv_fecha_hora")
-        )
-
-        historial = []
-
-        for cierre in cierres:
-            # Buscar apertura anterior
-            apertura = (
-                MovimientosCaja.objects
-                .filter(
-                    id_tipo_movimiento_caja_id=ID_APERTURA,
-                    mv_fecha_hora__lte=cierre.mv_fecha_hora
-                )
-                .order_by("-mv_fecha_hora")
-                .first()
-            )
-
-            if not apertura:
+        for param, lookup in (("desde", "gte"), ("hasta", "lte")):
+            valor = request.query_params.get(param)
+            if not valor:
                 continue
+            fecha = parse_date(valor)
+            if not fecha:
+                return Response(
+                    {"detail": f"Parámetro '{param}' inválido (usar YYYY-MM-DD)."},
+                    status=400,
+                )
+            cierres = cierres.filter(**{f"mv_fecha_hora__date__{lookup}": fecha})
 
-            # Ciclo entre apertura y cierre
-            movimientos = MovimientosCaja.objects.filter(
-                mv_fecha_hora__gte=apertura.mv_fecha_hora,
-                mv_fecha_hora__lte=cierre.mv_fecha_hora
-            )
-
-            # Agrupar ingresos / egresos por método
-            ingresos_qs = (
-                movimientos.filter(id_tipo_movimiento_caja_id=ID_INGRESO)
-                .values("id_metodo_pago__metpag_nombre")
-                .annotate(total=Sum("mv_monto"))
-                .order_by("id_metodo_pago__metpag_nombre")
-            )
-
-            egresos_qs = (
-                movimientos.filter(id_tipo_movimiento_caja_id=ID_EGRESO)
-                .values("id_metodo_pago__metpag_nombre")
-                .annotate(total=Sum("mv_monto"))
-                .order_by("id_metodo_pago__metpag_nombre")
-            )
-
-            # Pasar a listas mutables
-            ingresos_por_mp = list(ingresos_qs)
-            egresos_por_mp = list(egresos_qs)
+        paginador = PaginacionOpcional()
+        pagina = paginador.paginate_queryset(cierres, request, view=self)
+        cierres = list(pagina if pagina is not None else cierres)
 
-            # ───────── INCLUIR LA APERTURA EN EL MÉTODO EFECTIVO ─────────
-            # Solo para el resumen por método, NO para los totales generales.
-            monto_apertura = apertura.mv_monto or 0
-            nombre_efectivo = None
-            try:
-                if apertura.id_metodo_pago:
-                    nombre_efectivo = apertura.id_metodo_pago.metpag_nombre
-            except Exception:
-                nombre_efectivo = None
-
-            if monto_apertura and nombre_efectivo:
-                encontrado = False
-                for fila in ingresos_por_mp:
-                    if fila["id_metodo_pago__metpag_nombre"] == nombre_efectivo:
-                        fila["total"] = (fila["total"] or 0) + monto_apertura
-                        encontrado = True
-                        break
-                if not encontrado:
-                    ingresos_por_mp.append({
-                        "id_metodo_pago__metpag_nombre": nombre_efectivo,
-                        "total": monto_apertura,
-                    })
-
-            # Totales GENERALES (sin contar la apertura como ingreso)
-            total_ing = sum([(r["total"] or 0) for r in ingresos_qs])
-            total_egr = sum([(r["total"] or 0) for r in egresos_qs])
-
-            total_final = (apertura.mv_monto or 0) + total_ing - total_egr
-
-            # Empleado apertura / cierre
-            def nombre_empleado(mov):
-                try:
-                    emp = mov.id_empleado
-                    if not emp:
-                        return None
-                    nombre = (emp.emp_nombre or "").strip()
-                    apellido = (emp.emp_apellido or "").strip()
-                    full = f"{nombre} {apellido}".strip()
-                    return full or None
-                except Exception:
-                    return None
-
-            apertura_emp = nombre_empleado(apertura)
-            cierre_emp = nombre_empleado(cierre)
-
-            historial.append({
-                "id_cierre": cierre.id_movimiento_caja,  # ← NUEVO
-                "cierre_fecha": cierre.mv_fecha_hora,
-                "apertura_fecha": apertura.mv_fecha_hora,
-                "monto_apertura": float(apertura.mv_monto or 0),
-                "ingresos": float(total_ing),
-                "egresos": float(total_egr),
-                "total_final": float(total_final),
-                "apertura_empleado_nombre": apertura_emp or "-",
-                "cierre_empleado_nombre": cierre_emp or "-",
-                "por_metodo_ingresos": [
-                    {
-                        "metodo": i["id_metodo_pago__metpag_nombre"],
-                        "monto": float(i["total"] or 0),
-                    }
-                    for i in ingresos_por_mp
-                ],
-                "por_metodo_egresos": [
-                    {
-                        "metodo": e["id_metodo_pago__metpag_nombre"],
-                        "monto": float(e["total"] or 0),
-                    }
-                    for e in egresos_por_mp
-                ],
-            })
+        # Ciclos cerrados: resumen guardado al cerrar (o calculado si falta)
+        resumenes = caja.resumenes_de_cierres(cierres)
 
+        historial = [
+            caja.resumen_a_dict(resumenes[cierre.pk])
+            for cierre in cierres
+            if cierre.pk in resumenes
+        ]
 
+        if pagina is not None:
+            return paginador.get_paginated_response(historial)
         return Response(historial, status=200)
 
+
 class CajaHistorialDetalleView(APIView):
     """
     GET /api/caja/historial/<cierre_id>/
@@ -2487,34 +2126,17 @@ class CajaHistorialDetalleView(APIView):
         ID_EGRESO   = TIPO_MOV_CAJA["EGRESO"]    # 3
         ID_CIERRE   = TIPO_MOV_CAJA["CIERRE"]    # 4
 
-        # 1) Buscar el movimiento de CIERRE
-        cierre = (
-            MovimientosCaja.objects
-            .select_related("id_empleado", "id_metodo_pago", "id_tipo_movimiento_caja")
-            .filter(
-                id_tipo_movimiento_caja_id=ID_CIERRE,
-                id_movimiento_caja=cierre_id,
-            )
-            .first()
-        )
+        # 1) Buscar el movimiento de CIERRE (con su apertura anotada)
+        cierre = caja.cierres_con_apertura().filter(id_movimiento_caja=cierre_id).first()
         if not cierre:
             return Response(
                 {"detail": "Cierre no encontrado para ese ID."},
                 status=404,
             )
 
-        # 2) Buscar la APERTURA inmediatamente anterior a ese cierre
-        apertura = (
-            MovimientosCaja.objects
-            .select_related("id_empleado", "id_metodo_pago", "id_tipo_movimiento_caja")
-            .filter(
-                id_tipo_movimiento_caja_id=ID_APERTURA,
-                mv_fecha_hora__lte=cierre.mv_fecha_hora,
-            )
-            .order_by("-mv_fecha_hora")
-            .first()
-        )
-        if not apertura:
+        # 2) Resumen del ciclo (guardado al cerrar, o calculado si falta)
+        resumen = caja.resumenes_de_cierres([cierre]).get(cierre.pk)
+        if not resumen:
             return Response(
                 {"detail": "No se encontró una apertura asociada a ese cierre."},
                 status=404,
@@ -2530,74 +2152,13 @@ class CajaHistorialDetalleView(APIView):
                 "id_venta",
             )
             .filter(
-                mv_fecha_hora__gte=apertura.mv_fecha_hora,
-                mv_fecha_hora__lte=cierre.mv_fecha_hora,
+                mv_fecha_hora__gte=resumen.rcc_fecha_apertura,
+                mv_fecha_hora__lte=resumen.rcc_fecha_cierre,
             )
             .order_by("mv_fecha_hora")
         )
 
-        # 4) Agregados por método de pago (igual que en CajaHistorialView)
-        ingresos_qs = (
-            movimientos.filter(id_tipo_movimiento_caja_id=ID_INGRESO)
-            .values("id_metodo_pago__metpag_nombre")
-            .annotate(total=Sum("mv_monto"))
-            .order_by("id_metodo_pago__metpag_nombre")
-        )
-        egresos_qs = (
-            movimientos.filter(id_tipo_movimiento_caja_id=ID_EGRESO)
-            .values("id_metodo_pago__metpag_nombre")
-            .annotate(total=Sum("mv_monto"))
-            .order_by("id_metodo_pago__metpag_nombre")
-        )
-
-        from decimal import Decimal  # asegurate de tenerlo importado arriba del archivo
-
-        ingresos_por_mp = list(ingresos_qs)
-        egresos_por_mp = list(egresos_qs)
-
-        # Sumar la apertura al método EFECTIVO dentro de los ingresos
-        monto_apertura = apertura.mv_monto or Decimal("0")
-        nombre_efectivo = getattr(apertura.id_metodo_pago, "metpag_nombre", "Efectivo")
-
-        if monto_apertura > 0:
-            idx_existente = None
-            for i, r in enumerate(ingresos_por_mp):
-                if (r["id_metodo_pago__metpag_nombre"] or "Sin método") == nombre_efectivo:
-                    idx_existente = i
-                    break
-
-            if idx_existente is not None:
-                base_total = ingresos_por_mp[idx_existente]["total"] or Decimal("0")
-                ingresos_por_mp[idx_existente]["total"] = base_total + monto_apertura
-            else:
-                ingresos_por_mp.append({
-                    "id_metodo_pago__metpag_nombre": nombre_efectivo,
-                    "total": monto_apertura,
-                })
-
-
-        # Totales generales (sin contar la apertura como ingreso)
-        total_ing = sum((r["total"] or 0) for r in ingresos_qs)
-        total_egr = sum((r["total"] or 0) for r in egresos_qs)
-        total_final = (apertura.mv_monto or 0) + total_ing - total_egr
-
-        # Helpers para nombre de empleado
-        def nombre_empleado(mov):
-            try:
-                emp = mov.id_empleado
-                if not emp:
-                    return None
-                nombre = (emp.emp_nombre or "").strip()
-                apellido = (emp.emp_apellido or "").strip()
-                full = f"{nombre} {apellido}".strip()
-                return full or None
-            except Exception:
-                return None
-
-        apertura_emp = nombre_empleado(apertura)
-        cierre_emp = nombre_empleado(cierre)
-
-        # 5) Serializar movimientos individuales
+        # 4) Serializar movimientos individuales
         movs_serializados = []
         for m in movimientos:
             tipo_nombre = ""
@@ -2629,119 +2190,190 @@ class CajaHistorialDetalleView(APIView):
                 "observacion": getattr(m, "mv_descripcion", "") or "",
             })
 
-        # 6) Armar respuesta
-        data = {
-            "id_cierre": cierre.id_movimiento_caja,
-            "cierre_fecha": cierre.mv_fecha_hora,
-            "apertura_fecha": apertura.mv_fecha_hora,
-            "monto_apertura": float(apertura.mv_monto or 0),
-            "ingresos": float(total_ing),
-            "egresos": float(total_egr),
-            "total_final": float(total_final),
-            "apertura_empleado_nombre": apertura_emp or "-",
-            "cierre_empleado_nombre": cierre_emp or "-",
-            "por_metodo_ingresos": [
-                {
-                    "metodo": i["id_metodo_pago__metpag_nombre"],
-                    "monto": float(i["total"] or 0),
-                }
-                for i in ingresos_por_mp
-            ],
-            "por_metodo_egresos": [
-                {
-                    "metodo": e["id_metodo_pago__metpag_nombre"],
-                    "monto": float(e["total"] or 0),
-                }
-                for e in egresos_por_mp
-            ],
-            "movimientos": movs_serializados,
-        }
+        # 5) Armar respuesta (mismo resumen que el historial + movimientos)
+        data = caja.resumen_a_dict(resumen)
+        data["movimientos"] = movs_serializados
 
         return Response(data, status=200)
 
-class CategoriaProveedorViewSet(RoleProtectedViewSet): # <--- LA SOLUCIÓN
+class CategoriaProveedorViewSet(CatalogoCacheadoMixin, RoleProtectedViewSet): # <--- LA SOLUCIÓN
+    catalogo = "categoria_proveedor"
     queryset = CategoriaProveedores.objects.all().order_by("id_categoria_prov")
     serializer_class = CategoriaProveedorSerializer
     
 
-class CajaIngresosRangoView(APIView):
-    def get(self, request):
-        from decimal import Decimal
-        inicio = request.GET.get("inicio")
-        fin = request.GET.get("fin")
+def _serie_de_ingresos(granularidad, desde=None, hasta=None):
+    """Serie densa de INGRESOS para los endpoints viejos de gráficos."""
+    return caja.series_de_totales([granularidad], desde=desde, hasta=hasta)[granularidad]
 
-        if not inicio or not fin:
-            return Response({"detail": "Parámetros requeridos: inicio, fin"}, status=400)
 
-        qs = (
-            MovimientosCaja.objects
-            .filter(
-                mv_fecha_hora__date__range=(inicio, fin),
-                id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["INGRESO"]
-            )
-            .values("mv_fecha_hora__date")
-            .annotate(total=Sum("mv_monto"))
-            .order_by("mv_fecha_hora__date")
+def _parametros_serie(request):
+    """
+    Lee granularidad / desde / hasta / tipo / metodo del query string.
+    Devuelve (kwargs para caja.series_de_totales, None) o (None, Response 400).
+    """
+    from django.utils.dateparse import parse_date
+
+    params = request.query_params
+    kwargs = {}
+
+    granularidades = [
+        g.strip() for g in (params.get("granularidad") or "dia").split(",") if g.strip()
+    ]
+    invalidas = [g for g in granularidades if g not in caja.GRANULARIDADES]
+    if invalidas or not granularidades:
+        return None, Response(
+            {"detail": f"granularidad inválida (usar {', '.join(caja.GRANULARIDADES)})."},
+            status=400,
         )
+    kwargs["granularidades"] = granularidades
+
+    for param in ("desde", "hasta"):
+        valor = params.get(param)
+        if not valor:
+            continue
+        fecha = parse_date(valor)
+        if not fecha:
+            return None, Response(
+                {"detail": f"Parámetro '{param}' inválido (usar YYYY-MM-DD)."},
+                status=400,
+            )
+        kwargs[param] = fecha
+    if kwargs.get("desde") and kwargs.get("hasta") and kwargs["desde"] > kwargs["hasta"]:
+        return None, Response({"detail": "'desde' no puede ser mayor que 'hasta'."}, status=400)
+
+    # tipo / metodo: id o nombre ("ingreso", "efectivo", ...)
+    for param, opciones in (("tipo", TIPO_MOV_CAJA), ("metodo", METODO_PAGO)):
+        valor = params.get(param)
+        if not valor:
+            continue
+        if valor.isdigit():
+            kwargs[param] = int(valor)
+        elif valor.upper() in opciones:
+            kwargs[param] = opciones[valor.upper()]
+        else:
+            return None, Response(
+                {"detail": f"Parámetro '{param}' inválido (id o uno de: {', '.join(k.lower() for k in opciones)})."},
+                status=400,
+            )
 
-        data = [
-            {
-                "fecha": str(f["mv_fecha_hora__date"]),
-                "ingresos": float(f["total"] or Decimal("0"))
-            }
-            for f in qs
-        ]
+    return kwargs, None
 
-        return Response({"dias": data})
 
-class IngresosHistoricos(APIView):
+class CajaIngresosSerieView(APIView):
     """
-    Devuelve TODOS los ingresos históricos agrupados por día,
-    incluyendo días sin ingresos (como 0).
+    GET /api/caja/ingresos/serie/?granularidad=dia|semana|mes|anio
+        &desde=YYYY-MM-DD&hasta=YYYY-MM-DD&tipo=ingreso&metodo=efectivo
+
+    Serie densa (períodos sin movimientos en 0) de totales por período.
+    - granularidad acepta varias separadas por coma (dia,mes,anio): todas
+      salen de la misma consulta, así un panel arma sus gráficos con un request.
+    - tipo: por defecto ingreso. metodo: opcional (id o nombre).
+    - sin desde arranca en el primer día con datos; sin hasta, hoy.
+
+    { "desde", "hasta", "series": { "dia": [ {periodo, total, cantidad}, ... ] } }
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        from decimal import Decimal
-        from datetime import timedelta
+        kwargs, error = _parametros_serie(request)
+        if error:
+            return error
 
-        # 1) Traemos todos los ingresos
-        movs = (
-            MovimientosCaja.objects
-            .filter(id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["INGRESO"])
-            .exclude(mv_fecha_hora__isnull=True)
-            .order_by("mv_fecha_hora")
-        )
+        series = caja.series_de_totales(**kwargs)
+
+        desde = kwargs.get("desde")
+        if desde is None:
+            primeras = [serie[0]["periodo"] for serie in series.values() if serie]
+            desde = min(primeras) if primeras else None
+
+        return Response({
+            "desde": desde.isoformat() if desde else None,
+            "hasta": (kwargs.get("hasta") or timezone.localdate()).isoformat(),
+            "series": {
+                granularidad: [
+                    {
+                        "periodo": p["periodo"].isoformat(),
+                        "total": f"{p['total']:.2f}",
+                        "cantidad": p["cantidad"],
+                    }
+                    for p in serie
+                ]
+                for granularidad, serie in series.items()
+            },
+        })
+
+
+class CajaIngresosRangoView(APIView):
+    """
+    GET /api/caja/ingresos-rango/?inicio=YYYY-MM-DD&fin=YYYY-MM-DD
+    (también acepta start / end). Ingresos por día, con los días vacíos en 0.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from django.utils.dateparse import parse_date
+
+        inicio = request.GET.get("inicio") or request.GET.get("start")
+        fin = request.GET.get("fin") or request.GET.get("end")
+
+        if not inicio or not fin:
+            return Response({"detail": "Parámetros requeridos: inicio, fin"}, status=400)
 
-        if not movs.exists():
+        desde, hasta = parse_date(inicio), parse_date(fin)
+        if not desde or not hasta:
+            return Response({"detail": "inicio / fin deben tener formato YYYY-MM-DD"}, status=400)
+        if desde > hasta:
             return Response({"dias": []})
 
-        # 2) Rango desde la primera fecha hasta la última
-        fecha_inicio = movs.first().mv_fecha_hora.date()
-        fecha_fin = movs.last().mv_fecha_hora.date()
+        data = [
+            {"fecha": p["periodo"].isoformat(), "ingresos": float(p["total"])}
+            for p in _serie_de_ingresos("dia", desde, hasta)
+        ]
 
-        # 3) Sumamos ingresos por fecha
-        tot_por_dia = {}
-        for m in movs:
-            fecha = m.mv_fecha_hora.date()
-            tot_por_dia[fecha] = tot_por_dia.get(fecha, Decimal("0")) + (m.mv_monto or Decimal("0"))
+        return Response({"dias": data})
 
-        # 4) Generamos todas las fechas del rango
-        dias = []
-        actual = fecha_inicio
-        while actual <= fecha_fin:
-            total = float(tot_por_dia.get(actual, Decimal("0")))
-            dias.append({
-                "fecha": actual.isoformat(),
-                "ingresos": total,
-            })
-            actual += timedelta(days=1)
+def _dias_historicos():
+    """(fecha, total) de todos los ingresos por día, con huecos en 0, leyendo de a bloques."""
+    filas = (
+        (f["rdc_fecha"], f["total"])
+        for f in caja.totales_diarios().iterator(chunk_size=2000)
+    )
+    return caja.dias_con_huecos(filas)
 
-        return Response({"dias": dias})
 
+def _json_dias_en_stream(dias):
+    """Escribe {"dias": [...]} de a un día por vez (misma forma que la respuesta normal)."""
+    yield '{"dias": ['
+    separador = ""
+    for fecha, total in dias:
+        yield separador + json.dumps({"fecha": fecha.isoformat(), "ingresos": float(total)})
+        separador = ", "
+    yield "]}"
 
 
+class IngresosHistoricos(APIView):
+    """
+    Devuelve TODOS los ingresos históricos agrupados por día,
+    incluyendo días sin ingresos (como 0).
+
+    ?stream=1 → la respuesta se escribe a medida que se recorren los días
+    (memoria constante aunque el historial tenga varios años).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.query_params.get("stream") in ("1", "true"):
+            return StreamingHttpResponse(
+                _json_dias_en_stream(_dias_historicos()),
+                content_type="application/json",
+            )
 
+        dias = [
+            {"fecha": fecha.isoformat(), "ingresos": float(total)}
+            for fecha, total in _dias_historicos()
+        ]
+        return Response({"dias": dias})
 
 
 class IngresosSemanaActual(APIView):
@@ -2752,25 +2384,9 @@ class IngresosSemanaActual(APIView):
         # lunes de esta semana
         lunes = hoy - timedelta(days=hoy.weekday())
 
-        qs = (
-            MovimientosCaja.objects
-            .filter(
-                id_tipo_movimiento_caja_id=2,  # Ingreso
-                mv_fecha_hora__date__gte=lunes,
-                mv_fecha_hora__date__lte=hoy,
-            )
-            .annotate(fecha=TruncDate("mv_fecha_hora"))
-            .values("fecha")
-            .annotate(total=Sum("mv_monto"))
-            .order_by("fecha")
-        )
-
         dias = [
-            {
-                "fecha": item["fecha"].isoformat(),
-                "ingresos": float(item["total"] or 0.0),
-            }
-            for item in qs
+            {"fecha": p["periodo"].isoformat(), "ingresos": float(p["total"])}
+            for p in _serie_de_ingresos("dia", lunes, hoy)
         ]
 
         return Response({"dias": dias})
@@ -2779,52 +2395,22 @@ class IngresosMesActualPorSemana(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        from decimal import Decimal
-        from datetime import timedelta
-
         hoy = timezone.localdate()
-        año = hoy.year
-        mes = hoy.month
-
-        # ─────────────────────────────────────────────
-        # 1) Traer todos los INGRESOS del mes actual
-        # ─────────────────────────────────────────────
-        movs = (
-            MovimientosCaja.objects
-            .filter(
-                id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["INGRESO"],
-                mv_fecha_hora__year=año,
-                mv_fecha_hora__month=mes,
-            )
-            .exclude(mv_fecha_hora__isnull=True)
-            .order_by("mv_fecha_hora")
-        )
 
-        # 2) Sumar por día (YYYY-MM-DD)
-        tot_por_dia = {}  # { date(): Decimal }
-        for m in movs:
-            fecha = m.mv_fecha_hora.date()
-            tot_por_dia[fecha] = tot_por_dia.get(fecha, Decimal("0")) + (m.mv_monto or Decimal("0"))
-
-        # 3) Generar todos los días del mes (del 1 hasta HOY)
-        dias = []
-        inicio_mes = hoy.replace(day=1)
-        actual = inicio_mes
-        while actual <= hoy:
-            total = float(tot_por_dia.get(actual, Decimal("0")))
-            dias.append({
-                "fecha": actual.isoformat(),   # "2025-11-01", "2025-11-02", ...
-                "ingresos": total,
-            })
-            actual += timedelta(days=1)
+        # Todos los días del mes (del 1 hasta HOY)
+        dias = [
+            {
+                "fecha": p["periodo"].isoformat(),   # "2025-11-01", "2025-11-02", ...
+                "ingresos": float(p["total"]),
+            }
+            for p in _serie_de_ingresos("dia", hoy.replace(day=1), hoy)
+        ]
 
-        # 4) (Opcional) seguir devolviendo también por semana del mes
+        # (Opcional) seguir devolviendo también por semana del mes
         #    Semana 1: días 1–7, Semana 2: 8–14, etc.
-        grupos_semana = {}  # { semanaMes: Decimal }
+        grupos_semana = {}  # { semanaMes: float }
         for item in dias:
-            # fecha ya viene como string YYYY-MM-DD
-            f_str = item["fecha"]
-            year, month, day = map(int, f_str.split("-"))
+            day = int(item["fecha"][-2:])
             semana_mes = (day - 1) // 7 + 1   # 1..5
             grupos_semana[semana_mes] = grupos_semana.get(semana_mes, 0.0) + item["ingresos"]
 
@@ -2849,26 +2435,14 @@ class IngresosAnioActualPorMes(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        año = timezone.localdate().year
-
-        qs = (
-            MovimientosCaja.objects
-            .filter(
-                id_tipo_movimiento_caja_id=2,
-                mv_fecha_hora__year=año,
-            )
-            .annotate(mes=TruncMonth("mv_fecha_hora"))
-            .values("mes")
-            .annotate(total=Sum("mv_monto"))
-            .order_by("mes")
-        )
+        hoy = timezone.localdate()
 
         meses = [
             {
-                "mes": item["mes"].isoformat(),             # 2025-11-01
-                "ingresos": float(item["total"] or 0.0),
+                "mes": p["periodo"].isoformat(),             # 2025-11-01
+                "ingresos": float(p["total"]),
             }
-            for item in qs
+            for p in _serie_de_ingresos("mes", date(hoy.year, 1, 1), hoy)
         ]
 
         return Response({"meses": meses})
@@ -2877,59 +2451,152 @@ class IngresosPorAnio(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        qs = (
-            MovimientosCaja.objects
-            .filter(id_tipo_movimiento_caja_id=2)
-            .annotate(anio=ExtractYear("mv_fecha_hora"))
-            .values("anio")
-            .annotate(total=Sum("mv_monto"))
-            .order_by("anio")
-        )
-
         años = [
             {
-                "anio": int(item["anio"]),
-                "ingresos": float(item["total"] or 0.0),
+                "anio": p["periodo"].year,
+                "ingresos": float(p["total"]),
             }
-            for item in qs
+            for p in _serie_de_ingresos("anio")
         ]
 
         return Response({"años": años})
 
-class IngresosRango(APIView):
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Bootstrap de pantallas (varios catálogos / listados en un request)
+# ──────────────────────────────────────────────────────────────────────────────
+# sección (mismo nombre que la ruta) → ViewSet que la arma
+SECCIONES_BOOTSTRAP = {
+    # Catálogos (cacheados por versión, ver CatalogoCacheadoMixin)
+    "cargos": CargoViewSet,
+    "estados-empleado": EstadoEmpleadoViewSet,
+    "estados-proveedor": EstadoProveedorViewSet,
+    "categorias-proveedor": CategoriaProveedorViewSet,
+    "estado-ventas": EstadoVentaViewSet,
+    "tipos-pedido": TipoPedidoViewSet,
+    "estados-pedido": EstadoPedidoViewSet,
+    "metodos-pago": MetodoPagoViewSet,
+    "categorias-plato": CategoriaPlatoViewSet,
+    "estado-recetas": EstadoRecetaViewSet,
+    "estados-mesa": EstadoMesasViewSet,
+    "estados-compra": EstadoCompraViewSet,
+    # Listados
+    "platos": PlatoViewSet,
+    "insumos": InsumoViewSet,
+    "clientes": ClienteViewSet,
+    "mesas": MesasViewSet,
+    "empleados": EmpleadosViewSet,
+    "proveedores": ProveedorViewSet,
+    "recetas": RecetaViewSet,
+}
+
+
+def _datos_de_seccion(request, clase):
+    """Lo mismo que devolvería GET /api/<sección>/ (sin paginar), sin pasar otra vez por auth."""
+    vista = clase(request=request, format_kwarg=None, action="list", args=(), kwargs={})
+    queryset = vista.filter_queryset(vista.get_queryset())
+    return vista.get_serializer(queryset, many=True).data
+
+
+class BootstrapView(APIView):
     """
-    GET /api/caja/ingresos-rango/?start=2025-01-01&end=2025-03-31
+    GET /api/bootstrap/?secciones=cargos,estados-empleado,platos
+
+    Devuelve varias secciones en una sola respuesta (una autenticación y
+    un chequeo de roles por request en lugar de uno por GET):
+
+        { "secciones": { "cargos": [...], "platos": [...] },
+          "sin_permiso": [ ... ] }
+
+    - Cada sección es igual al listado de su ruta (/api/cargos/, ...).
+    - Los catálogos salen del cache por versión del catálogo (como mucho
+      CATALOGOS_RESPUESTAS_TTL segundos); los listados se cachean
+      BOOTSTRAP_LISTAS_TTL segundos (0 = no se cachean).
+    - Las secciones que el rol no puede ver (misma regla que RolePermission)
+      no se devuelven y se listan en "sin_permiso".
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        start = request.GET.get("start")
-        end = request.GET.get("end")
+        from django.conf import settings
+        from django.core.cache import cache
+        from .permissions import puede_acceder
 
-        if not start or not end:
+        pedidas = [
+            s.strip() for s in (request.query_params.get("secciones") or "").split(",") if s.strip()
+        ]
+        if not pedidas:
             return Response(
-                {"detail": "Debe enviar parámetros 'start' y 'end' en formato YYYY-MM-DD"},
+                {"detail": f"Parámetro 'secciones' requerido (opciones: {', '.join(SECCIONES_BOOTSTRAP)})."},
                 status=400,
             )
-
-        qs = (
-            MovimientosCaja.objects
-            .filter(
-                id_tipo_movimiento_caja_id=2,
-                mv_fecha_hora__date__range=[start, end],
+        desconocidas = [s for s in pedidas if s not in SECCIONES_BOOTSTRAP]
+        if desconocidas:
+            return Response(
+                {"detail": f"Secciones desconocidas: {', '.join(desconocidas)}."},
+                status=400,
             )
-            .annotate(fecha=TruncDate("mv_fecha_hora"))
-            .values("fecha")
-            .annotate(total=Sum("mv_monto"))
-            .order_by("fecha")
-        )
 
-        dias = [
-            {
-                "fecha": item["fecha"].isoformat(),
-                "ingresos": float(item["total"] or 0.0),
-            }
-            for item in qs
-        ]
+        ttl_listas = getattr(settings, "BOOTSTRAP_LISTAS_TTL", 0)
+        secciones = {}
+        sin_permiso = []
 
-        return Response({"dias": dias})
+        for nombre in pedidas:
+            clase = SECCIONES_BOOTSTRAP[nombre]
+            if RolePermission in clase.permission_classes and not puede_acceder(request.user, f"/api/{nombre}/"):
+                sin_permiso.append(nombre)
+                continue
+
+            catalogo = getattr(clase, "catalogo", None)
+            if catalogo:
+                clave = f"bootstrap:{nombre}:{catalogos.version(catalogo)}"
+                ttl = catalogos.TTL_RESPUESTAS
+            elif ttl_listas:
+                clave = f"bootstrap:{nombre}"
+                ttl = ttl_listas
+            else:
+                secciones[nombre] = _datos_de_seccion(request, clase)
+                continue
+
+            datos = cache.get(clave)
+            if datos is None:
+                datos = list(_datos_de_seccion(request, clase))
+                cache.set(clave, datos, ttl)
+            secciones[nombre] = datos
+
+        return Response({"secciones": secciones, "sin_permiso": sin_permiso})
+
+
+class PerfilSQLView(APIView):
+    """
+    GET    /api/perfil-sql/            resumen por vista (ver pizzeria/middleware.py)
+    GET    /api/perfil-sql/?ultimos=50 los últimos N requests tal cual
+    DELETE /api/perfil-sql/            vacía lo acumulado
+
+    Solo admin. Con PERFIL_SQL apagado devuelve "activo": false y nada más.
+    Los datos son del proceso que atiende el request.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        from django.conf import settings
+        from pizzeria import middleware
+
+        if not getattr(settings, "PERFIL_SQL", False):
+            return Response({"activo": False})
+
+        ultimos = request.query_params.get("ultimos")
+        if ultimos is not None:
+            try:
+                n = int(ultimos)
+            except ValueError:
+                return Response({"detail": "'ultimos' debe ser un entero."}, status=400)
+            return Response({"activo": True, "requests": middleware.ultimos(max(n, 1))})
+
+        return Response({"activo": True, **middleware.resumen()})
+
+    def delete(self, request):
+        from pizzeria import middleware
+
+        middleware.limpiar()
+        return Response(status=status.HTTP_204_NO_CONTENT)
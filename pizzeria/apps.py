@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class PizzeriaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pizzeria'
+
+    def ready(self):
+        # Recargar el registro de catálogos cuando cambia una de sus tablas
+        from pizzeria.api import catalogos
+        catalogos.conectar_senales()
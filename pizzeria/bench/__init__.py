@@ -0,0 +1,17 @@
+# pizzeria/bench/__init__.py
+"""
+Benchmarks de la API (/api) sobre una pizzería sintética en SQLite.
+
+    python manage.py bench_api --settings=core.settings_bench --salida bench.json
+
+- datos.py: tablas (también las no gestionadas) y datos de prueba.
+- escenarios.py: qué requests se miden.
+- medicion.py: consultas, latencia p50 / p95 y memoria pico por escenario.
+- carga.py: carga concurrente (mozos / cajeros) contra un servidor levantado.
+
+El JSON de salida se puede comparar con el de otro commit (--comparar).
+
+Los mismos datos, a cualquier escala y sobre cualquier base, los siembra
+
+    python manage.py seed_pizzeria --escala 40 --semilla 1 --dias 365
+"""
@@ -0,0 +1,357 @@
+# pizzeria/bench/carga.py
+"""
+Carga concurrente sobre el flujo pedido → cobro, contra un servidor real.
+
+Mozos (hilos) crean pedidos (cabecera + líneas, como el frontend) y los
+editan con validar_stock_editar; cajeros cobran los pedidos creados con
+cobrar-y-finalizar, todo a la vez y sobre un grupo chico de platos
+(--platos) para que compitan por los mismos insumos. Al final informa, por operación: requests, rps, errores por tipo
+(sin stock, bloqueos / lock timeout, 4xx, 5xx, red) y latencia p50 / p95 /
+p99; más pedidos cobrados por segundo y cuántos insumos / platos quedaron
+con stock negativo (tiene que ser 0).
+
+Solo usa la biblioteca estándar: corre en cualquier máquina contra
+runserver o gunicorn, sobre SQLite o MySQL. Por ejemplo, con SQLite:
+
+    export BENCH_DB=/tmp/carga.sqlite3
+    python manage.py seed_pizzeria --settings=core.settings_bench --crear-tablas --escala 2
+    python manage.py runserver --settings=core.settings_bench --noreload
+    python -m pizzeria.bench.carga --mozos 8 --cajeros 2 --duracion 60
+
+El día de hoy tiene que tener la caja abierta (seed_pizzeria la deja así).
+"""
+import argparse
+import json
+import math
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+# Ids fijos del código (pizzeria/api/catalogos.py)
+ESTADO_EN_PROCESO = 1
+METODOS_PAGO = (1, 2, 3)
+
+_RE_BLOQUEO = re.compile(r"lock wait timeout|deadlock|database is locked|could not obtain lock", re.IGNORECASE)
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) con interpolación lineal; None si no hay valores."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * p / 100
+    abajo, arriba = math.floor(posicion), math.ceil(posicion)
+    return ordenados[abajo] + (ordenados[arriba] - ordenados[abajo]) * (posicion - abajo)
+
+
+def clasificar(estado, texto):
+    """Tipo de error de una respuesta (None si salió bien)."""
+    if estado is None:
+        return "red"
+    if 200 <= estado < 300:
+        return None
+    if _RE_BLOQUEO.search(texto):
+        return "bloqueo"
+    if estado == 400 and "stock" in texto.lower():
+        return "sin_stock"
+    if estado >= 500:
+        return "5xx"
+    return str(estado)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Cliente HTTP
+# ──────────────────────────────────────────────────────────────────────────────
+class Api:
+    """JSON sobre urllib con JWT (/api/auth/token/); ante un 401 pide otro token."""
+
+    def __init__(self, url, usuario, clave, timeout):
+        self.url = url.rstrip("/")
+        self.usuario = usuario
+        self.clave = clave
+        self.timeout = timeout
+        self.token = None
+        self._lock = threading.Lock()
+        self.autenticar()
+
+    def autenticar(self, vencido=None):
+        with self._lock:
+            # Otro hilo ya lo renovó
+            if vencido is not None and self.token != vencido:
+                return
+            estado, datos, _texto = self._enviar(
+                "POST", "/api/auth/token/", {"username": self.usuario, "password": self.clave}, token=None,
+            )
+            if estado != 200:
+                raise SystemExit(f"No se pudo obtener el token ({estado}): revisar --usuario / --clave.")
+            self.token = datos["access"]
+
+    def _enviar(self, metodo, ruta, cuerpo, token):
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else None
+        pedido = urllib.request.Request(self.url + ruta, data=datos, method=metodo)
+        pedido.add_header("Content-Type", "application/json")
+        pedido.add_header("Accept", "application/json")
+        if token:
+            pedido.add_header("Authorization", f"Bearer {token}")
+        try:
+            with urllib.request.urlopen(pedido, timeout=self.timeout) as respuesta:
+                estado, texto = respuesta.status, respuesta.read().decode("utf-8", "replace")
+        except urllib.error.HTTPError as e:
+            estado, texto = e.code, e.read().decode("utf-8", "replace")
+        except (urllib.error.URLError, OSError) as e:
+            return None, None, str(e)
+        try:
+            return estado, json.loads(texto) if texto else None, texto
+        except ValueError:
+            return estado, None, texto
+
+    def llamar(self, metodo, ruta, cuerpo=None):
+        """(estado, datos, texto, ms). estado None = error de red / timeout."""
+        token = self.token
+        inicio = time.perf_counter()
+        estado, datos, texto = self._enviar(metodo, ruta, cuerpo, token)
+        if estado == 401:
+            self.autenticar(vencido=token)
+            inicio = time.perf_counter()
+            estado, datos, texto = self._enviar(metodo, ruta, cuerpo, self.token)
+        return estado, datos, texto, (time.perf_counter() - inicio) * 1000
+
+    def listar(self, ruta):
+        estado, datos, texto, _ms = self.llamar("GET", ruta)
+        if estado != 200:
+            raise SystemExit(f"GET {ruta} devolvió {estado}: {texto[:200]}")
+        return datos["results"] if isinstance(datos, dict) else datos
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Resultados
+# ──────────────────────────────────────────────────────────────────────────────
+class Resultados:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tiempos = defaultdict(list)
+        self.errores = defaultdict(Counter)
+        self.ejemplos = {}
+
+    def anotar(self, operacion, estado, texto, ms):
+        error = clasificar(estado, texto or "")
+        with self._lock:
+            self.tiempos[operacion].append(ms)
+            if error:
+                self.errores[operacion][error] += 1
+                self.ejemplos.setdefault((operacion, error), (texto or "")[:300])
+        return error is None
+
+    def resumen(self, segundos):
+        operaciones = {}
+        for operacion, tiempos in sorted(self.tiempos.items()):
+            errores = self.errores[operacion]
+            operaciones[operacion] = {
+                "requests": len(tiempos),
+                "rps": round(len(tiempos) / segundos, 2),
+                "ok": len(tiempos) - sum(errores.values()),
+                "tasa_error": round(sum(errores.values()) / len(tiempos), 4),
+                "errores": dict(errores),
+                "p50_ms": round(percentil(tiempos, 50), 1),
+                "p95_ms": round(percentil(tiempos, 95), 1),
+                "p99_ms": round(percentil(tiempos, 99), 1),
+                "max_ms": round(max(tiempos), 1),
+            }
+        return operaciones
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Actores
+# ──────────────────────────────────────────────────────────────────────────────
+def _mozo(api, rng, base, mesas, clientes, platos, por_cobrar, resultados, fin, prob_editar):
+    while time.monotonic() < fin:
+        detalles = [
+            {"id_plato": p, "detped_cantidad": rng.randint(1, 3)}
+            for p in rng.sample(platos, min(len(platos), rng.randint(1, 4)))
+        ]
+        estado, datos, texto, ms = api.llamar("POST", "/api/pedidos/", {
+            **base,
+            "id_mesa": rng.choice(mesas) if mesas else None,
+            "id_cliente": rng.choice(clientes) if clientes else None,
+            "ped_fecha_hora_ini": datetime.now(timezone.utc).isoformat(),
+            "detalles": detalles,
+        })
+        if not resultados.anotar("crear_pedido", estado, texto, ms):
+            continue
+        id_pedido = datos["id_pedido"]
+
+        # Como el frontend: la cabecera valida el stock y después van las líneas
+        for d in detalles:
+            estado, _datos, texto, ms = api.llamar(
+                "POST", "/api/detalle-pedidos/", {"id_pedido": id_pedido, **d},
+            )
+            resultados.anotar("agregar_detalle", estado, texto, ms)
+
+        if rng.random() < prob_editar:
+            editados = [
+                {**d, "_min_cant": d["detped_cantidad"], "detped_cantidad": d["detped_cantidad"] + 1}
+                for d in detalles
+            ]
+            estado, _datos, texto, ms = api.llamar(
+                "POST", f"/api/pedidos/{id_pedido}/validar_stock_editar/", {"detalles": editados},
+            )
+            resultados.anotar("validar_stock_editar", estado, texto, ms)
+
+        por_cobrar.put(id_pedido)
+
+
+def _cajero(api, rng, por_cobrar, resultados, fin, cobrados):
+    while time.monotonic() < fin:
+        try:
+            id_pedido = por_cobrar.get(timeout=0.2)
+        except queue.Empty:
+            continue
+        estado, _datos, texto, ms = api.llamar(
+            "POST", f"/api/pedidos/{id_pedido}/cobrar-y-finalizar/",
+            {"id_metodo_pago": rng.choice(METODOS_PAGO)},
+        )
+        if resultados.anotar("cobrar_y_finalizar", estado, texto, ms):
+            cobrados.append(id_pedido)
+
+
+def stock_negativo(api):
+    """Insumos y platos con stock < 0 (cualquiera es un bug del motor de stock)."""
+    insumos = [i["id_insumo"] for i in api.listar("/api/insumos/") if float(i["ins_stock_actual"] or 0) < 0]
+    platos = [p["id_plato"] for p in api.listar("/api/platos/") if float(p["plt_stock"] or 0) < 0]
+    return {"insumos": insumos, "platos": platos}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Corrida
+# ──────────────────────────────────────────────────────────────────────────────
+def correr(opciones):
+    api = Api(opciones.url, opciones.usuario, opciones.clave, opciones.timeout)
+    rng = random.Random(opciones.semilla)
+
+    empleado = api.llamar("GET", "/api/empleados/me/")[1] or {}
+    platos = [p["id_plato"] for p in api.listar("/api/platos/")]
+    if not platos:
+        raise SystemExit("No hay platos: sembrar la base antes (seed_pizzeria).")
+    base = {
+        "id_empleado": empleado.get("id_empleado"),
+        "id_estado_pedido": ESTADO_EN_PROCESO,
+        "id_tipo_pedido": api.listar("/api/tipos-pedido/")[0]["id_tipo_pedido"],
+    }
+    mesas = [m["id_mesa"] for m in api.listar("/api/mesas/?page=1&page_size=100")]
+    clientes = [c["id_cliente"] for c in api.listar("/api/clientes/?page=1&page_size=100")]
+    # Pocos platos → recetas que comparten insumos → contención
+    calientes = rng.sample(platos, min(len(platos), opciones.platos))
+    negativos_antes = stock_negativo(api)
+
+    por_cobrar = queue.Queue()
+    resultados = Resultados()
+    cobrados = []
+    inicio = time.monotonic()
+    fin = inicio + opciones.duracion
+
+    hilos = [
+        threading.Thread(
+            target=_mozo,
+            args=(api, random.Random(f"{opciones.semilla}-mozo-{i}"), base, mesas, clientes, calientes,
+                  por_cobrar, resultados, fin, opciones.editar),
+        )
+        for i in range(opciones.mozos)
+    ] + [
+        threading.Thread(
+            target=_cajero,
+            args=(api, random.Random(f"{opciones.semilla}-cajero-{i}"), por_cobrar, resultados, fin, cobrados),
+        )
+        for i in range(opciones.cajeros)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.monotonic() - inicio
+
+    return {
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "url": opciones.url,
+        "mozos": opciones.mozos,
+        "cajeros": opciones.cajeros,
+        "platos": len(calientes),
+        "segundos": round(segundos, 1),
+        "pedidos_cobrados_por_s": round(len(cobrados) / segundos, 2),
+        "pedidos_sin_cobrar": por_cobrar.qsize(),
+        "operaciones": resultados.resumen(segundos),
+        "ejemplos_de_error": {f"{op} {error}": texto for (op, error), texto in resultados.ejemplos.items()},
+        "stock_negativo_antes": negativos_antes,
+        "stock_negativo": stock_negativo(api),
+    }
+
+
+def imprimir(reporte, salida=sys.stdout):
+    escribir = lambda linea="": print(linea, file=salida)  # noqa: E731
+    escribir(
+        f"{reporte['segundos']} s, {reporte['mozos']} mozos, {reporte['cajeros']} cajeros, "
+        f"{reporte['platos']} platos: {reporte['pedidos_cobrados_por_s']} pedidos cobrados/s "
+        f"({reporte['pedidos_sin_cobrar']} quedaron sin cobrar)"
+    )
+    escribir()
+    escribir(f"{'operación':<22} {'req':>7} {'rps':>8} {'error':>7} {'p50':>8} {'p95':>8} {'p99':>8}  errores")
+    for operacion, r in reporte["operaciones"].items():
+        escribir(
+            f"{operacion:<22} {r['requests']:>7} {r['rps']:>8.1f} {r['tasa_error']:>7.1%} "
+            f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}  {r['errores'] or ''}"
+        )
+    escribir()
+    for clave, texto in reporte["ejemplos_de_error"].items():
+        escribir(f"  {clave}: {texto[:160]}")
+    nuevos = stock_negativo_nuevo(reporte)
+    if nuevos["insumos"] or nuevos["platos"]:
+        escribir(f"STOCK NEGATIVO durante la carga: insumos {nuevos['insumos']}, platos {nuevos['platos']}")
+    else:
+        escribir("Stock negativo durante la carga: ninguno.")
+    antes = reporte["stock_negativo_antes"]
+    if antes["insumos"] or antes["platos"]:
+        escribir(f"(ya estaban negativos antes: insumos {antes['insumos']}, platos {antes['platos']})")
+
+
+def stock_negativo_nuevo(reporte):
+    """Lo que quedó negativo y antes de la carga no lo estaba."""
+    antes, despues = reporte["stock_negativo_antes"], reporte["stock_negativo"]
+    return {clave: sorted(set(despues[clave]) - set(antes[clave])) for clave in despues}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Servidor (default %(default)s).")
+    parser.add_argument("--usuario", default="bench", help="Usuario admin (default %(default)s, el de seed_pizzeria).")
+    parser.add_argument("--clave", default="bench1234")
+    parser.add_argument("--mozos", type=int, default=8, help="Hilos que crean y editan pedidos (default %(default)s).")
+    parser.add_argument("--cajeros", type=int, default=2, help="Hilos que cobran (default %(default)s).")
+    parser.add_argument("--duracion", type=float, default=60, help="Segundos de carga (default %(default)s).")
+    parser.add_argument("--platos", type=int, default=20, help="Platos distintos en juego (default %(default)s).")
+    parser.add_argument(
+        "--editar", type=float, default=0.5,
+        help="Probabilidad de editar cada pedido con validar_stock_editar (default %(default)s).",
+    )
+    parser.add_argument("--timeout", type=float, default=30, help="Timeout por request en s (default %(default)s).")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", help="Además, guardar el reporte en este JSON.")
+    opciones = parser.parse_args(argv)
+
+    reporte = correr(opciones)
+    imprimir(reporte)
+    if opciones.salida:
+        with open(opciones.salida, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+    # Stock negativo = el motor de stock dejó pasar una carrera
+    nuevos = stock_negativo_nuevo(reporte)
+    return 1 if nuevos["insumos"] or nuevos["platos"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
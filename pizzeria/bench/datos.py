@@ -0,0 +1,513 @@
+# pizzeria/bench/datos.py
+"""
+Pizzería sintética para benchmarks y pruebas de carga (bench_api,
+seed_pizzeria).
+
+- crear_tablas(): migrate + las tablas de los modelos managed=False (en la
+  base real las crea el script SQL; acá salen de los modelos).
+- sembrar(escala, semilla, dias): catálogos, empleados, clientes, mesas,
+  insumos, platos con recetas, proveedores y `dias` de caja cerrados
+  (apertura → pedidos cobrados → compras pagadas → cierre). Hoy queda con
+  la caja abierta y pedidos EN PROCESO (con sus reservas).
+- Mismos (escala, semilla, dias, hasta) → mismos datos. Sin `hasta` las
+  fechas se cuentan hacia atrás desde hoy.
+- Los ids se asignan acá (las tablas a sembrar tienen que estar vacías):
+  sirve igual en SQLite y en MySQL, que no devuelve ids en bulk_create.
+  Las filas se insertan en lotes, en orden de dependencias. Los catálogos
+  que ya existan (la base real los trae del script) se respetan.
+"""
+import itertools
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.utils import timezone
+
+from pizzeria.api import caja, catalogos, stock
+from pizzeria.api.catalogos import ESTADO_PEDIDO, METODO_PAGO, TIPO_MOV_CAJA
+from pizzeria.models import (
+    Clientes, Compras, DetalleCompra, DetallePedidos, DetalleRecetas,
+    DetalleVentas, Empleados, Insumos, Mesas, MovimientosCaja, Pedidos, Platos,
+    Proveedores, ProveedoresXInsumos, Recetas, Ventas,
+)
+
+
+# Filas por unidad de escala
+TAMANIOS = {
+    "empleados": 25,
+    "clientes": 800,
+    "mesas": 30,
+    "insumos": 300,
+    "platos": 120,
+    "proveedores": 40,
+    "pedidos_por_dia": 25,
+    "compras_por_dia": 3,
+    "en_proceso": 150,
+}
+DIAS = 90
+LOTE = 5000
+
+USUARIO_BENCH = "bench"
+CLAVE_BENCH = "bench1234"
+
+# catálogo (ver api/catalogos.py) → {id: nombre}
+CATALOGOS_BASE = {
+    "estado_pedido": {
+        ESTADO_PEDIDO["EN_PROCESO"]: "En proceso",
+        ESTADO_PEDIDO["ENTREGADO"]: "Entregado",
+        ESTADO_PEDIDO["CANCELADO"]: "Cancelado",
+        ESTADO_PEDIDO["FINALIZADO"]: "Finalizado",
+    },
+    "tipo_movimiento": {
+        TIPO_MOV_CAJA["APERTURA"]: "Apertura",
+        TIPO_MOV_CAJA["INGRESO"]: "Ingreso",
+        TIPO_MOV_CAJA["EGRESO"]: "Egreso",
+        TIPO_MOV_CAJA["CIERRE"]: "Cierre",
+    },
+    "metodo_pago": {
+        METODO_PAGO["EFECTIVO"]: "Efectivo",
+        METODO_PAGO["TARJETA"]: "Tarjeta",
+        METODO_PAGO["TRANSFERENCIA"]: "Transferencia",
+    },
+    "estado_venta": {1: "Pagada", 2: "Pendiente"},
+    "estado_compra": {1: "En proceso", 2: "Finalizada"},
+    "estado_mesa": {1: "Libre", 2: "Ocupada"},
+    "estado_plato": {1: "Activo", 2: "Inactivo"},
+    "estado_insumo": {1: "Activo", 2: "Inactivo"},
+    "estado_empleado": {1: "Activo", 2: "Inactivo"},
+    "estado_proveedor": {1: "Activo", 2: "Inactivo"},
+    "estado_receta": {1: "Activo", 2: "Inactivo"},
+    "tipo_pedido": {1: "Mesa", 2: "Delivery", 3: "Mostrador"},
+    "cargo": {1: "Mozo", 2: "Cajero", 3: "Cocinero", 5: "Administrador"},
+    "categoria_plato": {1: "Pizzas", 2: "Empanadas", 3: "Bebidas", 4: "Postres"},
+    "categoria_proveedor": {1: "Almacén", 2: "Carnes", 3: "Lácteos", 4: "Verdulería", 5: "Bebidas"},
+}
+
+CARGO_MOZO, CARGO_CAJERO, CARGO_COCINERO, CARGO_ADMIN = 1, 2, 3, 5
+ESTADO_VENTA_PAGADA = 1
+ESTADO_COMPRA_FINALIZADA = 2
+
+_INSUMOS = (
+    "Harina", "Muzzarella", "Salsa de tomate", "Jamón", "Cebolla", "Aceitunas",
+    "Morrón", "Huevo", "Carne picada", "Pollo", "Albahaca", "Orégano",
+    "Roquefort", "Provolone", "Anchoas", "Champiñones", "Gaseosa", "Cerveza",
+    "Dulce de leche", "Crema",
+)
+_PLATOS = {1: "Pizza", 2: "Empanada", 3: "Bebida", 4: "Postre"}
+_NOMBRES = ("Ana", "Juan", "Lucía", "Martín", "Sofía", "Diego", "Valentina", "Pablo", "Carla", "Tomás")
+_APELLIDOS = ("Pérez", "Gómez", "Rodríguez", "Fernández", "López", "Díaz", "Martínez", "Sosa", "Romero", "Ruiz")
+
+# Orden de inserción (las FKs de MySQL necesitan primero las cabeceras)
+_ORDEN_LOTES = (
+    Pedidos, DetallePedidos, Ventas, DetalleVentas, Compras, DetalleCompra, MovimientosCaja,
+)
+
+
+class BaseNoVacia(Exception):
+    """sembrar() necesita tablas vacías (asigna los ids)."""
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Tablas
+# ──────────────────────────────────────────────────────────────────────────────
+def crear_tablas():
+    """
+    migrate (con --run-syncdb para las apps sin migraciones) y después las
+    tablas de los modelos no gestionados que todavía no existan.
+    """
+    call_command("migrate", run_syncdb=True, interactive=False, verbosity=0)
+    existentes = set(connection.introspection.table_names())
+    no_gestionados = [
+        m for m in apps.get_app_config("pizzeria").get_models()
+        if not m._meta.managed and m._meta.db_table not in existentes
+    ]
+    with connection.schema_editor() as editor:
+        for modelo in no_gestionados:
+            editor.create_model(modelo)
+
+
+def _verificar_vacia():
+    for modelo in (
+        Empleados, Clientes, Mesas, Insumos, Platos, Recetas, DetalleRecetas,
+        Proveedores, ProveedoresXInsumos, *_ORDEN_LOTES,
+    ):
+        if modelo.objects.exists():
+            raise BaseNoVacia(f"La tabla {modelo._meta.db_table} ya tiene datos.")
+
+
+@contextmanager
+def _carga_rapida():
+    """
+    Ajustes de la conexión mientras se siembra (se restauran al salir):
+    SQLite sin fsync en cada commit; MySQL sin chequeos de FK ni de índices
+    únicos secundarios (sembrar() arma ids y relaciones consistentes).
+    """
+    restaurar = []
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("PRAGMA synchronous")
+            restaurar.append(f"PRAGMA synchronous = {cursor.fetchone()[0]}")
+            cursor.execute("PRAGMA synchronous = OFF")
+        elif connection.vendor == "mysql":
+            cursor.execute("SET foreign_key_checks = 0, unique_checks = 0")
+            restaurar.append("SET foreign_key_checks = 1, unique_checks = 1")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for sql in restaurar:
+                cursor.execute(sql)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Lotes
+# ──────────────────────────────────────────────────────────────────────────────
+class _Lotes:
+    """
+    Junta filas y las inserta con bulk_create cuando algún modelo llega a
+    `tamanio`; en cada vaciado van todos los modelos, en _ORDEN_LOTES.
+    """
+
+    def __init__(self, tamanio):
+        self.tamanio = max(1, tamanio)
+        self.pendientes = {modelo: [] for modelo in _ORDEN_LOTES}
+        self.insertadas = dict.fromkeys(_ORDEN_LOTES, 0)
+
+    def agregar(self, obj):
+        filas = self.pendientes[type(obj)]
+        filas.append(obj)
+        if len(filas) >= self.tamanio:
+            self.vaciar()
+
+    def vaciar(self):
+        with transaction.atomic():
+            for modelo in _ORDEN_LOTES:
+                filas = self.pendientes[modelo]
+                if filas:
+                    modelo.objects.bulk_create(filas)
+                    self.insertadas[modelo] += len(filas)
+                    self.pendientes[modelo] = []
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Siembra
+# ──────────────────────────────────────────────────────────────────────────────
+def _a_las(fecha, minutos):
+    """fecha + minutos desde las 00:00, en la zona horaria local."""
+    return timezone.make_aware(datetime.combine(fecha, time()) + timedelta(minutes=minutos))
+
+
+def _sembrar_catalogos():
+    for catalogo, filas in CATALOGOS_BASE.items():
+        modelo, campo = catalogos.CATALOGOS[catalogo]
+        modelo.objects.bulk_create(
+            [modelo(pk=pk, **{campo: nombre}) for pk, nombre in filas.items()],
+            ignore_conflicts=True,
+        )
+
+
+def _sembrar_personas(rng, n):
+    User = get_user_model()
+
+    # El 1 es el administrador (usuario de los benchmarks); el resto se reparte
+    cargos = [CARGO_ADMIN] + [
+        rng.choice((CARGO_MOZO, CARGO_MOZO, CARGO_CAJERO, CARGO_COCINERO))
+        for _ in range(n["empleados"] - 1)
+    ]
+    Empleados.objects.bulk_create([
+        Empleados(
+            pk=i,
+            id_cargo_emp_id=cargo,
+            id_estado_empleado_id=1,
+            emp_nombre=rng.choice(_NOMBRES),
+            emp_apellido=rng.choice(_APELLIDOS),
+            emp_dni=str(20_000_000 + i),
+        )
+        for i, cargo in enumerate(cargos, start=1)
+    ])
+    admin = (
+        User.objects.filter(username=USUARIO_BENCH).first()
+        or User.objects.create_superuser(USUARIO_BENCH, "", CLAVE_BENCH)
+    )
+    Empleados.objects.filter(pk=1).update(usuario=admin)
+
+    Clientes.objects.bulk_create([
+        Clientes(pk=i, cli_nombre=f"{rng.choice(_NOMBRES)} {rng.choice(_APELLIDOS)} {i}")
+        for i in range(1, n["clientes"] + 1)
+    ])
+    Mesas.objects.bulk_create([
+        Mesas(pk=i, ms_numero=i, id_estado_mesa_id=1) for i in range(1, n["mesas"] + 1)
+    ])
+    return {
+        "mozos": [i for i, c in enumerate(cargos, start=1) if c in (CARGO_MOZO, CARGO_ADMIN)],
+        "cajeros": [i for i, c in enumerate(cargos, start=1) if c in (CARGO_CAJERO, CARGO_ADMIN)],
+    }
+
+
+def _sembrar_cocina(rng, n):
+    """Insumos, platos, recetas y proveedores. Devuelve {id_plato: precio}."""
+    Insumos.objects.bulk_create([
+        Insumos(
+            pk=i,
+            id_estado_insumo_id=1,
+            ins_nombre=f"{_INSUMOS[i % len(_INSUMOS)]} {i}",
+            ins_unidad=rng.choice(("kg", "l", "u")),
+            ins_capacidad=rng.choice((None, Decimal("6"), Decimal("12"), Decimal("25"))),
+            ins_stock_actual=Decimal(rng.randint(50_000, 500_000)),
+            ins_punto_reposicion=Decimal("100"),
+            ins_stock_min=Decimal("50"),
+        )
+        for i in range(1, n["insumos"] + 1)
+    ], batch_size=LOTE)
+
+    precios = {}
+    platos = []
+    for i in range(1, n["platos"] + 1):
+        categoria = rng.choice(tuple(_PLATOS))
+        precios[i] = Decimal(rng.randrange(1_500, 15_000, 50))
+        platos.append(Platos(
+            pk=i,
+            id_estado_plato_id=1,
+            id_categoria_plato_id=categoria,
+            plt_nombre=f"{_PLATOS[categoria]} {i}",
+            plt_precio=precios[i],
+            plt_stock=rng.randint(0, 10),
+        ))
+    Platos.objects.bulk_create(platos, batch_size=LOTE)
+
+    # Una receta por plato (mismo id), con 2 a 6 insumos distintos
+    Recetas.objects.bulk_create(
+        [Recetas(pk=i, id_plato_id=i, id_estado_receta_id=1) for i in precios],
+        batch_size=LOTE,
+    )
+    ids_detalle = itertools.count(1)
+    DetalleRecetas.objects.bulk_create([
+        DetalleRecetas(
+            pk=next(ids_detalle),
+            id_receta_id=i,
+            id_insumo_id=id_insumo,
+            detr_cant_unid=Decimal(rng.randint(5, 500)) / 1000,
+        )
+        for i in precios
+        for id_insumo in rng.sample(range(1, n["insumos"] + 1), min(n["insumos"], rng.randint(2, 6)))
+    ], batch_size=LOTE)
+
+    Proveedores.objects.bulk_create([
+        Proveedores(
+            pk=i,
+            id_estado_prov_id=1,
+            id_categoria_prov_id=rng.choice(tuple(CATALOGOS_BASE["categoria_proveedor"])),
+            prov_nombre=f"Proveedor {i}",
+        )
+        for i in range(1, n["proveedores"] + 1)
+    ])
+    ids_pxi = itertools.count(1)
+    ProveedoresXInsumos.objects.bulk_create([
+        ProveedoresXInsumos(
+            pk=next(ids_pxi),
+            id_proveedor_id=id_proveedor,
+            id_insumo_id=id_insumo,
+            precio_unitario=Decimal(rng.randint(100, 5_000)),
+        )
+        for id_insumo in range(1, n["insumos"] + 1)
+        for id_proveedor in rng.sample(range(1, n["proveedores"] + 1), min(n["proveedores"], 2))
+    ], batch_size=LOTE)
+    return precios
+
+
+def _items(rng, precios):
+    """[(id_plato, precio, cantidad)] de un pedido: 1 a 4 platos distintos."""
+    ids = rng.sample(tuple(precios), min(len(precios), rng.randint(1, 4)))
+    return [(i, precios[i], rng.randint(1, 3)) for i in ids]
+
+
+def _sembrar_dia(rng, lotes, ids, n, fecha, precios, personas, caja_abierta):
+    """Un día de caja: movimientos en orden de hora (los ids siguen ese orden)."""
+    cajero = rng.choice(personas["cajeros"])
+    movimientos = [(11 * 60, dict(
+        id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["APERTURA"],
+        id_metodo_pago_id=METODO_PAGO["EFECTIVO"],
+        mv_monto=Decimal("10000"),
+        mv_descripcion="Apertura de caja",
+    ))]
+    saldo = Decimal("10000")
+
+    horas = sorted(rng.randint(11 * 60 + 30, 23 * 60) for _ in range(n["pedidos_por_dia"]))
+    for minutos in horas:
+        items = _items(rng, precios)
+        total = sum((precio * cantidad for _, precio, cantidad in items), Decimal("0"))
+        cancelado = rng.random() < 0.05
+        pedido = next(ids[Pedidos])
+        lotes.agregar(Pedidos(
+            pk=pedido,
+            id_mesa_id=rng.randint(1, n["mesas"]),
+            id_empleado_id=rng.choice(personas["mozos"]),
+            id_cliente_id=rng.randint(1, n["clientes"]),
+            id_estado_pedido_id=ESTADO_PEDIDO["CANCELADO" if cancelado else "FINALIZADO"],
+            id_tipo_pedido_id=rng.choice(tuple(CATALOGOS_BASE["tipo_pedido"])),
+            ped_fecha_hora_ini=_a_las(fecha, minutos - 20),
+            ped_fecha_hora_fin=_a_las(fecha, minutos),
+        ))
+        for id_plato, _, cantidad in items:
+            lotes.agregar(DetallePedidos(
+                pk=next(ids[DetallePedidos]), id_pedido_id=pedido, id_plato_id=id_plato, detped_cantidad=cantidad,
+            ))
+        if cancelado:
+            continue
+
+        metodo = rng.choice(tuple(METODO_PAGO.values()))
+        venta = next(ids[Ventas])
+        lotes.agregar(Ventas(
+            pk=venta,
+            id_cliente_id=rng.randint(1, n["clientes"]),
+            id_empleado_id=cajero,
+            id_estado_venta_id=ESTADO_VENTA_PAGADA,
+            id_metodo_pago_id=metodo,
+            ven_fecha_hora=_a_las(fecha, minutos),
+            ven_monto=total,
+            ven_descripcion=f"Venta de pedido #{pedido}",
+        ))
+        for id_plato, precio, cantidad in items:
+            lotes.agregar(DetalleVentas(
+                pk=next(ids[DetalleVentas]),
+                id_venta_id=venta,
+                id_plato_id=id_plato,
+                detven_precio_uni=precio,
+                detven_cantidad=cantidad,
+            ))
+        movimientos.append((minutos, dict(
+            id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["INGRESO"],
+            id_metodo_pago_id=metodo,
+            id_venta_id=venta,
+            mv_monto=total,
+            mv_descripcion=f"Ingreso por venta #{venta}",
+        )))
+        saldo += total
+
+    for _ in range(n["compras_por_dia"]):
+        minutos = rng.randint(11 * 60 + 30, 23 * 60)
+        compra = next(ids[Compras])
+        lineas = [
+            (id_insumo, Decimal(rng.randint(1, 50)), Decimal(rng.randint(100, 5_000)))
+            for id_insumo in rng.sample(range(1, n["insumos"] + 1), min(n["insumos"], rng.randint(1, 5)))
+        ]
+        total = sum((cant * precio for _, cant, precio in lineas), Decimal("0"))
+        lotes.agregar(Compras(
+            pk=compra,
+            id_empleado_id=cajero,
+            id_estado_compra_id=ESTADO_COMPRA_FINALIZADA,
+            id_proveedor_id=rng.randint(1, n["proveedores"]),
+            id_metodo_pago_id=METODO_PAGO["EFECTIVO"],
+            com_fecha_hora=_a_las(fecha, minutos),
+            com_monto=total,
+            com_pagado=1,
+        ))
+        for id_insumo, cant, precio in lineas:
+            lotes.agregar(DetalleCompra(
+                pk=next(ids[DetalleCompra]),
+                id_compra_id=compra,
+                id_insumo_id=id_insumo,
+                detcom_cantidad=cant,
+                detcom_precio_uni=precio,
+            ))
+        movimientos.append((minutos, dict(
+            id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["EGRESO"],
+            id_metodo_pago_id=METODO_PAGO["EFECTIVO"],
+            id_compra_id=compra,
+            mv_monto=total,
+            mv_descripcion=f"Pago de compra #{compra}",
+        )))
+        saldo -= total
+
+    if caja_abierta:
+        _sembrar_en_proceso(rng, lotes, ids, n, fecha, precios, personas)
+    else:
+        movimientos.append((23 * 60 + 30, dict(
+            id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["CIERRE"],
+            mv_monto=max(saldo, Decimal("0")),
+            mv_descripcion="Cierre de caja",
+        )))
+
+    # sorted es estable: la apertura (11:00) queda primera y el cierre último
+    for minutos, campos in sorted(movimientos, key=lambda m: m[0]):
+        lotes.agregar(MovimientosCaja(
+            pk=next(ids[MovimientosCaja]),
+            id_empleado_id=cajero,
+            mv_fecha_hora=_a_las(fecha, minutos),
+            **campos,
+        ))
+
+
+def _sembrar_en_proceso(rng, lotes, ids, n, fecha, precios, personas):
+    for _ in range(n["en_proceso"]):
+        pedido = next(ids[Pedidos])
+        lotes.agregar(Pedidos(
+            pk=pedido,
+            id_mesa_id=rng.randint(1, n["mesas"]),
+            id_empleado_id=rng.choice(personas["mozos"]),
+            id_cliente_id=rng.randint(1, n["clientes"]),
+            id_estado_pedido_id=ESTADO_PEDIDO["EN_PROCESO"],
+            id_tipo_pedido_id=rng.choice(tuple(CATALOGOS_BASE["tipo_pedido"])),
+            ped_fecha_hora_ini=_a_las(fecha, rng.randint(11 * 60 + 30, 23 * 60)),
+        ))
+        for id_plato, _, cantidad in _items(rng, precios):
+            lotes.agregar(DetallePedidos(
+                pk=next(ids[DetallePedidos]), id_pedido_id=pedido, id_plato_id=id_plato, detped_cantidad=cantidad,
+            ))
+
+
+def sembrar(escala=1, semilla=0, dias=DIAS, lote=LOTE, progreso=None, hasta=None):
+    """
+    Llena una base vacía (ver el docstring del módulo): `dias` días cerrados
+    más `hasta` (default hoy), que queda con la caja abierta.
+    `progreso(dia, dias, lotes)` se llama después de cada día.
+    Devuelve {tabla: filas}.
+    """
+    _verificar_vacia()
+    rng = random.Random(semilla)
+    n = {clave: max(1, round(valor * escala)) for clave, valor in TAMANIOS.items()}
+    ultimo = hasta or timezone.localdate()
+
+    with _carga_rapida():
+        with transaction.atomic():
+            _sembrar_catalogos()
+            personas = _sembrar_personas(rng, n)
+            precios = _sembrar_cocina(rng, n)
+
+        lotes = _Lotes(lote)
+        ids = {modelo: itertools.count(1) for modelo in _ORDEN_LOTES}
+        for i, atras in enumerate(range(dias, -1, -1), start=1):
+            _sembrar_dia(rng, lotes, ids, n, ultimo - timedelta(days=atras), precios, personas, caja_abierta=atras == 0)
+            if progreso:
+                progreso(i, dias + 1, lotes)
+        lotes.vaciar()
+
+    # Tablas derivadas, como quedarían después de operar
+    catalogos.recargar()
+    stock.invalidar_expansion_recetas()
+    stock.reconstruir_reservas(ESTADO_PEDIDO["EN_PROCESO"])
+    caja.reconstruir_resumen_diario()
+    caja.recalcular_sesion()
+    call_command("generar_resumenes_caja", stdout=StringIO())
+
+    return contar_filas()
+
+
+def contar_filas():
+    """{tabla: filas} de las tablas de pizzeria."""
+    return {
+        modelo._meta.db_table: modelo.objects.count()
+        for modelo in apps.get_app_config("pizzeria").get_models()
+        if modelo._meta.db_table.split("_")[0] not in ("auth", "django")
+    }
+
+
+def usuario_bench():
+    """El superusuario que crea sembrar() (vinculado al empleado 1)."""
+    return get_user_model().objects.get(username=USUARIO_BENCH)
@@ -0,0 +1,169 @@
+# pizzeria/bench/escenarios.py
+"""
+Requests que mide el benchmark, armados sobre los datos ya sembrados.
+
+- Cada ruta del router: listado completo, listado paginado (los que no son
+  catálogos) y detalle del primer registro.
+- Acciones: alta de pedido, validar_stock_editar, descontar_insumos,
+  generar_venta, cobrar-y-finalizar, producción de platos, egreso de caja.
+- Reportes de caja (estado, historial, series de ingresos) y bootstrap.
+
+`ruta` y `cuerpo` pueden ser funciones de la repetición (i): las acciones
+que cierran un pedido usan uno distinto en cada vuelta.
+"""
+import itertools
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.utils import timezone
+
+from pizzeria.api.catalogos import ESTADO_PEDIDO, METODO_PAGO, TIPO_MOV_CAJA
+from pizzeria.api.urls import router
+from pizzeria.api.views import CatalogoCacheadoMixin
+from pizzeria.models import DetallePedidos, MovimientosCaja, Pedidos, Platos, Ventas
+
+PREFIJO = "/api/"
+
+
+@dataclass
+class Escenario:
+    nombre: str
+    metodo: str          # "get" | "post"
+    ruta: object         # str o función(i) → str
+    cuerpo: object = None  # dict o función(i) → dict
+
+    def armar(self, i):
+        ruta = self.ruta(i) if callable(self.ruta) else self.ruta
+        cuerpo = self.cuerpo(i) if callable(self.cuerpo) else self.cuerpo
+        return ruta, cuerpo
+
+
+def _modelo(viewset):
+    if viewset.queryset is not None:
+        return viewset.queryset.model
+    return viewset.serializer_class.Meta.model
+
+
+def _rutas_del_router():
+    escenarios = []
+    for prefijo, viewset, _basename in router.registry:
+        ruta = f"{PREFIJO}{prefijo}/"
+        escenarios.append(Escenario(f"{prefijo} listado", "get", ruta))
+        if not issubclass(viewset, CatalogoCacheadoMixin):
+            escenarios.append(Escenario(f"{prefijo} página", "get", f"{ruta}?page=1&page_size=50"))
+        pk = _modelo(viewset).objects.order_by("pk").values_list("pk", flat=True).first()
+        if pk is not None:
+            escenarios.append(Escenario(f"{prefijo} detalle", "get", f"{ruta}{pk}/"))
+    return escenarios
+
+
+def _detalles_de(id_pedido, extra=0):
+    return [
+        {"id_plato": d.id_plato_id, "detped_cantidad": d.detped_cantidad + extra, "_min_cant": d.detped_cantidad}
+        for d in DetallePedidos.objects.filter(id_pedido=id_pedido)
+    ]
+
+
+def _acciones():
+    en_proceso = list(
+        Pedidos.objects
+        .filter(id_estado_pedido_id=ESTADO_PEDIDO["EN_PROCESO"])
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    if not en_proceso:
+        return []
+
+    # Cobrar cierra el pedido: uno distinto por repetición (desde el final,
+    # así no se cruza con los que usan las otras acciones)
+    para_cobrar = itertools.cycle(reversed(en_proceso))
+    para_venta = itertools.cycle(en_proceso)
+    modelo = Pedidos.objects.get(pk=en_proceso[0])
+    detalles_modelo = _detalles_de(modelo.pk)
+    platos = list(Platos.objects.order_by("pk").values_list("pk", flat=True)[:5])
+    venta = Ventas.objects.order_by("-pk").values_list("pk", flat=True).first()
+
+    escenarios = [
+        Escenario("pedidos crear", "post", f"{PREFIJO}pedidos/", lambda i: {
+            "id_empleado": modelo.id_empleado_id,
+            "id_cliente": modelo.id_cliente_id,
+            "id_mesa": modelo.id_mesa_id,
+            "id_estado_pedido": ESTADO_PEDIDO["EN_PROCESO"],
+            "id_tipo_pedido": modelo.id_tipo_pedido_id,
+            "ped_fecha_hora_ini": timezone.now().isoformat(),
+            "ped_descripcion": f"bench {i}",
+            "detalles": detalles_modelo,
+        }),
+        Escenario(
+            "pedidos validar_stock_editar", "post",
+            f"{PREFIJO}pedidos/{modelo.pk}/validar_stock_editar/",
+            {"detalles": _detalles_de(modelo.pk, extra=1)},
+        ),
+        Escenario("pedidos descontar_insumos", "post", f"{PREFIJO}pedidos/{modelo.pk}/descontar_insumos/"),
+        Escenario(
+            "pedidos generar_venta", "post",
+            lambda i: f"{PREFIJO}pedidos/{next(para_venta)}/generar_venta/",
+        ),
+        Escenario(
+            "pedidos cobrar-y-finalizar", "post",
+            lambda i: f"{PREFIJO}pedidos/{next(para_cobrar)}/cobrar-y-finalizar/",
+            {"id_metodo_pago": METODO_PAGO["EFECTIVO"]},
+        ),
+        Escenario("platos producir", "post", f"{PREFIJO}platos/{platos[0]}/producir/", {"cantidad": 1}),
+        Escenario(
+            "platos producir-lote", "post", f"{PREFIJO}platos/producir-lote/",
+            {"items": [{"id_plato": p, "cantidad": 2} for p in platos]},
+        ),
+        Escenario("empleados me", "get", f"{PREFIJO}empleados/me/"),
+        Escenario("movimientos-caja egreso", "post", f"{PREFIJO}movimientos-caja/", {
+            "id_tipo_movimiento_caja": TIPO_MOV_CAJA["EGRESO"],
+            "id_metodo_pago": METODO_PAGO["EFECTIVO"],
+            "mv_monto": "100.00",
+            "mv_descripcion": "bench",
+        }),
+    ]
+    if venta:
+        escenarios.append(Escenario("ventas comprobante-pdf", "get", f"{PREFIJO}ventas/{venta}/comprobante-pdf/"))
+    return escenarios
+
+
+def _reportes():
+    hoy = timezone.localdate()
+    desde = (hoy - timedelta(days=30)).isoformat()
+    cierre = (
+        MovimientosCaja.objects
+        .filter(id_tipo_movimiento_caja_id=TIPO_MOV_CAJA["CIERRE"])
+        .order_by("-pk")
+        .values_list("pk", flat=True)
+        .first()
+    )
+    escenarios = [
+        Escenario("caja estado", "get", f"{PREFIJO}caja/estado/"),
+        Escenario("caja historial", "get", f"{PREFIJO}caja/historial/"),
+        Escenario("caja historial página", "get", f"{PREFIJO}caja/historial/?page=1&page_size=20"),
+        Escenario("caja ingresos-semanales", "get", f"{PREFIJO}caja/ingresos-semanales/"),
+        Escenario("caja ingresos-rango", "get", f"{PREFIJO}caja/ingresos-rango/?inicio={desde}&fin={hoy}"),
+        Escenario("caja ingresos-historicos", "get", f"{PREFIJO}caja/ingresos-historicos/"),
+        Escenario("caja ingresos-historicos stream", "get", f"{PREFIJO}caja/ingresos-historicos/?stream=1"),
+        Escenario("caja ingresos-semana", "get", f"{PREFIJO}caja/ingresos-semana/"),
+        Escenario("caja ingresos-mes-semanas", "get", f"{PREFIJO}caja/ingresos-mes-semanas/"),
+        Escenario("caja ingresos-anio-meses", "get", f"{PREFIJO}caja/ingresos-anio-meses/"),
+        Escenario("caja ingresos-anios", "get", f"{PREFIJO}caja/ingresos-anios/"),
+        Escenario("caja ingresos serie", "get", f"{PREFIJO}caja/ingresos/serie/?granularidad=dia,semana,mes"),
+        Escenario("movimientos-caja arqueo", "get", f"{PREFIJO}movimientos-caja/arqueo/?desde={desde}&hasta={hoy}"),
+        Escenario(
+            "bootstrap", "get",
+            f"{PREFIJO}bootstrap/?secciones=cargos,estados-empleado,metodos-pago,platos,insumos",
+        ),
+    ]
+    if cierre:
+        escenarios.append(Escenario("caja historial detalle", "get", f"{PREFIJO}caja/historial/{cierre}/"))
+    return escenarios
+
+
+def escenarios(filtro=None):
+    """Todos los escenarios (o los que contienen `filtro` en el nombre)."""
+    todos = _rutas_del_router() + _reportes() + _acciones()
+    if filtro:
+        todos = [e for e in todos if filtro in e.nombre]
+    return todos
@@ -0,0 +1,96 @@
+# pizzeria/bench/medicion.py
+"""
+Corre cada escenario con el cliente de DRF y junta:
+
+- consultas SQL por request (mín / máx: si varían, algo depende de los datos);
+- latencia p50 / p95 / media en ms;
+- memoria pico (tracemalloc) de UNA corrida extra: tracemalloc hace más
+  lenta cada asignación, así que no se mezcla con los tiempos;
+- códigos de respuesta (un 4xx / 5xx también es un resultado).
+
+Las primeras `calentamiento` corridas no se cuentan (caches en frío).
+"""
+import math
+import time
+import tracemalloc
+from collections import Counter
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) con interpolación lineal; None si no hay valores."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * p / 100
+    abajo, arriba = math.floor(posicion), math.ceil(posicion)
+    if abajo == arriba:
+        return ordenados[abajo]
+    return ordenados[abajo] + (ordenados[arriba] - ordenados[abajo]) * (posicion - abajo)
+
+
+def _ejecutar(cliente, escenario, i):
+    ruta, cuerpo = escenario.armar(i)
+    if escenario.metodo == "get":
+        respuesta = cliente.get(ruta)
+    else:
+        respuesta = getattr(cliente, escenario.metodo)(ruta, cuerpo or {}, format="json")
+    # Las respuestas en stream consultan la base mientras se leen
+    if getattr(respuesta, "streaming", False):
+        b"".join(respuesta.streaming_content)
+    return respuesta
+
+
+def medir(cliente, escenario, repeticiones=20, calentamiento=1):
+    for i in range(calentamiento):
+        _ejecutar(cliente, escenario, i)
+
+    tiempos, consultas, estados = [], [], Counter()
+    for i in range(calentamiento, calentamiento + repeticiones):
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            respuesta = _ejecutar(cliente, escenario, i)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(len(capturadas))
+        estados[respuesta.status_code] += 1
+
+    tracemalloc.start()
+    try:
+        _ejecutar(cliente, escenario, calentamiento + repeticiones)
+        _actual, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    ruta, _cuerpo = escenario.armar(0)
+    return {
+        "nombre": escenario.nombre,
+        "metodo": escenario.metodo.upper(),
+        "ruta": ruta,
+        "estados": {str(codigo): veces for codigo, veces in sorted(estados.items())},
+        "consultas_min": min(consultas),
+        "consultas_max": max(consultas),
+        "p50_ms": round(percentil(tiempos, 50), 3),
+        "p95_ms": round(percentil(tiempos, 95), 3),
+        "media_ms": round(sum(tiempos) / len(tiempos), 3),
+        "memoria_pico_kb": round(pico / 1024, 1),
+    }
+
+
+def comparar(actual, anterior, umbral=1.2):
+    """
+    Escenarios que empeoraron respecto de un JSON anterior: más consultas
+    (máx.) o p95 más de `umbral` veces mayor. Devuelve [(nombre, motivo)].
+    """
+    previos = {e["nombre"]: e for e in anterior.get("escenarios", [])}
+    peores = []
+    for e in actual["escenarios"]:
+        previo = previos.get(e["nombre"])
+        if previo is None:
+            continue
+        if e["consultas_max"] > previo["consultas_max"]:
+            peores.append((e["nombre"], f"consultas {previo['consultas_max']} → {e['consultas_max']}"))
+        if previo["p95_ms"] and e["p95_ms"] > previo["p95_ms"] * umbral:
+            peores.append((e["nombre"], f"p95 {previo['p95_ms']:.1f} → {e['p95_ms']:.1f} ms"))
+    return peores
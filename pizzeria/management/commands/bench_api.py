@@ -0,0 +1,95 @@
+# pizzeria/management/commands/bench_api.py
+import json
+import subprocess
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from pizzeria.bench import datos, escenarios, medicion
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra una pizzería sintética en SQLite y mide consultas, latencia "
+        "(p50/p95) y memoria pico de los endpoints de /api. "
+        "Usar con --settings=core.settings_bench."
+    )
+    # Los checks no hacen falta y la base todavía no tiene tablas
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--escala", type=float, default=1, help="Multiplica el volumen de datos (default 1).")
+        parser.add_argument("--semilla", type=int, default=0, help="Semilla de los datos (default 0).")
+        parser.add_argument("--dias", type=int, default=datos.DIAS, help=f"Días de caja sembrados (default {datos.DIAS}).")
+        parser.add_argument("--repeticiones", type=int, default=20, help="Corridas medidas por escenario (default 20).")
+        parser.add_argument("--calentamiento", type=int, default=1, help="Corridas previas sin medir (default 1).")
+        parser.add_argument("--solo", help="Solo los escenarios cuyo nombre contiene este texto.")
+        parser.add_argument("--salida", help="Archivo JSON con los resultados.")
+        parser.add_argument("--comparar", help="JSON de una corrida anterior: lista lo que empeoró.")
+        parser.add_argument(
+            "--umbral", type=float, default=1.2,
+            help="Con --comparar: cuántas veces más lento tiene que ser el p95 para avisar (default 1.2).",
+        )
+
+    def handle(self, *args, **options):
+        # Crea tablas y datos: nunca contra la base MySQL de verdad
+        if connection.vendor != "sqlite":
+            raise CommandError("bench_api solo corre sobre SQLite: usar --settings=core.settings_bench.")
+
+        inicio = time.perf_counter()
+        datos.crear_tablas()
+        try:
+            filas = datos.sembrar(escala=options["escala"], semilla=options["semilla"], dias=options["dias"])
+        except datos.BaseNoVacia as e:
+            raise CommandError(f"{e} Usar una base vacía (BENCH_DB sin definir = en memoria).")
+        self.stdout.write(f"Datos sembrados en {time.perf_counter() - inicio:.1f} s.")
+
+        cliente = APIClient(raise_request_exception=False, HTTP_HOST="localhost")
+        cliente.force_authenticate(user=datos.usuario_bench())
+
+        resultados = []
+        for escenario in escenarios.escenarios(options["solo"]):
+            r = medicion.medir(cliente, escenario, options["repeticiones"], options["calentamiento"])
+            resultados.append(r)
+            self.stdout.write(
+                f"{r['nombre']:<40} {r['consultas_max']:>4} q  "
+                f"p50 {r['p50_ms']:>8.1f} ms  p95 {r['p95_ms']:>8.1f} ms  "
+                f"{r['memoria_pico_kb']:>9.1f} KB  {r['estados']}"
+            )
+
+        salida = {
+            "fecha": timezone.now().isoformat(),
+            "commit": _commit_actual(),
+            "escala": options["escala"],
+            "semilla": options["semilla"],
+            "dias": options["dias"],
+            "repeticiones": options["repeticiones"],
+            "filas": filas,
+            "escenarios": resultados,
+        }
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as f:
+                json.dump(salida, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}."))
+
+        if options["comparar"]:
+            with open(options["comparar"], encoding="utf-8") as f:
+                anterior = json.load(f)
+            peores = medicion.comparar(salida, anterior, options["umbral"])
+            for nombre, motivo in peores:
+                self.stdout.write(self.style.WARNING(f"Empeoró: {nombre}: {motivo}"))
+            if not peores:
+                self.stdout.write(self.style.SUCCESS("Sin regresiones respecto de la corrida anterior."))
+
+
+def _commit_actual():
+    try:
+        resultado = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return resultado.stdout.strip()
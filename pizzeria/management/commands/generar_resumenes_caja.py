@@ -0,0 +1,49 @@
+# pizzeria/management/commands/generar_resumenes_caja.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from pizzeria.api import caja
+from pizzeria.models import ResumenCicloCaja
+
+
+class Command(BaseCommand):
+    help = "Genera resumen_ciclo_caja para los cierres que todavía no lo tienen."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lote", type=int, default=200,
+            help="Cierres procesados por consulta (default 200).",
+        )
+        parser.add_argument(
+            "--rehacer", action="store_true",
+            help="Borra los resúmenes existentes y los vuelve a generar.",
+        )
+
+    def handle(self, *args, **options):
+        lote = max(1, options["lote"])
+
+        if options["rehacer"]:
+            ResumenCicloCaja.objects.all().delete()
+
+        cierres = caja.cierres_con_apertura().exclude(
+            id_movimiento_caja__in=ResumenCicloCaja.objects.values("id_cierre_id")
+        )
+
+        creados = 0
+        ultimo_id = None
+        while True:
+            qs = cierres.order_by("id_movimiento_caja")
+            if ultimo_id is not None:
+                qs = qs.filter(id_movimiento_caja__gt=ultimo_id)
+            pagina = list(qs[:lote])
+            if not pagina:
+                break
+            ultimo_id = pagina[-1].pk
+
+            # Todos los de la página son nuevos (se excluyeron los ya guardados)
+            nuevos = list(caja.resumenes_de_cierres(pagina).values())
+            with transaction.atomic():
+                ResumenCicloCaja.objects.bulk_create(nuevos)
+            creados += len(nuevos)
+
+        self.stdout.write(self.style.SUCCESS(f"Resúmenes generados: {creados}."))
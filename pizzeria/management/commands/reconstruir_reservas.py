@@ -0,0 +1,14 @@
+# pizzeria/management/commands/reconstruir_reservas.py
+from django.core.management.base import BaseCommand
+
+from pizzeria.api import stock
+from pizzeria.api.catalogos import ESTADO_PEDIDO
+
+
+class Command(BaseCommand):
+    help = "Rehace la tabla reserva_insumos a partir de los pedidos EN PROCESO."
+
+    def handle(self, *args, **options):
+        stock.invalidar_expansion_recetas()
+        filas = stock.reconstruir_reservas(ESTADO_PEDIDO["EN_PROCESO"])
+        self.stdout.write(self.style.SUCCESS(f"Reservas reconstruidas: {filas} filas."))
@@ -0,0 +1,12 @@
+# pizzeria/management/commands/reconstruir_resumen_diario.py
+from django.core.management.base import BaseCommand
+
+from pizzeria.api import caja
+
+
+class Command(BaseCommand):
+    help = "Rehace la tabla resumen_diario_caja a partir de movimientos_caja."
+
+    def handle(self, *args, **options):
+        filas = caja.reconstruir_resumen_diario()
+        self.stdout.write(self.style.SUCCESS(f"Resumen diario reconstruido: {filas} filas."))
@@ -0,0 +1,78 @@
+# pizzeria/management/commands/seed_pizzeria.py
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pizzeria.bench import datos
+from pizzeria.models import MovimientosCaja
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra una pizzería sintética (catálogos, empleados, insumos con capacidades, "
+        "platos con recetas, pedidos abiertos y cerrados, ventas, compras y días de caja "
+        "apertura → ingresos / egresos → cierre). Mismos parámetros y semilla → mismos datos. "
+        "Las tablas a sembrar tienen que estar vacías."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--escala", "--scale", type=float, default=1,
+            help=f"Multiplica el volumen (default 1 = {datos.TAMANIOS['pedidos_por_dia']} pedidos por día).",
+        )
+        parser.add_argument("--semilla", "--seed", type=int, default=0, help="Semilla (default 0).")
+        parser.add_argument(
+            "--dias", type=int, default=datos.DIAS,
+            help=f"Días de caja cerrados antes de --hasta (default {datos.DIAS}).",
+        )
+        parser.add_argument(
+            "--hasta", type=date.fromisoformat,
+            help="Último día (AAAA-MM-DD), queda con la caja abierta. Default hoy; fijarlo hace las fechas reproducibles.",
+        )
+        parser.add_argument(
+            "--lote", type=int, default=datos.LOTE,
+            help=f"Filas por bulk_create (default {datos.LOTE}).",
+        )
+        parser.add_argument(
+            "--crear-tablas", action="store_true",
+            help="Antes de sembrar: migrate y las tablas no gestionadas que falten (base nueva).",
+        )
+
+    def handle(self, *args, **options):
+        if options["escala"] <= 0 or options["dias"] < 0:
+            raise CommandError("--escala tiene que ser mayor a 0 y --dias no puede ser negativo.")
+
+        if options["crear_tablas"]:
+            datos.crear_tablas()
+
+        inicio = time.perf_counter()
+        cada = max(1, (options["dias"] + 1) // 20)
+
+        def progreso(dia, total, lotes):
+            if dia % cada and dia != total:
+                return
+            movimientos = lotes.insertadas[MovimientosCaja] + len(lotes.pendientes[MovimientosCaja])
+            self.stdout.write(
+                f"  día {dia}/{total}: {movimientos:,} movimientos ({time.perf_counter() - inicio:.0f} s)"
+            )
+
+        try:
+            filas = datos.sembrar(
+                escala=options["escala"],
+                semilla=options["semilla"],
+                dias=options["dias"],
+                lote=options["lote"],
+                progreso=progreso,
+                hasta=options["hasta"],
+            )
+        except datos.BaseNoVacia as e:
+            raise CommandError(f"{e} seed_pizzeria solo siembra tablas vacías.")
+
+        for tabla, cantidad in sorted(filas.items()):
+            self.stdout.write(f"  {tabla:<30} {cantidad:>12,}")
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo en {segundos:.1f} s ({filas.get(MovimientosCaja._meta.db_table, 0) / segundos:,.0f} movimientos/s). "
+            f"Usuario: {datos.USUARIO_BENCH} / {datos.CLAVE_BENCH}"
+        ))
@@ -0,0 +1,256 @@
+# pizzeria/middleware.py
+"""
+Perfil de SQL por request (settings.PERFIL_SQL).
+
+Por cada request guarda: vista, consultas, tiempo total de SQL, consultas
+repetidas (misma huella = mismo SQL salvo los valores: el síntoma de un
+N+1), consultas lentas y tiempo de serialización (serializer.data + render
+JSON de DRF, incluye el SQL que se dispare ahí).
+
+- Apagado, el middleware se saca solo de la cadena (MiddlewareNotUsed) y no
+  se instrumenta nada.
+- Cada proceso guarda los últimos PERFIL_SQL_MEMORIA requests: los expone
+  /api/perfil-sql/ (solo admin). Con varios workers cada uno tiene los
+  suyos; el log (PERFIL_SQL_LOG, una línea JSON por request, rota por
+  tamaño) junta todos.
+- Las respuestas en stream se miden hasta que arrancan: lo que consultan
+  mientras se envían no entra.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger("pizzeria.perfil_sql")
+
+# Vistas que no se registran (el propio reporte)
+VISTAS_EXCLUIDAS = {"perfil-sql"}
+
+_registros = deque(maxlen=1000)
+_lock = threading.Lock()
+_local = threading.local()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Huellas
+# ──────────────────────────────────────────────────────────────────────────────
+_RE_LISTA_IN = re.compile(r"\bIN \((?:\s*(?:%s|\?|'[^']*'|-?\d+(?:\.\d+)?)\s*,?)+\)", re.IGNORECASE)
+_RE_TEXTO = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_RE_NUMERO = re.compile(r"\b-?\d+(?:\.\d+)?\b")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar_sql(sql):
+    """SQL sin valores: `IN (1, 2, 3)` → `IN (...)`, literales → ?."""
+    sql = _RE_LISTA_IN.sub("IN (...)", sql)
+    sql = _RE_TEXTO.sub("?", sql)
+    sql = _RE_NUMERO.sub("?", sql)
+    return _RE_ESPACIOS.sub(" ", sql).strip()
+
+
+def huella(sql):
+    return hashlib.sha1(normalizar_sql(sql).encode()).hexdigest()[:12]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Medición de un request
+# ──────────────────────────────────────────────────────────────────────────────
+class _Medidor:
+    """execute_wrapper que anota cada consulta (sql, ms) del request."""
+
+    def __init__(self):
+        self.consultas = []
+        self.serializacion_ms = 0.0
+        self.serializando = False
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append((sql, (time.perf_counter() - inicio) * 1000))
+
+
+def _cronometrar(funcion, *args, **kwargs):
+    medidor = getattr(_local, "medidor", None)
+    # Serializers anidados: cuenta solo el de afuera
+    if medidor is None or medidor.serializando:
+        return funcion(*args, **kwargs)
+    medidor.serializando = True
+    inicio = time.perf_counter()
+    try:
+        return funcion(*args, **kwargs)
+    finally:
+        medidor.serializacion_ms += (time.perf_counter() - inicio) * 1000
+        medidor.serializando = False
+
+
+def _instrumentar_drf():
+    """Envuelve serializer.data y JSONRenderer.render (una sola vez)."""
+    from rest_framework import renderers, serializers
+
+    if getattr(serializers.BaseSerializer, "_perfil_sql", False):
+        return
+    data = serializers.BaseSerializer.data.fget
+    render = renderers.JSONRenderer.render
+
+    serializers.BaseSerializer.data = property(lambda self: _cronometrar(data, self))
+    renderers.JSONRenderer.render = lambda self, *a, **k: _cronometrar(render, self, *a, **k)
+    serializers.BaseSerializer._perfil_sql = True
+
+
+def _configurar_log():
+    ruta = getattr(settings, "PERFIL_SQL_LOG", None)
+    if not ruta or logger.handlers:
+        return
+    handler = RotatingFileHandler(
+        ruta,
+        maxBytes=getattr(settings, "PERFIL_SQL_LOG_BYTES", 5 * 1024 * 1024),
+        backupCount=getattr(settings, "PERFIL_SQL_LOG_ARCHIVOS", 3),
+        encoding="utf-8",
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class PerfilSQLMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "PERFIL_SQL", False):
+            raise MiddlewareNotUsed
+        global _registros
+        _registros = deque(_registros, maxlen=getattr(settings, "PERFIL_SQL_MEMORIA", 1000))
+        self.lenta_ms = getattr(settings, "PERFIL_SQL_LENTA_MS", 100)
+        _instrumentar_drf()
+        _configurar_log()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medidor = _Medidor()
+        _local.medidor = medidor
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as pila:
+                for alias in connections:
+                    pila.enter_context(connections[alias].execute_wrapper(medidor))
+                response = self.get_response(request)
+        finally:
+            _local.medidor = None
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        vista = match.view_name if match else None
+        if vista not in VISTAS_EXCLUIDAS:
+            registrar(self._registro(request, response, vista, total_ms, medidor))
+        return response
+
+    def _registro(self, request, response, vista, total_ms, medidor):
+        veces = Counter()
+        ejemplo = {}
+        for sql, _ms in medidor.consultas:
+            h = huella(sql)
+            veces[h] += 1
+            ejemplo.setdefault(h, sql)
+
+        return {
+            "fecha": timezone.now().isoformat(),
+            "metodo": request.method,
+            "ruta": request.path,
+            "vista": vista,
+            "estado": response.status_code,
+            "stream": bool(getattr(response, "streaming", False)),
+            "total_ms": round(total_ms, 2),
+            "consultas": len(medidor.consultas),
+            "sql_ms": round(sum(ms for _sql, ms in medidor.consultas), 2),
+            "serializacion_ms": round(medidor.serializacion_ms, 2),
+            "duplicadas": [
+                {"huella": h, "veces": n, "sql": normalizar_sql(ejemplo[h])}
+                for h, n in veces.most_common(5)
+                if n > 1
+            ],
+            "lentas": [
+                {"ms": round(ms, 2), "sql": sql}
+                for sql, ms in medidor.consultas
+                if ms >= self.lenta_ms
+            ],
+        }
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Registros y reporte
+# ──────────────────────────────────────────────────────────────────────────────
+def registrar(registro):
+    with _lock:
+        _registros.append(registro)
+    if logger.handlers:
+        logger.info(json.dumps(registro, ensure_ascii=False))
+
+
+def ultimos(n=None):
+    with _lock:
+        registros = list(_registros)
+    return registros[-n:] if n else registros
+
+
+def limpiar():
+    with _lock:
+        _registros.clear()
+
+
+def _p95(valores):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))]
+
+
+def resumen():
+    """
+    Por vista (de la peor en SQL total a la mejor): requests, consultas
+    media/máx, SQL y serialización medios, p95 del total y las huellas que
+    más se repiten. Más las consultas más lentas de todos los requests.
+    """
+    por_vista = defaultdict(list)
+    registros = ultimos()
+    for r in registros:
+        por_vista[(r["metodo"], r["vista"])].append(r)
+
+    vistas = []
+    for (metodo, vista), rs in por_vista.items():
+        repetidas = Counter()
+        sql_de = {}
+        for r in rs:
+            for d in r["duplicadas"]:
+                repetidas[d["huella"]] += d["veces"]
+                sql_de[d["huella"]] = d["sql"]
+        vistas.append({
+            "metodo": metodo,
+            "vista": vista,
+            "requests": len(rs),
+            "consultas_media": round(sum(r["consultas"] for r in rs) / len(rs), 1),
+            "consultas_max": max(r["consultas"] for r in rs),
+            "sql_ms_media": round(sum(r["sql_ms"] for r in rs) / len(rs), 2),
+            "sql_ms_total": round(sum(r["sql_ms"] for r in rs), 2),
+            "serializacion_ms_media": round(sum(r["serializacion_ms"] for r in rs) / len(rs), 2),
+            "total_ms_p95": _p95([r["total_ms"] for r in rs]),
+            "duplicadas": [
+                {"huella": h, "veces": n, "sql": sql_de[h]} for h, n in repetidas.most_common(5)
+            ],
+        })
+    vistas.sort(key=lambda v: v["sql_ms_total"], reverse=True)
+
+    lentas = sorted(
+        ({**c, "vista": r["vista"], "fecha": r["fecha"]} for r in registros for c in r["lentas"]),
+        key=lambda c: c["ms"],
+        reverse=True,
+    )[:20]
+    return {"requests": len(registros), "vistas": vistas, "lentas": lentas}
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pizzeria', '0010_add_fk_metodo_pago_to_ventas_y_compras'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaInsumos',
+            fields=[
+                ('id_reserva', models.AutoField(primary_key=True, serialize=False)),
+                ('resins_cantidad', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('id_insumo', models.ForeignKey(db_column='id_insumo', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='pizzeria.insumos')),
+                ('id_pedido', models.ForeignKey(db_column='id_pedido', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='pizzeria.pedidos')),
+            ],
+            options={
+                'db_table': 'reserva_insumos',
+                'indexes': [models.Index(fields=['id_insumo', 'resins_cantidad'], name='idx_resins_insumo')],
+                'unique_together': {('id_pedido', 'id_insumo')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pizzeria', '0011_reserva_insumos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SesionCaja',
+            fields=[
+                ('id_sesion_caja', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('ses_abierta', models.BooleanField(default=False)),
+                ('ses_fecha_apertura', models.DateTimeField(blank=True, null=True)),
+                ('ses_monto_apertura', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('ses_ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ses_egresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ses_ingresos_efectivo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ses_egresos_efectivo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ses_actualizado', models.DateTimeField(auto_now=True)),
+                ('id_apertura', models.ForeignKey(blank=True, db_column='id_apertura', db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='pizzeria.movimientoscaja')),
+            ],
+            options={
+                'db_table': 'sesion_caja',
+            },
+        ),
+    ]
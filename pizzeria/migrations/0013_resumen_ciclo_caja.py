@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pizzeria', '0012_sesion_caja'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenCicloCaja',
+            fields=[
+                ('id_resumen_ciclo', models.AutoField(primary_key=True, serialize=False)),
+                ('rcc_fecha_apertura', models.DateTimeField()),
+                ('rcc_fecha_cierre', models.DateTimeField(db_index=True)),
+                ('rcc_monto_apertura', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('rcc_ingresos', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('rcc_egresos', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('rcc_total_final', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('rcc_apertura_empleado', models.CharField(blank=True, max_length=150, null=True)),
+                ('rcc_cierre_empleado', models.CharField(blank=True, max_length=150, null=True)),
+                ('rcc_por_metodo_ingresos', models.JSONField(default=list)),
+                ('rcc_por_metodo_egresos', models.JSONField(default=list)),
+                ('id_apertura', models.ForeignKey(db_column='id_apertura', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='pizzeria.movimientoscaja')),
+                ('id_cierre', models.OneToOneField(db_column='id_cierre', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='pizzeria.movimientoscaja')),
+            ],
+            options={
+                'db_table': 'resumen_ciclo_caja',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pizzeria', '0013_resumen_ciclo_caja'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiarioCaja',
+            fields=[
+                ('id_resumen_diario', models.AutoField(primary_key=True, serialize=False)),
+                ('rdc_fecha', models.DateField()),
+                ('rdc_tipo', models.PositiveSmallIntegerField()),
+                ('rdc_metodo_pago', models.PositiveIntegerField(default=0)),
+                ('rdc_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('rdc_cantidad', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'resumen_diario_caja',
+                'indexes': [models.Index(fields=['rdc_tipo', 'rdc_fecha'], name='idx_rdc_tipo_fecha')],
+                'unique_together': {('rdc_fecha', 'rdc_tipo', 'rdc_metodo_pago')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def reconstruir(apps, schema_editor):
+    # Mismo cálculo que `manage.py reconstruir_resumen_diario`: el resumen
+    # tiene que tener toda la historia antes del primer movimiento nuevo
+    # (registrar_movimiento solo suma el suyo).
+    from pizzeria.api import caja
+
+    caja.reconstruir_resumen_diario()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pizzeria', '0014_resumen_diario_caja'),
+    ]
+
+    operations = [
+        migrations.RunPython(reconstruir, migrations.RunPython.noop),
+    ]
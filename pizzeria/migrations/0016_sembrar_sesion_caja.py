@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def sembrar(apps, schema_editor):
+    # La fila de sesion_caja se arma una vez desde movimientos_caja; después
+    # registrar_movimiento solo suma cada movimiento nuevo.
+    from pizzeria.api import caja
+
+    caja.recalcular_sesion()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pizzeria', '0015_reconstruir_resumen_diario'),
+    ]
+
+    operations = [
+        migrations.RunPython(sembrar, migrations.RunPython.noop),
+    ]
@@ -217,7 +217,12 @@ class DetalleVentas(models.Model):
     id_plato = models.ForeignKey('Platos', models.DO_NOTHING, db_column='id_plato')
     detven_precio_uni = models.DecimalField(max_digits=12, decimal_places=2)
     detven_cantidad = models.PositiveIntegerField()
-    detven_subtotal = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    # Columna generada en MySQL (precio_uni * cantidad): Django no la envía en INSERT / UPDATE
+    detven_subtotal = models.GeneratedField(
+        expression=models.F('detven_precio_uni') * models.F('detven_cantidad'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+    )
 
     class Meta:
         managed = False
@@ -580,3 +585,104 @@ class EstadoReceta(models.Model):
 # ── NUEVO catálogo ─────────────────────────────────────────
 
 
+
+# --- Reservas de insumos de pedidos EN PROCESO ---
+# Una fila por (pedido, insumo). Se recalcula cuando cambian los detalles
+# o el estado del pedido y se libera al salir de EN PROCESO.
+class ReservaInsumos(models.Model):
+    id_reserva = models.AutoField(primary_key=True)
+    id_pedido = models.ForeignKey(
+        Pedidos, models.DO_NOTHING,
+        db_column='id_pedido',
+        db_constraint=False,
+    )
+    id_insumo = models.ForeignKey(
+        Insumos, models.DO_NOTHING,
+        db_column='id_insumo',
+        db_constraint=False,
+    )
+    resins_cantidad = models.DecimalField(max_digits=14, decimal_places=3)
+
+    class Meta:
+        db_table = 'reserva_insumos'
+        unique_together = (('id_pedido', 'id_insumo'),)
+        indexes = [
+            models.Index(fields=['id_insumo', 'resins_cantidad'], name='idx_resins_insumo'),
+        ]
+
+
+# --- Estado de la caja (una sola fila, id_sesion_caja = 1) ---
+# Lo mantienen las aperturas / cierres / movimientos (api/caja.py) para que
+# "¿la caja está abierta?" sea una lectura por clave primaria.
+class SesionCaja(models.Model):
+    id_sesion_caja = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    ses_abierta = models.BooleanField(default=False)
+    id_apertura = models.ForeignKey(
+        MovimientosCaja, models.DO_NOTHING,
+        db_column='id_apertura',
+        db_constraint=False,
+        blank=True, null=True,
+        related_name='+',
+    )
+    ses_fecha_apertura = models.DateTimeField(blank=True, null=True)
+    ses_monto_apertura = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    ses_ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ses_egresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ses_ingresos_efectivo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ses_egresos_efectivo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ses_actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'sesion_caja'
+
+
+# --- Resumen de cada ciclo de caja (apertura → cierre) ---
+# Se escribe al registrar el CIERRE; un ciclo cerrado no cambia más,
+# así que el historial lo lee directo de acá.
+class ResumenCicloCaja(models.Model):
+    id_resumen_ciclo = models.AutoField(primary_key=True)
+    id_cierre = models.OneToOneField(
+        MovimientosCaja, models.DO_NOTHING,
+        db_column='id_cierre',
+        db_constraint=False,
+        related_name='+',
+    )
+    id_apertura = models.ForeignKey(
+        MovimientosCaja, models.DO_NOTHING,
+        db_column='id_apertura',
+        db_constraint=False,
+        related_name='+',
+    )
+    rcc_fecha_apertura = models.DateTimeField()
+    rcc_fecha_cierre = models.DateTimeField(db_index=True)
+    rcc_monto_apertura = models.DecimalField(max_digits=12, decimal_places=2)
+    rcc_ingresos = models.DecimalField(max_digits=14, decimal_places=2)
+    rcc_egresos = models.DecimalField(max_digits=14, decimal_places=2)
+    rcc_total_final = models.DecimalField(max_digits=14, decimal_places=2)
+    rcc_apertura_empleado = models.CharField(max_length=150, blank=True, null=True)
+    rcc_cierre_empleado = models.CharField(max_length=150, blank=True, null=True)
+    # [{"metodo": "Efectivo", "monto": "1234.50"}, ...]
+    rcc_por_metodo_ingresos = models.JSONField(default=list)
+    rcc_por_metodo_egresos = models.JSONField(default=list)
+
+    class Meta:
+        db_table = 'resumen_ciclo_caja'
+
+
+# --- Totales diarios de caja por (fecha, tipo de movimiento, método de pago) ---
+# Se actualiza con cada movimiento (api/caja.py); los gráficos de ingresos
+# leen de acá. rdc_metodo_pago = 0 → movimiento sin método de pago.
+class ResumenDiarioCaja(models.Model):
+    id_resumen_diario = models.AutoField(primary_key=True)
+    rdc_fecha = models.DateField()
+    rdc_tipo = models.PositiveSmallIntegerField()
+    rdc_metodo_pago = models.PositiveIntegerField(default=0)
+    rdc_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    rdc_cantidad = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'resumen_diario_caja'
+        unique_together = (('rdc_fecha', 'rdc_tipo', 'rdc_metodo_pago'),)
+        indexes = [
+            models.Index(fields=['rdc_tipo', 'rdc_fecha'], name='idx_rdc_tipo_fecha'),
+        ]